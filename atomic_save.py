@@ -0,0 +1,78 @@
+import os
+import shutil
+import stat
+import tempfile
+
+
+def backup_path(path, n):
+    return f"{path}.bak{n}"
+
+
+def _rotate_backups(path, backups):
+    """Shift path.bak1..bak(N-1) up by one and copy path to path.bak1."""
+    for n in range(backups - 1, 0, -1):
+        if os.path.exists(backup_path(path, n)):
+            os.replace(backup_path(path, n), backup_path(path, n + 1))
+    # A hard link (or copy) rather than a rename, so path itself never
+    # goes missing between here and the final replace
+    first = backup_path(path, 1)
+    if os.path.exists(first):
+        os.remove(first)
+    try:
+        os.link(path, first)
+    except OSError:
+        shutil.copy2(path, first)
+
+
+def _fsync_directory(directory):
+    # Makes the rename itself durable; not possible (or needed) on Windows
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, write, backups=0, encoding="utf-8", before_replace=None):
+    """
+    Replace the text file at path with what write(out) writes, atomically.
+
+    The data goes to a temporary file in the same directory, which is
+    fsynced and then renamed over path, so readers (and a crash) only ever
+    see the old or the new file, never half of one. With backups > 0 the
+    previous file is kept as path.bak1, older ones shifted up to
+    path.bak<backups>. With encoding=None, out is a binary file.
+    before_replace(temp_path), if given, is called once the new data is on
+    disk, just before the rename.
+    """
+    path = os.path.abspath(path)
+    directory = os.path.dirname(path)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w" if encoding else "wb", encoding=encoding) as out:
+            write(out)
+            out.flush()
+            os.fsync(out.fileno())
+        if os.path.exists(path):
+            os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode))
+            if backups > 0:
+                _rotate_backups(path, backups)
+        else:
+            os.chmod(temp_path, 0o644)
+        if before_replace is not None:
+            before_replace(temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(directory)
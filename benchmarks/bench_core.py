@@ -0,0 +1,296 @@
+"""
+Benchmark the core engine without Tk: parsing, indexing and grouping, tag
+filtering, search, bulk edits, saving, the model cache and the database.
+
+    python benchmarks/bench_core.py --links 100000 --json results.json
+    python benchmarks/bench_core.py --input my-export.xml --only parse,load,save
+
+Every phase reports wall time and the peak memory it allocated on top of
+what was live when it started (tracemalloc; this slows pure-Python code by
+a roughly constant factor, --no-trace turns it off). --json writes the
+results with the commit and machine they came from, for comparing commits.
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from bookmark_db import BookmarkDB  # noqa: E402
+from bookmark_store import BookmarkStore, F_URL, F_TAGS, normalize_url, parse_tags  # noqa: E402
+from generate_collection import add_arguments, collection_options, generate  # noqa: E402
+from model_cache import file_key, load_model, save_model  # noqa: E402
+from tag_query import TagQuery, iter_bits  # noqa: E402
+from url_canon import CanonPipeline, DEFAULT_RULES  # noqa: E402
+from xml_loader import iter_record_batches  # noqa: E402
+
+PHASES = (
+    "parse", "load", "normalize_url", "canonicalize", "duplicate_groups", "regroup",
+    "tag_filter", "search_index", "search", "bulk_tag", "bulk_move", "bulk_delete",
+    "save", "model_cache_write", "model_cache_read", "db_import", "db_load",
+)
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "-C", REPO, "rev-parse", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "-C", REPO, "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def max_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+class Bench:
+    """Runs phases one after another and collects their results."""
+
+    def __init__(self, only=None, trace=True):
+        self.only = only
+        self.trace = trace
+        self.results = []
+        if trace:
+            tracemalloc.start()
+
+    def run(self, name, func):
+        """Time func(), which returns how many items it handled."""
+        if self.only is not None and name not in self.only:
+            return
+        gc.collect()
+        if self.trace:
+            tracemalloc.reset_peak()
+            start_mem = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        count = func()
+        seconds = time.perf_counter() - start
+        result = {"name": name, "count": count, "seconds": round(seconds, 4),
+                  "per_second": round(count / seconds) if seconds and count else None}
+        if self.trace:
+            current, peak = tracemalloc.get_traced_memory()
+            result["peak_mb"] = round((peak - start_mem) / 1e6, 1)
+            result["retained_mb"] = round((current - start_mem) / 1e6, 1)
+        self.results.append(result)
+        rate = f"{result['per_second']:>12,}/s" if result["per_second"] else f"{'':>14}"
+        memory = f"{result['peak_mb']:>9.1f} MB peak" if self.trace else ""
+        print(f"{name:<20}{count:>10,}{seconds:>10.3f} s{rate}{memory}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--input", help="benchmark this XML file instead of a generated one")
+    parser.add_argument("--bulk", type=float, default=0.1,
+                        help="fraction of links the bulk tag/move/delete phases touch")
+    parser.add_argument("--only", help=f"comma-separated phases to run ({', '.join(PHASES)})")
+    parser.add_argument("--no-trace", action="store_true", help="skip tracemalloc (no memory figures)")
+    parser.add_argument("--json", metavar="PATH", help='write results as JSON to PATH ("-" for stdout)')
+    parser.add_argument("--workdir", help="directory for generated and saved files (default: a temp dir)")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    only = None
+    if args.only:
+        only = set(name.strip() for name in args.only.split(","))
+        unknown = only - set(PHASES)
+        if unknown:
+            parser.error(f"unknown phase(s): {', '.join(sorted(unknown))}")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench-core-")
+    os.makedirs(workdir, exist_ok=True)
+    if args.input:
+        xml_path = args.input
+        options = None
+    else:
+        options = collection_options(args)
+        xml_path = os.path.join(workdir, f"collection-{args.links}-{args.seed}.xml")
+        if not os.path.exists(xml_path):
+            start = time.perf_counter()
+            generate(xml_path, **options)
+            print(f"generated {xml_path} in {time.perf_counter() - start:.1f} s")
+    size_mb = os.path.getsize(xml_path) / 1e6
+    print(f"{xml_path}: {size_mb:,.1f} MB\n")
+    print(f"{'phase':<20}{'items':>10}{'time':>12}{'rate':>14}")
+
+    bench = Bench(only, trace=not args.no_trace)
+    rnd = random.Random(1)
+    ctx = argparse.Namespace(store=None)
+
+    def parse():
+        return sum(len(batch) for batch in iter_record_batches(xml_path))
+    bench.run("parse", parse)
+
+    def load():
+        ctx.store = BookmarkStore().load_file(xml_path)
+        return len(ctx.store)
+    # Everything after needs the store, whichever phases were picked
+    if only is not None and "load" not in only:
+        ctx.store = BookmarkStore().load_file(xml_path)
+    else:
+        bench.run("load", load)
+    store = ctx.store
+    urls = [record[F_URL] for record in store.records.values() if record[F_URL]]
+
+    bench.run("normalize_url", lambda: len([normalize_url(url) for url in urls]))
+    bench.run("canonicalize", lambda: len(CanonPipeline().canonicalize_many(urls)))
+
+    def duplicate_groups():
+        store._duplicate_keys = None
+        return len(store.duplicate_groups())
+    bench.run("duplicate_groups", duplicate_groups)
+
+    def regroup():
+        # One rule on and off again, through the pipeline's memo
+        changed = store.set_url_rules(DEFAULT_RULES | {"drop_tracking_params"})
+        store.set_url_rules(DEFAULT_RULES)
+        return changed
+    bench.run("regroup", regroup)
+
+    tag_counts = Counter()
+    for record in store.records.values():
+        tag_counts.update(parse_tags(record[F_TAGS]))
+    common = [tag for tag, _ in tag_counts.most_common(3)] or ["none"]
+    queries = [f'"{common[0]}"']
+    if len(common) >= 3:
+        queries += [f'"{common[0]}" OR "{common[1]}"', f'("{common[0]}" OR "{common[1]}") AND NOT "{common[2]}"']
+
+    def tag_filter():
+        # The model side of _apply_filter: evaluate, then the matching lids
+        matched = 0
+        for text in queries:
+            matched += len(set(iter_bits(store.query_tags(TagQuery(text)))))
+        return matched
+    bench.run("tag_filter", tag_filter)
+
+    def search_index():
+        index, rows = store.begin_search_index()
+        for lid, title, url, tags in rows:
+            index.add(lid, title, url, tags)
+        store.install_search_index(index)
+        return len(store)
+    bench.run("search_index", search_index)
+
+    def search():
+        terms = ["guide", "news 1", "pyth", "docs api", "zzzz", "re"] * 50
+        for text in terms:
+            store.search_index.search(text)
+        return len(terms)
+    if store.search_index is None and (only is None or "search" in only):
+        search_index()
+    bench.run("search", search)
+
+    lids = list(store.records)
+    bulk = max(1, int(len(lids) * args.bulk))
+
+    def bulk_tag():
+        for lid in rnd.sample(lids, bulk):
+            store.set_tags(lid, store.tags(lid) | {"bench-tag"})
+        return bulk
+    bench.run("bulk_tag", bulk_tag)
+
+    def bulk_move():
+        target = store.ensure_category("Bench target")
+        for lid in rnd.sample(lids, bulk):
+            store.set_category(lid, target)
+        return bulk
+    bench.run("bulk_move", bulk_move)
+
+    def bulk_delete():
+        return store.remove_links(rnd.sample(lids, bulk))
+    bench.run("bulk_delete", bulk_delete)
+
+    saved_path = os.path.join(workdir, "saved.xml")
+
+    def save():
+        store.save(saved_path)
+        return len(store)
+    bench.run("save", save)
+
+    # The cache phases work on the input file as loaded, like opening it in the app
+    if only is None or "model_cache_write" in only:
+        fresh = BookmarkStore().load_file(xml_path)
+
+        def model_cache_write():
+            save_model(fresh, xml_path, file_key(xml_path))
+            return len(fresh)
+        bench.run("model_cache_write", model_cache_write)
+        del fresh
+
+    def model_cache_read():
+        cached = BookmarkStore()
+        if not load_model(cached, xml_path, file_key(xml_path)):
+            raise RuntimeError("model cache missed right after writing it")
+        return len(cached)
+    bench.run("model_cache_read", model_cache_read)
+
+    db_path = os.path.join(workdir, "bench.sqlite")
+
+    def db_import():
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        db = BookmarkDB(db_path)
+        try:
+            return db.import_xml(xml_path)
+        finally:
+            db.close()
+    bench.run("db_import", db_import)
+
+    def db_load():
+        db = BookmarkDB(db_path)
+        try:
+            return len(db.load_store(BookmarkStore()))
+        finally:
+            db.close()
+    if os.path.exists(db_path):
+        bench.run("db_load", db_load)
+
+    rss = max_rss_mb()
+    if rss is not None:
+        print(f"\nmax RSS {rss:,.0f} MB" + (" (with tracemalloc)" if bench.trace else ""))
+
+    if args.json:
+        commit, dirty = git_revision()
+        report = {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "input": {"path": xml_path if args.input else None, "size_mb": round(size_mb, 1),
+                      "links": len(lids), "options": options},
+            "traced": bench.trace,
+            "max_rss_mb": round(rss) if rss is not None else None,
+            "results": bench.results,
+        }
+        if args.json == "-":
+            json.dump(report, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, "w", encoding="utf-8") as out:
+                json.dump(report, out, indent=2)
+            print(f"results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,494 @@
+"""
+Measure UI responsiveness: drive SafavorCleanerApp on a headless display.
+
+    python benchmarks/bench_ui.py --links 100000 --json ui.json
+    python benchmarks/bench_ui.py --input my-export.xml --budget 200 --budget load_xml=3000
+
+Starts Xvfb on a free display (--display uses an existing one instead),
+opens a generated collection and runs scripted toolbar actions against it.
+Every action is started from the Tk event loop, as a click would be, and
+runs until it has settled and Tk has been idle once. Reported per action:
+
+  max gap, p95 gap   longest and 95th percentile time between ticks of an
+                     after() heartbeat (--tick ms apart); this is how long
+                     the event loop was blocked
+  rows, rows/s       Treeview rows inserted, and how fast insert() ran
+  first paint        for loads: from the click until the Explorer shows the
+                     categories and Tk has drawn them
+
+--budget puts a limit on the max gap, for all actions or for one by name;
+the run exits with status 1 when an action goes over its budget.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from bench_core import git_revision, max_rss_mb  # noqa: E402
+from bench_link_check import percentile  # noqa: E402
+from change_journal import journal_path  # noqa: E402
+from generate_collection import add_arguments, collection_options, generate  # noqa: E402
+from model_cache import cache_path  # noqa: E402
+
+ACTIONS = (
+    "load_xml", "reload_from_cache", "open_category", "open_categories", "scroll", "sort_categories",
+    "sort_bookmarks", "filter_on", "filter_off", "search", "search_next", "add_tags", "drag_drop",
+    "delete_selected", "show_deduper", "expand_all", "collapse_all", "mark_all_but_one",
+    "remove_marked", "save",
+)
+
+
+def start_xvfb(screen="1600x1000x24"):
+    """Start Xvfb on a free display and point DISPLAY at it; returns the process."""
+    if shutil.which("Xvfb") is None:
+        raise SystemExit("Xvfb not found: install it, or pass --display to use a running X server.")
+    read_fd, write_fd = os.pipe()
+    proc = subprocess.Popen(
+        ["Xvfb", "-displayfd", str(write_fd), "-screen", "0", screen, "-nolisten", "tcp"],
+        pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    os.close(write_fd)
+    # Xvfb writes the display number it picked once it accepts connections
+    with os.fdopen(read_fd) as f:
+        number = f.readline().strip()
+    if not number:
+        proc.terminate()
+        raise SystemExit("Xvfb did not start.")
+    os.environ["DISPLAY"] = ":" + number
+    return proc
+
+
+def load_app_module():
+    import importlib.util
+    spec = importlib.util.spec_from_file_location("bookmark_manager", os.path.join(REPO, "bookmark-manager.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class ScriptedDialogs:
+    """
+    Stands in for the filedialog and messagebox modules: answers come from
+    the script instead of a modal window, and messages are collected.
+    """
+
+    def __init__(self):
+        self.open_path = ""
+        self.prompts = []
+        self.messages = []
+
+    def askopenfilename(self, **kw):
+        return self.open_path
+
+    def asksaveasfilename(self, **kw):
+        return ""
+
+    def askyesno(self, *a, **kw):
+        return True
+
+    def askokcancel(self, *a, **kw):
+        return True
+
+    def askyesnocancel(self, *a, **kw):
+        # Unsaved changes when reopening: discard them
+        return False
+
+    def showerror(self, title, message, **kw):
+        self.messages.append(("error", message))
+
+    def showinfo(self, title, message, **kw):
+        self.messages.append(("info", message))
+
+    def showwarning(self, title, message, **kw):
+        self.messages.append(("warning", message))
+
+    def prompt(self, title, default_value=""):
+        return self.prompts.pop(0) if self.prompts else None
+
+
+class Heartbeat:
+    """Ticks every interval_ms on the Tk thread and records the gaps between ticks."""
+
+    def __init__(self, root, interval_ms):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.gaps = []
+        self.last = time.perf_counter()
+        self._after_id = root.after(interval_ms, self._tick)
+
+    def reset(self):
+        self.gaps = []
+        self.last = time.perf_counter()
+
+    def _tick(self):
+        now = time.perf_counter()
+        self.gaps.append(now - self.last)
+        self.last = now
+        self._after_id = self.root.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        self.root.after_cancel(self._after_id)
+
+
+class InsertCounter:
+    """Counts the rows a Treeview inserts and the time spent in insert()."""
+
+    def __init__(self, tree):
+        self.rows = 0
+        self.seconds = 0.0
+        insert = tree.insert
+
+        def counted(*args, **kw):
+            start = time.perf_counter()
+            try:
+                return insert(*args, **kw)
+            finally:
+                self.seconds += time.perf_counter() - start
+                self.rows += 1
+        tree.insert = counted
+
+    def reset(self):
+        self.rows = 0
+        self.seconds = 0.0
+
+
+class UiBench:
+    """Runs actions through the Tk event loop and collects their results."""
+
+    def __init__(self, root, app, tick_ms=10, timeout=600, only=None):
+        self.root = root
+        self.app = app
+        self.timeout = timeout
+        self.only = only
+        self.results = []
+        self.heartbeat = Heartbeat(root, tick_ms)
+        self.counters = [InsertCounter(app.explorer_tree), InsertCounter(app.tree)]
+        self.error = None
+        root.report_callback_exception = self._callback_failed
+
+    def _callback_failed(self, exc_type, exc, tb):
+        self.error = exc
+        self.root.quit()
+
+    def run(self, name, steps, settled=None, first_paint=False, always=False):
+        """
+        Run steps (callables) from the event loop one after another, each
+        in its own callback like quick successive clicks, then keep the
+        loop running until settled() holds, the app's time-sliced tree work
+        is done and Tk has been idle once.
+        Actions left out by --only are skipped unless always is set (the
+        load the others need); their results are not kept.
+        """
+        keep = self.only is None or name in self.only
+        if not keep and not always:
+            return
+        root = self.root
+        pending = list(steps)
+        marks = {}
+        call_seconds = [0.0]
+
+        if first_paint:
+            on_load_done = self.app._on_load_done
+
+            def load_done(*args, **kw):
+                on_load_done(*args, **kw)
+                # Runs after the redraws the populated trees queued
+                root.after_idle(lambda: marks.setdefault("paint", time.perf_counter()))
+            self.app._on_load_done = load_done
+
+        def step():
+            began = time.perf_counter()
+            pending.pop(0)()
+            call_seconds[0] += time.perf_counter() - began
+            if pending:
+                root.after(0, step)
+            else:
+                root.after(1, poll)
+
+        def poll():
+            now = time.perf_counter()
+            if now - start > self.timeout:
+                marks["timeout"] = True
+                root.quit()
+                return
+            if "settled" not in marks:
+                if (settled is None or settled()) and not self.app.scheduler.busy():
+                    marks["settled"] = now
+                    root.after_idle(lambda: marks.setdefault("idle", time.perf_counter()))
+            elif "idle" in marks and self.heartbeat.last > marks["idle"]:
+                # A heartbeat tick after the idle pass closes the last gap
+                root.quit()
+                return
+            root.after(5, poll)
+
+        for counter in self.counters:
+            counter.reset()
+        self.heartbeat.reset()
+        start = time.perf_counter()
+        root.after(0, step)
+        root.mainloop()
+        if first_paint:
+            del self.app._on_load_done
+        if self.error is not None:
+            raise RuntimeError(f"{name} failed") from self.error
+        if marks.get("timeout"):
+            raise RuntimeError(f"{name} did not settle within {self.timeout} s")
+        if not keep:
+            return
+
+        gaps = [gap * 1000 for gap in self.heartbeat.gaps]
+        rows = sum(counter.rows for counter in self.counters)
+        insert_seconds = sum(counter.seconds for counter in self.counters)
+        result = {
+            "name": name,
+            "seconds": round(marks["settled"] - start, 4),
+            "call_ms": round(call_seconds[0] * 1000, 1),
+            "max_gap_ms": round(max(gaps, default=0.0), 1),
+            "p95_gap_ms": round(percentile(gaps, 95), 1),
+            "ticks": len(gaps),
+            "rows_inserted": rows,
+            "rows_per_second": round(rows / insert_seconds) if insert_seconds else None,
+            "first_paint_ms": round((marks["paint"] - start) * 1000, 1) if "paint" in marks else None,
+        }
+        self.results.append(result)
+        rate = f"{result['rows_per_second']:>12,}" if result["rows_per_second"] else f"{'':>12}"
+        paint = f"{result['first_paint_ms']:>12,.0f}" if result["first_paint_ms"] is not None else ""
+        print(f"{name:<20}{result['seconds']:>9.3f}{result['max_gap_ms']:>10,.0f}{result['p95_gap_ms']:>10,.0f}"
+              f"{rows:>10,}{rate}{paint}", flush=True)
+
+
+# ------------------------------------------------------------------------------
+#  THE SCRIPT
+# ------------------------------------------------------------------------------
+def run_script(bench, app, dialogs, xml_path, rows):
+    """
+    The toolbar actions, in the order a cleanup session would use them.
+    Returns how many bookmarks the file had.
+    """
+    tree = app.explorer_tree
+    bench.root.update()
+
+    def loaded():
+        return app.load_task is None and app.search_index_task is None
+
+    dialogs.open_path = xml_path
+    bench.run("load_xml", [app.load_xml], loaded, first_paint=True, always=True)
+    # Untouched since it was parsed, so the model cache has it now
+    bench.run("reload_from_cache", [app.load_xml], loaded, first_paint=True)
+    store = app.store
+    if not store.records:
+        raise RuntimeError(f"{xml_path} has no bookmarks")
+    links = len(store)
+
+    cat_ids = list(store.categories)
+    biggest = max(cat_ids, key=lambda cat_id: len(store.links_by_category.get(cat_id, ())))
+
+    def open_category(cat_id):
+        # What clicking the expander does
+        def click():
+            item = store.item_for_category(cat_id)
+            tree.focus(item)
+            tree.item(item, open=True)
+            tree.event_generate("<<TreeviewOpen>>")
+        return click
+
+    def select_rows():
+        # The first rows of the biggest category, opening it if it was released
+        app._open_category(biggest)
+        tree.selection_set(tree.get_children(store.item_for_category(biggest))[:rows])
+
+    bench.run("open_category", [open_category(biggest)])
+    others = [cat_id for cat_id in cat_ids if cat_id != biggest][:20]
+    bench.run("open_categories", [open_category(cat_id) for cat_id in others])
+    bench.run("scroll", [lambda: tree.yview_scroll(1, "pages")] * 20)
+    bench.run("sort_categories", [app.sort_categories])
+    bench.run("sort_bookmarks", [app.sort_bookmarks])
+
+    tag_counts = {}
+    for lid in store.records:
+        for tag in store.tags(lid):
+            tag_counts[tag] = tag_counts.get(tag, 0) + 1
+    if tag_counts:
+        common = sorted(tag_counts, key=tag_counts.get, reverse=True)[:2]
+        dialogs.prompts = [" OR ".join(f'"{tag}"' for tag in common)]
+        bench.run("filter_on", [app.toggle_filter_by_tag])
+        bench.run("filter_off", [app.toggle_filter_by_tag])
+
+    # Typed a letter at a time; the search runs once typing pauses
+    word = next((w for w in (store.title(lid) for lid in store.records) if len(w) >= 6), "guide news")
+    typed = word[:12]
+    bench.run("search", [lambda text=typed[:i]: app.search_var.set(text) for i in range(1, len(typed) + 1)],
+              settled=lambda: app.search_after_id is None)
+    bench.run("search_next", [lambda: app.show_search_result(1)] * 10)
+
+    dialogs.prompts = ["bench-tag"]
+    bench.run("add_tags", [select_rows, app.add_tags_to_selected])
+
+    def drop(event):
+        # Press, drag and release over the first category the rows are not in
+        target = next(item for item in tree.get_children("") if item != store.item_for_category(biggest))
+        tree.see(target)
+        tree.update_idletasks()
+        bbox = tree.bbox(target)
+        if not bbox:
+            return
+        x, y = bbox[0] + 10, bbox[1] + bbox[3] // 2
+        rootx, rooty = tree.winfo_rootx() + x, tree.winfo_rooty() + y
+        tree.event_generate(event, x=x, y=y, rootx=rootx, rooty=rooty, state=0x100 if event == "<Motion>" else 0)
+
+    if len(cat_ids) > 1:
+        bench.run("drag_drop", [
+            app.toggle_drag_drop, select_rows,
+            lambda: drop("<ButtonPress-1>"), lambda: drop("<Motion>"), lambda: drop("<ButtonRelease-1>"),
+            app.toggle_drag_drop,
+        ])
+    bench.run("delete_selected", [select_rows, app.delete_selected_bookmarks])
+
+    bench.run("show_deduper", [lambda: app.notebook.select(app.deduper_frame)])
+    bench.run("expand_all", [lambda: app.expand_collapse_all(True)])
+    bench.run("collapse_all", [lambda: app.expand_collapse_all(False)])
+    bench.run("mark_all_but_one", [app.mark_all_but_one])
+    bench.run("remove_marked", [app.remove_marked])
+    bench.run("save", [app.save_xml], settled=lambda: app.save_task is None)
+    return links
+
+
+def parse_budgets(values):
+    """["200", "load_xml=3000"] -> {None: 200.0, "load_xml": 3000.0}"""
+    budgets = {}
+    for value in values:
+        name, sep, ms = value.rpartition("=")
+        if sep and name not in ACTIONS:
+            raise argparse.ArgumentTypeError(f"unknown action {name!r}")
+        budgets[name or None] = float(ms)
+    return budgets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--input", help="run against a copy of this XML file instead of a generated one")
+    parser.add_argument("--display", help="use this X display instead of starting Xvfb")
+    parser.add_argument("--tick", type=int, default=10, help="heartbeat interval in ms")
+    parser.add_argument("--rows", type=int, default=100,
+                        help="bookmarks selected for the tag, drag and delete actions")
+    parser.add_argument("--only", help=f"comma-separated actions to run ({', '.join(ACTIONS)})")
+    parser.add_argument("--budget", action="append", default=[], metavar="[ACTION=]MS",
+                        help="max gap allowed, for every action or one; may be repeated")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds an action may take to settle")
+    parser.add_argument("--json", metavar="PATH", help='write results as JSON to PATH ("-" for stdout)')
+    parser.add_argument("--workdir", help="directory for generated and saved files (default: a temp dir)")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        budgets = parse_budgets(args.budget)
+    except (argparse.ArgumentTypeError, ValueError) as e:
+        parser.error(f"--budget: {e}")
+    only = None
+    if args.only:
+        only = set(name.strip() for name in args.only.split(","))
+        unknown = only - set(ACTIONS)
+        if unknown:
+            parser.error(f"unknown action(s): {', '.join(sorted(unknown))}")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench-ui-")
+    os.makedirs(workdir, exist_ok=True)
+    if args.input:
+        source = args.input
+        options = None
+    else:
+        options = collection_options(args)
+        source = os.path.join(workdir, f"collection-{args.links}-{args.seed}.xml")
+        if not os.path.exists(source):
+            generate(source, **options)
+    # The run saves over its file; it starts from a copy without a model
+    # cache or journal so the first load parses the XML
+    xml_path = os.path.join(workdir, "ui-" + os.path.basename(source))
+    shutil.copyfile(source, xml_path)
+    for path in (cache_path(xml_path), journal_path(xml_path)):
+        if os.path.exists(path):
+            os.remove(path)
+
+    xvfb = None
+    if args.display:
+        os.environ["DISPLAY"] = args.display
+    else:
+        xvfb = start_xvfb()
+    try:
+        module = load_app_module()
+        dialogs = ScriptedDialogs()
+        module.filedialog = module.messagebox = dialogs
+        root = module.tk.Tk()
+        root.geometry("1200x700")
+        app = module.SafavorCleanerApp(root)
+        app._prompt_for_text = dialogs.prompt
+        # Timings should not include an autosave that happens to come due
+        app.autosave_var.set(False)
+
+        print(f"{xml_path}: {os.path.getsize(xml_path) / 1e6:,.1f} MB, display {os.environ['DISPLAY']}, "
+              f"heartbeat every {args.tick} ms\n")
+        print(f"{'action':<20}{'time s':>9}{'max gap':>10}{'p95 gap':>10}{'rows':>10}{'rows/s':>12}"
+              f"{'paint ms':>12}")
+        bench = UiBench(root, app, args.tick, args.timeout, only)
+        try:
+            links = run_script(bench, app, dialogs, xml_path, args.rows)
+        finally:
+            bench.heartbeat.stop()
+            app._close()
+        display = os.environ["DISPLAY"]
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+
+    for message in dialogs.messages:
+        print(f"{message[0]}: {message[1]}")
+    over = []
+    for result in bench.results:
+        budget = budgets.get(result["name"], budgets.get(None))
+        result["budget_ms"] = budget
+        if budget is not None and result["max_gap_ms"] > budget:
+            over.append(f"{result['name']} ({result['max_gap_ms']:,.0f} > {budget:,.0f} ms)")
+    rss = max_rss_mb()
+    if rss is not None:
+        print(f"\nmax RSS {rss:,.0f} MB")
+
+    if args.json:
+        commit, dirty = git_revision()
+        report = {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "tk": module.tk.TkVersion,
+            "platform": platform.platform(),
+            "display": display if args.display else "Xvfb",
+            "tick_ms": args.tick,
+            "input": {"path": args.input, "links": links, "options": options},
+            "max_rss_mb": round(rss) if rss is not None else None,
+            "results": bench.results,
+        }
+        if args.json == "-":
+            json.dump(report, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, "w", encoding="utf-8") as out:
+                json.dump(report, out, indent=2)
+            print(f"results written to {args.json}")
+
+    if over:
+        print("over budget: " + ", ".join(over), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
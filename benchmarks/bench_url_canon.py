@@ -0,0 +1,89 @@
+"""
+Benchmark the URL canonicalization pipeline, rule by rule.
+
+    python benchmarks/bench_url_canon.py --urls 150000 --unique 0.8
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bookmark_store import normalize_url  # noqa: E402
+from url_canon import CanonPipeline, RULES, DEFAULT_RULES, parse  # noqa: E402
+
+HOSTS = ("example.com", "www.example.org", "News.Example.net", "bücher.de", "www.shop.io:443",
+         "blog.example.com:8080", "mañana.es")
+PATHS = ("", "/", "/docs/guide/", "/index.html", "/a/b/default.aspx", "/caf%c3%a9/menu",
+         "/search%2fresults", "/p;jsessionid=1F2E")
+QUERIES = ("", "", "?id={n}", "?utm_source=feed&utm_medium=rss&id={n}", "?b=2&a=1&n={n}", "?fbclid=x{n}")
+FRAGMENTS = ("", "", "#top", "#!/inbox/{n}")
+
+
+def make_urls(count, unique, seed=1):
+    rnd = random.Random(seed)
+    distinct = max(1, int(count * unique))
+    pool = []
+    for n in range(distinct):
+        scheme = rnd.choice(("http://", "https://", ""))
+        pool.append(
+            scheme + rnd.choice(HOSTS) + rnd.choice(PATHS) + f"{n % 997}"
+            + rnd.choice(QUERIES).format(n=n) + rnd.choice(FRAGMENTS).format(n=n)
+        )
+    return [pool[i] if i < distinct else rnd.choice(pool) for i in range(count)]
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def rate(count, seconds):
+    return f"{count / seconds:>12,.0f}/s" if seconds else f"{'-':>12}  "
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--urls", type=int, default=150000)
+    parser.add_argument("--unique", type=float, default=0.8,
+                        help="fraction of distinct URLs (the rest repeat)")
+    args = parser.parse_args()
+
+    urls = make_urls(args.urls, args.unique)
+    distinct = sorted(set(urls))
+    print(f"{len(urls):,} URLs, {len(distinct):,} distinct")
+
+    # Each rule on its own, applied to already parsed URLs
+    parsed = [parse(url) for url in distinct]
+    print(f"\n{'parse':<22}{rate(len(distinct), timed(lambda: [parse(u) for u in distinct]))}")
+    for rule in RULES:
+        states = [list(p) for p in parsed]
+
+        def run(func=rule.func, states=states):
+            for parts in states:
+                func(parts)
+        print(f"{rule.name:<22}{rate(len(states), timed(run))}")
+
+    print()
+    print(f"{'legacy normalize_url':<40}{rate(len(urls), timed(lambda: [normalize_url(u) for u in urls]))}")
+    for label, enabled in (("default rules", DEFAULT_RULES), ("all rules", [r.name for r in RULES])):
+        canon = CanonPipeline(enabled)
+        print(f"{label + ', cold':<40}{rate(len(urls), timed(lambda: canon.canonicalize_many(urls)))}")
+        print(f"{label + ', memoized':<40}{rate(len(urls), timed(lambda: canon.canonicalize_many(urls)))}")
+
+    # Regrouping after a rule change only re-runs the rules from that one on
+    print()
+    for rule in RULES:
+        canon = CanonPipeline(DEFAULT_RULES)
+        canon.canonicalize_many(urls)
+        canon.set_rule(rule.name, rule.name not in DEFAULT_RULES)
+        elapsed = timed(lambda: canon.canonicalize_many(urls))
+        action = "enable" if rule.name in canon.enabled else "disable"
+        print(f"{'regroup, ' + action + ' ' + rule.name:<40}{rate(len(urls), elapsed)}")
+
+
+if __name__ == "__main__":
+    main()
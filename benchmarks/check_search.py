@@ -0,0 +1,69 @@
+"""
+Check search results on collections where every trigram posting is large.
+
+    python benchmarks/check_search.py --links 20000
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import TrigramIndex  # noqa: E402
+
+
+def build(rows, max_scan):
+    index = TrigramIndex(rows.get, max_scan)
+    for key, (title, url, tags) in rows.items():
+        index.add(key, title, url, tags)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--links", type=int, default=20000)
+    parser.add_argument("--max-scan", type=int, default=2000)
+    args = parser.parse_args()
+
+    # Half the titles hold "python", half "recipes", one holds both: each
+    # term's postings are far longer than max_scan, their intersection is 1
+    last = args.links - 1
+    rows = {}
+    for key in range(last):
+        title = f"python notes {key}" if key % 2 else f"recipes list {key}"
+        rows[key] = (title, f"http://example.com/{key}", "")
+    rows[last] = ("python recipes", f"http://example.com/{last}", "")
+    index = build(rows, args.max_scan)
+
+    failures = []
+
+    def expect(name, got, want):
+        status = "ok" if got == want else "FAIL"
+        print(f"{status:4}  {name}: {got!r}")
+        if got != want:
+            failures.append(f"{name}: got {got!r}, want {want!r}")
+
+    hits = index.search("python recipes")
+    expect("rare match behind large postings", hits.keys, [last])
+    expect("complete", hits.complete, True)
+
+    # A filter must drop hidden keys before the limit, not after it
+    hits = index.search("python", limit=50, accept=lambda key: key >= last - 200)
+    expect("filtered hits fill the limit", len(hits.keys), 50)
+    expect("filtered hits are visible", all(key >= last - 200 for key in hits.keys), True)
+    hits = index.search("python recipes", accept=lambda key: key != last)
+    expect("filtered out rare match", hits.keys, [])
+
+    # Edits leave stale postings behind; a renamed bookmark must still be found
+    old = rows[0]
+    rows[0] = ("python recipes again", old[1], old[2])
+    index.update(0, old, rows[0])
+    expect("after rename", sorted(index.search("python recipes").keys), [0, last])
+
+    if failures:
+        print("\n".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Check the title fetcher against local mock hosts.
+
+    python benchmarks/check_title_fetch.py --per-host 2
+
+Covers titles, charsets from the header, a <meta> tag or a BOM, the read
+cap, non-HTML and malformed pages, HTTP and connection errors, and the
+per-host connection limit. Exits non-zero on any mismatch.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_hosts import MockHosts, PAGES  # noqa: E402
+from title_fetch import TitleFetcher  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--per-host", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--slow-links", type=int, default=24)
+    parser.add_argument("--slow-delay", type=float, default=0.2)
+    args = parser.parse_args()
+
+    hosts = MockHosts(3, slow_delay=args.slow_delay)
+    page_host, error_host, slow_host = hosts.hosts
+    fetcher = TitleFetcher(max_workers=args.workers, per_host=args.per_host, timeout=5)
+    failures = []
+
+    def expect(name, got, want):
+        status = "ok" if got == want else "FAIL"
+        print(f"{status:4}  {name}: {got!r}")
+        if got != want:
+            failures.append(f"{name}: got {got!r}, want {want!r}")
+
+    try:
+        for name, (_, _, title) in PAGES.items():
+            expect(f"page {name}", fetcher.fetch_title(f"http://{page_host.netloc}/page/{name}/"), title)
+        # No scheme: the fetcher adds http://
+        expect("page without scheme", fetcher.fetch_title(f"{page_host.netloc}/page/plain/"),
+               PAGES["plain"][2])
+        # A 301 is followed to the page behind it
+        expect("redirect", fetcher.fetch_title(f"http://{error_host.netloc}/redirect/1"), "ok")
+
+        for kind in ("dead", "fail", "nohead"):
+            expect(f"error {kind}", fetcher.fetch_title(f"http://{error_host.netloc}/{kind}/1"), "")
+        expect("connection refused", fetcher.fetch_title("http://127.0.0.1:9/closed/1"), "")
+        expect("invalid URL", fetcher.fetch_title("http://exa mple.com/"), "")
+
+        # Bulk run: every job comes back once, with the right title, and no
+        # host ever sees more than per_host requests at a time
+        jobs = [(i, f"http://{slow_host.netloc}/slow/{i}") for i in range(args.slow_links)]
+        jobs += [(f"page-{name}", f"http://{page_host.netloc}/page/{name}/") for name in PAGES]
+        results = {key: title for key, _, title in fetcher.fetch_many(jobs)}
+        expect("fetch_many results", len(results), len(jobs))
+        expect("fetch_many slow titles",
+               sorted({results.get(i) for i in range(args.slow_links)}, key=str), ["ok"])
+        expect("fetch_many page titles",
+               {name: results.get(f"page-{name}") for name in PAGES},
+               {name: page[2] for name, page in PAGES.items()})
+        expect("per-host limit respected", slow_host.max_active <= args.per_host, True)
+        print(f"      max per-host concurrency {slow_host.max_active} (limit {args.per_host})")
+    finally:
+        fetcher.shutdown()
+        hosts.stop()
+
+    if failures:
+        print("\n".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
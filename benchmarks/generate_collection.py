@@ -0,0 +1,202 @@
+"""
+Generate a deterministic synthetic Safavor XML collection.
+
+    python benchmarks/generate_collection.py -o bench.xml --links 1000000 --categories 200 --dup-ratio 0.2
+
+The same arguments and seed always give a byte-identical file.
+"""
+import argparse
+import bisect
+import itertools
+import os
+import random
+import sys
+from xml.sax.saxutils import escape
+
+# URL shapes make_url() writes, with their default weights
+SHAPES = {
+    "plain": 50,
+    "deep": 20,
+    "query": 10,
+    "tracking": 8,
+    "fragment": 5,
+    "index": 4,
+    "idn": 2,
+    "bare": 1,
+}
+SHAPE_NAMES = tuple(SHAPES)
+
+_WORDS = ("guide", "news", "docs", "blog", "api", "release", "notes", "python", "rust", "recipes",
+          "travel", "music", "video", "paper", "review", "howto", "faq", "archive", "shop", "forum")
+_TLDS = ("com", "org", "net", "io", "de", "dev", "co.uk")
+_IDN_HOSTS = ("bücher", "mañana", "café", "straße", "über")
+
+
+def _path(rnd, n, depth):
+    return "/" + "/".join(rnd.choice(_WORDS) for _ in range(depth)) + f"/{n}"
+
+
+def make_url(rnd, shape, host, n):
+    scheme = "https://" if rnd.random() < 0.7 else "http://"
+    if shape == "plain":
+        return f"{scheme}{host}{_path(rnd, n, 1)}"
+    if shape == "deep":
+        return f"{scheme}{host}{_path(rnd, n, rnd.randint(2, 5))}/"
+    if shape == "query":
+        return f"{scheme}{host}/item?id={n}&sort={rnd.choice(_WORDS)}"
+    if shape == "tracking":
+        return f"{scheme}{host}{_path(rnd, n, 2)}?utm_source={rnd.choice(_WORDS)}&utm_medium=feed&fbclid=x{n}"
+    if shape == "fragment":
+        return f"{scheme}{host}{_path(rnd, n, 1)}#{rnd.choice(_WORDS)}"
+    if shape == "index":
+        return f"{scheme}{host}{_path(rnd, n, 1)}/index.html"
+    if shape == "idn":
+        return f"{scheme}{rnd.choice(_IDN_HOSTS)}{n % 50}.de{_path(rnd, n, 1)}"
+    return f"{host}{_path(rnd, n, 1)}"
+
+
+def variant_of(rnd, url):
+    """The same page written differently: case, www, scheme or trailing slash."""
+    choice = rnd.randrange(5)
+    if choice == 0:
+        return url
+    if choice == 1:
+        return url.replace("://", "://www.", 1) if "://www." not in url else url.replace("://www.", "://", 1)
+    if choice == 2:
+        return url.replace("https://", "http://", 1) if url.startswith("https://") else url.replace("http://", "https://", 1)
+    if choice == 3:
+        return url + "/" if not url.endswith("/") and "?" not in url and "#" not in url else url
+    scheme, sep, rest = url.partition("://")
+    host, slash, path = rest.partition("/")
+    return f"{scheme}{sep}{host.upper()}{slash}{path}" if sep else url
+
+
+def zipf_cum_weights(count, skew):
+    """Cumulative weights of ranks 1..count under a Zipf distribution."""
+    return list(itertools.accumulate(1.0 / (rank ** skew) for rank in range(1, count + 1)))
+
+
+def _pick(rnd, cum_weights):
+    return bisect.bisect(cum_weights, rnd.random() * cum_weights[-1])
+
+
+def iter_links(links=10000, categories=50, dup_ratio=0.15, tag_vocab=200, tags_per_link=1.5,
+               tag_skew=1.1, category_skew=0.0, hosts=None, untitled=0.1, shapes=None, seed=1):
+    """
+    Yield (link_id, url, cat_id, title, tags) for a synthetic collection.
+
+    dup_ratio of the links repeat an earlier link's page (as variant_of()
+    spells it). Tags are drawn from tag_vocab names by a Zipf law with
+    tag_skew; tags_per_link is the mean count. Categories are uniform, or
+    Zipf-distributed with category_skew > 0.
+    """
+    rnd = random.Random(seed)
+    shapes = shapes or SHAPES
+    shape_names = list(shapes)
+    shape_cum = list(itertools.accumulate(shapes[name] for name in shape_names))
+    hosts = hosts or max(1, links // 20)
+    host_names = [f"{rnd.choice(_WORDS)}{i}.{rnd.choice(_TLDS)}" for i in range(hosts)]
+    host_cum = zipf_cum_weights(hosts, 1.0)
+    tag_names = [f"{rnd.choice(_WORDS)}-{i}" for i in range(tag_vocab)]
+    tag_cum = zipf_cum_weights(tag_vocab, tag_skew)
+    cat_cum = zipf_cum_weights(categories, category_skew)
+    # Earlier distinct URLs that duplicates are drawn from; capped so huge
+    # collections stay in bounded memory
+    originals = []
+    max_originals = 100000
+
+    for n in range(1, links + 1):
+        if originals and rnd.random() < dup_ratio:
+            url = variant_of(rnd, rnd.choice(originals))
+        else:
+            shape = shape_names[bisect.bisect(shape_cum, rnd.random() * shape_cum[-1])]
+            url = make_url(rnd, shape, host_names[_pick(rnd, host_cum)], n)
+            if len(originals) < max_originals:
+                originals.append(url)
+            else:
+                originals[rnd.randrange(max_originals)] = url
+        cat_id = str(_pick(rnd, cat_cum) + 1)
+        title = "" if rnd.random() < untitled else f"{rnd.choice(_WORDS).title()} {rnd.choice(_WORDS)} {n}"
+        # Binomial tag count with the requested mean
+        count = min(tag_vocab, sum(1 for _ in range(int(tags_per_link * 2)) if rnd.random() < 0.5))
+        tags = set()
+        while len(tags) < count:
+            tags.add(tag_names[_pick(rnd, tag_cum)])
+        yield str(n), url, cat_id, title, ",".join(sorted(tags))
+
+
+def write_collection(out, categories=50, **kw):
+    """Write a synthetic collection as Safavor XML to a text stream; returns the link count."""
+    out.write("<?xml version='1.0' encoding='utf-8'?>\n<SafavorRoot>\n")
+    for c in range(1, categories + 1):
+        out.write(f"  <Kategorien>\n    <ID>{c}</ID>\n    <Kategorie>Category {c}</Kategorie>\n  </Kategorien>\n")
+    count = 0
+    for link_id, url, cat_id, title, tags in iter_links(categories=categories, **kw):
+        out.write(
+            f"  <Links>\n    <ID>{link_id}</ID>\n    <URL>{escape(url)}</URL>\n"
+            f"    <KategorieID>{cat_id}</KategorieID>\n    <Title>{escape(title)}</Title>\n"
+            f"    <Tags>{escape(tags)}</Tags>\n  </Links>\n"
+        )
+        count += 1
+    out.write("</SafavorRoot>\n")
+    return count
+
+
+def generate(path, **kw):
+    with open(path, "w", encoding="utf-8") as out:
+        return write_collection(out, **kw)
+
+
+def _shapes(text):
+    """"plain=5,query=1" -> {"plain": 5, "query": 1}"""
+    shapes = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in SHAPES:
+            raise argparse.ArgumentTypeError(f"unknown URL shape {name!r}; choose from {', '.join(SHAPE_NAMES)}")
+        shapes[name] = float(weight or 1)
+    return shapes
+
+
+def add_arguments(parser):
+    parser.add_argument("--links", type=int, default=10000)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--dup-ratio", type=float, default=0.15,
+                        help="fraction of links repeating an earlier page")
+    parser.add_argument("--tag-vocab", type=int, default=200, help="distinct tag names")
+    parser.add_argument("--tags-per-link", type=float, default=1.5, help="mean tags per link")
+    parser.add_argument("--tag-skew", type=float, default=1.1, help="Zipf exponent of tag popularity")
+    parser.add_argument("--category-skew", type=float, default=0.0,
+                        help="Zipf exponent of category sizes (0 = uniform)")
+    parser.add_argument("--untitled", type=float, default=0.1, help="fraction of links without a title")
+    parser.add_argument("--shapes", type=_shapes, default=None,
+                        help=f"URL shape weights, e.g. plain=5,query=1 (shapes: {', '.join(SHAPE_NAMES)})")
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def collection_options(args):
+    """The iter_links() keyword arguments from parsed add_arguments() options."""
+    return {
+        "links": args.links, "categories": args.categories, "dup_ratio": args.dup_ratio,
+        "tag_vocab": args.tag_vocab, "tags_per_link": args.tags_per_link, "tag_skew": args.tag_skew,
+        "category_skew": args.category_skew, "untitled": args.untitled, "shapes": args.shapes,
+        "seed": args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-o", "--output", default="-", help='XML file to write, or "-" for stdout')
+    add_arguments(parser)
+    args = parser.parse_args()
+    if args.output == "-":
+        count = write_collection(sys.stdout, **collection_options(args))
+    else:
+        count = generate(args.output, **collection_options(args))
+        print(f"{count:,} links written to {args.output} ({os.path.getsize(args.output) / 1e6:,.1f} MB)",
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Local mock web hosts for exercising the link checker.
+
+Each host is an HTTP server on its own port (so each has its own netloc).
+The first path segment picks the behaviour:
+
+    /ok/...        200
+    /slow/...      200 after `slow_delay` seconds
+    /dead/...      404
+    /fail/...      500
+    /flaky/...     503 (Retry-After: 0) on the first request, then 200
+    /limited/...   429 (Retry-After: 0) on the first request, then 200
+    /redirect/...  301 to /ok/...
+    /nohead/...    405 for HEAD, 206 for a GET
+    /              200, for bare-host URLs ("http://host:port", no path)
+    /page/<name>/  200 with PAGES[name], a page for the title fetcher
+
+MockHosts.urls() also produces bare-host URLs and /ok/ URLs with a space
+in the path; requests rewrites both (adds "/", percent-encodes) without
+any redirect taking place.
+
+Run directly to serve a few hosts until interrupted.
+"""
+import codecs
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+BEHAVIOURS = ("ok", "slow", "dead", "fail", "flaky", "limited", "redirect", "nohead", "page")
+
+# Pages served under /page/<name>/: (Content-Type, body, title the fetcher
+# should find)
+PAGES = {
+    "plain": ("text/html", b"<html><head><title>\n  Plain   page </title></head></html>", "Plain page"),
+    "header-charset": ("text/html; charset=iso-8859-1",
+                       "<title>Café crème</title>".encode("latin-1"), "Café crème"),
+    "meta-charset": ("text/html",
+                     '<meta charset="windows-1251"><title>Привет</title>'.encode("cp1251"), "Привет"),
+    "bom": ("text/html", codecs.BOM_UTF16_LE + "<title>Grüße</title>".encode("utf-16-le"), "Grüße"),
+    "entities": ("text/html", b"<title>Fish &amp; Chips &#8211; menu</title>", "Fish & Chips – menu"),
+    "near-cap": ("text/html", b"<!-- " + b"x" * (60 * 1024) + b" --><title>Near the cap</title>",
+                 "Near the cap"),
+    "past-cap": ("text/html", b"<!-- " + b"x" * (70 * 1024) + b" --><title>Too late</title>", ""),
+    "not-html": ("application/pdf", b"%PDF-1.4 <title>Not a page</title>", ""),
+    "malformed": ("text/html", b"<![bogus[ <title>Broken</title>", ""),
+    "untitled": ("text/html", b"<html><body>No title here</body></html>", ""),
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, code, headers=(), body=b""):
+        self.send_response(code)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD" and body:
+            self.wfile.write(body)
+
+    def _handle(self):
+        host = self.server.mock
+        with host.lock:
+            host.active += 1
+            host.max_active = max(host.max_active, host.active)
+            host.requests += 1
+            first = self.path not in host.seen
+            host.seen.add(self.path)
+        try:
+            kind = self.path.strip("/").split("/", 1)[0]
+            if kind == "slow":
+                time.sleep(host.slow_delay)
+            if kind in ("ok", "slow", ""):
+                self._reply(200, [("Content-Type", "text/html")], b"<title>ok</title>")
+            elif kind == "dead":
+                self._reply(404)
+            elif kind == "fail":
+                self._reply(500)
+            elif kind in ("flaky", "limited"):
+                if first:
+                    self._reply(503 if kind == "flaky" else 429, [("Retry-After", "0")])
+                else:
+                    self._reply(200)
+            elif kind == "page":
+                name = self.path.strip("/").split("/")[1:2]
+                page = PAGES.get(name[0]) if name else None
+                if page is None:
+                    self._reply(404)
+                else:
+                    self._reply(200, [("Content-Type", page[0])], page[1])
+            elif kind == "redirect":
+                self._reply(301, [("Location", "/ok" + self.path[len("/redirect"):])])
+            elif kind == "nohead":
+                if self.command == "HEAD":
+                    self._reply(405)
+                else:
+                    self._reply(206, [("Content-Range", "bytes 0-0/1")], b"x")
+            else:
+                self._reply(404)
+        finally:
+            with host.lock:
+                host.active -= 1
+
+    do_GET = _handle
+    do_HEAD = _handle
+
+
+class MockHost:
+    def __init__(self, slow_delay=0.5):
+        self.slow_delay = slow_delay
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.requests = 0
+        self.seen = set()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.daemon_threads = True
+        self.server.mock = self
+        self.netloc = f"127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MockHosts:
+    """A set of MockHosts plus a generator of bookmark URLs pointing at them."""
+
+    def __init__(self, n_hosts=10, slow_delay=0.5):
+        self.hosts = [MockHost(slow_delay).start() for _ in range(n_hosts)]
+
+    def urls(self, n, seed=0, weights=None):
+        rnd = random.Random(seed)
+        weights = weights or {"ok": 54, "slow": 5, "dead": 10, "fail": 5, "flaky": 5,
+                              "limited": 5, "redirect": 8, "nohead": 2, "bare": 3, "spaced": 3}
+        kinds = list(weights)
+        cum = [weights[k] for k in kinds]
+        urls = []
+        for i in range(n):
+            host = rnd.choice(self.hosts)
+            kind = rnd.choices(kinds, cum)[0]
+            if kind == "bare":
+                urls.append(f"http://{host.netloc}")
+            elif kind == "spaced":
+                urls.append(f"http://{host.netloc}/ok/page {i}")
+            else:
+                urls.append(f"http://{host.netloc}/{kind}/{i}")
+        return urls
+
+    def stop(self):
+        for host in self.hosts:
+            host.stop()
+
+
+if __name__ == "__main__":
+    hosts = MockHosts(3)
+    for host in hosts.hosts:
+        print(f"http://{host.netloc}/<{'|'.join(BEHAVIOURS)}>/...")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        hosts.stop()
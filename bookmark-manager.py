@@ -1,1359 +1,3039 @@
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-import xml.etree.ElementTree as ET
-import urllib.parse
-import requests
-import re
-import html  # for HTML entity decoding
-from collections import defaultdict
-
-class SafavorCleanerApp:
-    def __init__(self, master):
-        self.master = master
-        self.master.title("Bookmark Manager")
-
-        # Data structures
-        self.xml_tree = None
-        self.xml_root = None
-        
-        # groups: { normalized_url : [ (link_elem, original_url), ... ] }
-        self.links_by_group = {}
-        
-        # categories: { catID : catName }
-        self.categories = {}
-        
-        # We store TreeView group-IDs in an ordered list for display (Deduper tab)
-        self.group_ids = []
-        
-        # map each link_elem -> child_item_id in the Deduper TreeView for easy reference
-        self.link_to_tree_id = {}
-        
-        # Keep track of the currently selected link XML element (Deduper tab)
-        self.current_selected_link = None
-
-        # For the Explorer tab
-        self.last_added_category_name = None
-
-        # For Drag & Drop
-        self.drag_mode = False
-        self.dragging_items = None  # list of selected item IDs
-        self.drag_tooltip = None
-        self.drag_tooltip_label = None
-
-        # TAG/FILTER
-        self.filter_mode = False
-        self.filter_tags = set()
-        self.hidden_items = []
-
-        # -------------
-        # UI: NOTEBOOK
-        # -------------
-        self.notebook = ttk.Notebook(self.master)
-        self.notebook.pack(fill=tk.BOTH, expand=True)
-
-        # Top-level toolbar (common for both tabs)
-        self._build_top_toolbar()
-
-        # ============================
-        # TAB 1: EXPLORER (FIRST)
-        # ============================
-        self.explorer_frame = ttk.Frame(self.notebook)
-        self.notebook.add(self.explorer_frame, text="Explorer")
-
-        self._build_explorer_tab()
-
-        # ============================
-        # TAB 2: DEDUPER (SECOND)
-        # ============================
-        self.deduper_frame = ttk.Frame(self.notebook)
-        self.notebook.add(self.deduper_frame, text="Deduper")
-        
-        self._build_deduper_tab()
-
-        # Status label (bottom)
-        self.status_label = tk.Label(self.master, text="Load an XML file to begin.")
-        self.status_label.pack(pady=(0, 5))
-
-    # --------------------------------------------------------------------------
-    #  UI BUILDERS
-    # --------------------------------------------------------------------------
-    def _build_top_toolbar(self):
-        """Build the top row of buttons that are always visible."""
-        self.top_frame = tk.Frame(self.master)
-        self.top_frame.pack(fill=tk.X, padx=5, pady=5)
-
-        # Load & Save
-        self.btn_load = tk.Button(self.top_frame, text="Load XML", command=self.load_xml)
-        self.btn_load.pack(side=tk.LEFT, padx=(0, 5))
-        
-        self.btn_save = tk.Button(self.top_frame, text="Save XML", command=self.save_xml, state=tk.DISABLED)
-        self.btn_save.pack(side=tk.LEFT, padx=5)
-
-        # Create Empty XML
-        self.btn_create_empty_xml = tk.Button(self.top_frame, text="Create Empty XML", command=self.create_empty_xml)
-        self.btn_create_empty_xml.pack(side=tk.LEFT, padx=5)
-
-    def _build_explorer_tab(self):
-        """
-        Build the "explorer-like" interface: categories as folders, bookmarks as items.
-        Also add buttons to manage categories and add bookmarks, plus sorting.
-        """
-        # Top frame for category management
-        cat_mgmt_frame = tk.LabelFrame(self.explorer_frame, text="Manage Categories")
-        cat_mgmt_frame.pack(fill=tk.X, padx=5, pady=(5, 0))
-
-        self.btn_add_category = tk.Button(cat_mgmt_frame, text="Add Category", command=self.add_category, state=tk.DISABLED)
-        self.btn_add_category.pack(side=tk.LEFT, padx=5)
-
-        self.btn_rename_category = tk.Button(cat_mgmt_frame, text="Rename Category", command=self.rename_category, state=tk.DISABLED)
-        self.btn_rename_category.pack(side=tk.LEFT, padx=5)
-
-        self.btn_remove_category = tk.Button(cat_mgmt_frame, text="Remove Category", command=self.remove_category, state=tk.DISABLED)
-        self.btn_remove_category.pack(side=tk.LEFT, padx=5)
-
-        # Buttons to sort categories/bookmarks
-        sort_frame = tk.LabelFrame(self.explorer_frame, text="Sorting")
-        sort_frame.pack(fill=tk.X, padx=5, pady=5)
-
-        self.btn_sort_cats = tk.Button(sort_frame, text="Sort Categories by Title", command=self.sort_categories, state=tk.DISABLED)
-        self.btn_sort_cats.pack(side=tk.LEFT, padx=5)
-
-        self.btn_sort_bmks = tk.Button(sort_frame, text="Sort Bookmarks by URL", command=self.sort_bookmarks, state=tk.DISABLED)
-        self.btn_sort_bmks.pack(side=tk.LEFT, padx=5)
-
-        # Frame for "Add Bookmark"
-        bookmark_mgmt_frame = tk.LabelFrame(self.explorer_frame, text="Add New Bookmark")
-        bookmark_mgmt_frame.pack(fill=tk.X, padx=5, pady=5)
-
-        tk.Label(bookmark_mgmt_frame, text="URL: ").pack(side=tk.LEFT, padx=2)
-        self.new_url_entry = tk.Entry(bookmark_mgmt_frame, width=40)
-        self.new_url_entry.pack(side=tk.LEFT, padx=2)
-
-        tk.Label(bookmark_mgmt_frame, text="Category: ").pack(side=tk.LEFT, padx=2)
-        self.new_bmk_cat_combo = ttk.Combobox(bookmark_mgmt_frame, state="readonly", width=25)
-        self.new_bmk_cat_combo.pack(side=tk.LEFT, padx=2)
-
-        self.btn_add_bookmark = tk.Button(bookmark_mgmt_frame, text="Add Bookmark", command=self.add_bookmark, state=tk.DISABLED)
-        self.btn_add_bookmark.pack(side=tk.LEFT, padx=5)
-
-        # Drag & Drop toggle
-        self.drag_drop_btn = tk.Button(bookmark_mgmt_frame, text="Enable Drag & Drop", command=self.toggle_drag_drop, state=tk.DISABLED)
-        self.drag_drop_btn.pack(side=tk.LEFT, padx=10)
-
-        # Additional buttons (second row in Explorer)
-        explorer_button_frame = tk.Frame(self.explorer_frame)
-        explorer_button_frame.pack(fill=tk.X, padx=5, pady=(0, 5))
-
-        self.btn_copy_url = tk.Button(explorer_button_frame, text="Copy Selected Bookmark URL", 
-                                      command=self.copy_selected_bookmark_url, state=tk.DISABLED)
-        self.btn_copy_url.pack(side=tk.LEFT, padx=5)
-
-        self.btn_delete_bookmark = tk.Button(explorer_button_frame, text="Delete Selected Bookmark(s)", 
-                                             command=self.delete_selected_bookmarks, state=tk.DISABLED)
-        self.btn_delete_bookmark.pack(side=tk.LEFT, padx=5)
-
-        # TAGS & FILTER
-        self.btn_add_tags = tk.Button(explorer_button_frame, text="Add Tags to Selected Bookmarks",
-                                      command=self.add_tags_to_selected, state=tk.DISABLED)
-        self.btn_add_tags.pack(side=tk.LEFT, padx=5)
-
-        self.btn_remove_tags = tk.Button(explorer_button_frame, text="Remove Tags from Selected Bookmarks",
-                                         command=self.remove_tags_from_selected, state=tk.DISABLED)
-        self.btn_remove_tags.pack(side=tk.LEFT, padx=5)
-
-        self.btn_filter_by_tag = tk.Button(explorer_button_frame, text="Enable Filter by Tag",
-                                           command=self.toggle_filter_by_tag, state=tk.DISABLED)
-        self.btn_filter_by_tag.pack(side=tk.LEFT, padx=5)
-
-        # Explorer Tree
-        self.explorer_tree_frame = tk.Frame(self.explorer_frame)
-        self.explorer_tree_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=(0,5))
-
-        # =============== MAJOR CHANGE HERE =================
-        # We now have 2 "data" columns: "URL" and "Tags"
-        self.explorer_tree = ttk.Treeview(
-            self.explorer_tree_frame,
-            columns=("URL", "Tags"),
-            show="tree headings"
-        )
-        self.explorer_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-
-        self.explorer_tree.heading("#0", text="Category / Bookmark Name")
-        self.explorer_tree.heading("URL", text="Bookmark URL")
-        self.explorer_tree.heading("Tags", text="Tags")
-
-        self.explorer_tree.column("#0", width=250, stretch=True)
-        self.explorer_tree.column("URL", width=400, stretch=True)
-        self.explorer_tree.column("Tags", width=180, stretch=True)
-        # =============== END CHANGE ========================
-
-        # Scrollbar
-        self.explorer_scrollbar = tk.Scrollbar(self.explorer_tree_frame, orient="vertical", command=self.explorer_tree.yview)
-        self.explorer_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.explorer_tree.configure(yscrollcommand=self.explorer_scrollbar.set)
-        
-        # Binding
-        self.explorer_tree.bind("<<TreeviewSelect>>", self.on_explorer_select)
-        self.explorer_tree.bind("<ButtonPress-1>", self.on_tree_button_press)
-        self.explorer_tree.bind("<B1-Motion>", self.on_tree_motion)
-        self.explorer_tree.bind("<ButtonRelease-1>", self.on_tree_button_release)
-
-    def _build_deduper_tab(self):
-        """
-        Build the deduper UI (mark/unmark/remove, expand/collapse),
-        plus a TreeView for grouped duplicates.
-        """
-        # Frame for the deduper-specific buttons
-        self.deduper_buttons = tk.Frame(self.deduper_frame)
-        self.deduper_buttons.pack(fill=tk.X, padx=5, pady=5)
-
-        self.btn_mark_all_but_one = tk.Button(self.deduper_buttons, text="Mark Duplicates (All but One)", 
-                                              command=self.mark_all_but_one, state=tk.DISABLED)
-        self.btn_mark_all_but_one.pack(side=tk.LEFT, padx=5)
-        
-        self.btn_remove_marked = tk.Button(self.deduper_buttons, text="Remove Marked Items", 
-                                           command=self.remove_marked, state=tk.DISABLED)
-        self.btn_remove_marked.pack(side=tk.LEFT, padx=5)
-        
-        self.btn_unmark_selected = tk.Button(self.deduper_buttons, text="Unmark Selected", 
-                                             command=self.unmark_selected, state=tk.DISABLED)
-        self.btn_unmark_selected.pack(side=tk.LEFT, padx=5)
-        
-        # Expand/Collapse all
-        self.btn_expand_all = tk.Button(self.deduper_buttons, text="Expand All", 
-                                        command=lambda: self.expand_collapse_all(True), state=tk.DISABLED)
-        self.btn_expand_all.pack(side=tk.LEFT, padx=5)
-        
-        self.btn_collapse_all = tk.Button(self.deduper_buttons, text="Collapse All", 
-                                          command=lambda: self.expand_collapse_all(False), state=tk.DISABLED)
-        self.btn_collapse_all.pack(side=tk.LEFT, padx=5)
-
-        # Refresh
-        self.btn_refresh = tk.Button(
-            self.deduper_buttons, text="Refresh",
-            command=self.refresh_deduper, state=tk.NORMAL
-        )
-        self.btn_refresh.pack(side=tk.LEFT, padx=5)
-        
-        # Deduper tree
-        self.tree_frame = tk.Frame(self.deduper_frame)
-        self.tree_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        
-        # Columns = OriginalURL, Category, Marked
-        self.tree = ttk.Treeview(
-            self.tree_frame, 
-            columns=("OriginalURL", "Category", "Marked"), 
-            show="tree headings"
-        )
-        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        
-        self.tree.heading("#0", text="Duplicate Groups")
-        self.tree.heading("OriginalURL", text="Original URL")
-        self.tree.heading("Category", text="Category")
-        self.tree.heading("Marked", text="Marked")
-        
-        self.tree.column("#0", stretch=True, width=280)
-        self.tree.column("OriginalURL", width=250)
-        self.tree.column("Category", width=150)
-        self.tree.column("Marked", anchor=tk.CENTER, width=60)
-        
-        # Scrollbar
-        self.scrollbar = tk.Scrollbar(self.tree_frame, orient="vertical", command=self.tree.yview)
-        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.tree.configure(yscrollcommand=self.scrollbar.set)
-        
-        # Bind selection and double-click
-        self.tree.bind("<<TreeviewSelect>>", self.on_tree_select)
-        self.tree.bind("<Double-1>", self.on_tree_double_click)
-
-        # Bottom panel (for category reassignment)
-        self.bottom_frame = tk.LabelFrame(self.deduper_frame, text="Change Category of Selected Link")
-        self.bottom_frame.pack(fill=tk.X, padx=5, pady=5)
-        
-        tk.Label(self.bottom_frame, text="Category: ").pack(side=tk.LEFT, padx=(5, 2))
-        self.category_combo = ttk.Combobox(self.bottom_frame, state="readonly")
-        self.category_combo.pack(side=tk.LEFT, padx=(0, 5))
-        
-        self.btn_apply_category = tk.Button(self.bottom_frame, text="Apply", command=self.apply_category, state=tk.DISABLED)
-        self.btn_apply_category.pack(side=tk.LEFT, padx=5)
-        
-        self.category_combo.config(values=["<No categories loaded>"])
-        self.category_combo.current(0)
-
-    # --------------------------------------------------------------------------
-    # 1. LOADING AND PARSING
-    # --------------------------------------------------------------------------
-    def load_xml(self):
-        file_path = filedialog.askopenfilename(
-            title="Open Safavor XML",
-            filetypes=[("XML Files", "*.xml"), ("All Files", "*.*")]
-        )
-        if not file_path:
-            return
-        
-        try:
-            self.xml_tree = ET.parse(file_path)
-            self.xml_root = self.xml_tree.getroot()
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to parse XML: {e}")
-            return
-        
-        # Clear UI (both deduper tree and explorer tree)
-        for child in self.tree.get_children():
-            self.tree.delete(child)
-        self.links_by_group.clear()
-        self.categories.clear()
-        self.group_ids.clear()
-        self.link_to_tree_id.clear()
-        self.current_selected_link = None
-
-        for child in self.explorer_tree.get_children():
-            self.explorer_tree.delete(child)
-
-        # Reset filtering state
-        self.filter_mode = False
-        self.filter_tags.clear()
-        self.hidden_items.clear()
-        self.btn_filter_by_tag.config(text="Enable Filter by Tag")
-
-        # Load categories
-        self._load_categories()
-
-        # Populate Category combos
-        self._populate_category_combo()
-
-        # Build deduper grouping
-        self._group_links()
-        self._populate_deduper_tree()
-
-        # Build explorer tree
-        self._populate_explorer_tree()
-
-        # Enable UI components
-        self.btn_save.config(state=tk.NORMAL)
-        self.btn_mark_all_but_one.config(state=tk.NORMAL)
-        self.btn_remove_marked.config(state=tk.NORMAL)
-        self.btn_unmark_selected.config(state=tk.NORMAL)
-        self.btn_expand_all.config(state=tk.NORMAL)
-        self.btn_collapse_all.config(state=tk.NORMAL)
-
-        self.btn_add_category.config(state=tk.NORMAL)
-        self.btn_rename_category.config(state=tk.NORMAL)
-        self.btn_remove_category.config(state=tk.NORMAL)
-        self.btn_add_bookmark.config(state=tk.NORMAL)
-        self.btn_sort_cats.config(state=tk.NORMAL)
-        self.btn_sort_bmks.config(state=tk.NORMAL)
-        self.drag_drop_btn.config(state=tk.NORMAL)
-        self.btn_copy_url.config(state=tk.NORMAL)
-        self.btn_delete_bookmark.config(state=tk.NORMAL)
-        self.btn_add_tags.config(state=tk.NORMAL)
-        self.btn_remove_tags.config(state=tk.NORMAL)
-        self.btn_filter_by_tag.config(state=tk.NORMAL)
-
-        self.status_label.config(text="XML loaded. Duplicates are grouped by normalized URL.")
-
-    def _load_categories(self):
-        self.categories.clear()
-        for cat_elem in self.xml_root.findall("Kategorien"):
-            cat_id_elem = cat_elem.find("ID")
-            cat_name_elem = cat_elem.find("Kategorie")
-            if cat_id_elem is not None and cat_name_elem is not None:
-                cat_id = cat_id_elem.text.strip()
-                cat_name = cat_name_elem.text.strip()
-                self.categories[cat_id] = cat_name
-
-    def _populate_category_combo(self):
-        if self.categories:
-            cat_names_sorted = sorted(self.categories.values())
-            self.category_combo.config(values=cat_names_sorted)
-            self.new_bmk_cat_combo.config(values=cat_names_sorted)
-            self.category_combo.current(0)
-            self.new_bmk_cat_combo.current(0)
-        else:
-            self.category_combo.config(values=["<No categories found>"])
-            self.category_combo.current(0)
-            self.new_bmk_cat_combo.config(values=["<No categories found>"])
-            self.new_bmk_cat_combo.current(0)
-
-    def _group_links(self):
-        for link in self.xml_root.findall("Links"):
-            url_elem = link.find("URL")
-            raw_url = (url_elem.text.strip() if url_elem is not None and url_elem.text else "")
-            
-            if not raw_url:
-                norm_url = "<EMPTY_URL>"
-            else:
-                norm_url = self.normalize_url(raw_url)
-            
-            if norm_url not in self.links_by_group:
-                self.links_by_group[norm_url] = []
-            self.links_by_group[norm_url].append((link, raw_url))
-        
-        self.group_ids = sorted(self.links_by_group.keys())
-
-    def normalize_url(self, raw_url):
-        temp_url = raw_url.strip()
-        if not temp_url.startswith(("http://", "https://")):
-            temp_url = "http://" + temp_url
-        
-        parsed = urllib.parse.urlparse(temp_url)
-        netloc = parsed.netloc.lower()
-        if netloc.startswith("www."):
-            netloc = netloc[4:]
-        path = parsed.path.rstrip("/")
-        
-        if path:
-            norm = f"{netloc}{path}"
-        else:
-            norm = netloc
-        
-        return norm
-
-    # --------------------------------------------------------------------------
-    # 2A. POPULATING THE TREE (DEDUPER)
-    # --------------------------------------------------------------------------
-    def _populate_deduper_tree(self):
-        group_index = 1
-        for norm_url in self.group_ids:
-            link_tuples = self.links_by_group[norm_url]
-            if len(link_tuples) <= 1:
-                continue
-
-            group_label = f"Group {group_index}: {norm_url}"
-            group_index += 1
-
-            group_item_id = self.tree.insert(
-                "",
-                "end",
-                text=group_label,
-                values=("", "", ""),
-                open=False
-            )
-            
-            for link_elem, orig_url in link_tuples:
-                kat_id = self._safe_find_text(link_elem, "KategorieID")
-                category_name = self.categories.get(kat_id, f"<Unknown:{kat_id}>")
-                
-                marked = "No"
-                child_item_id = self.tree.insert(
-                    group_item_id,
-                    "end",
-                    text="",
-                    values=(orig_url, category_name, marked)
-                )
-                self.link_to_tree_id[link_elem] = child_item_id
-
-    # --------------------------------------------------------------------------
-    # 2B. POPULATING THE TREE (EXPLORER)
-    # --------------------------------------------------------------------------
-    def _populate_explorer_tree(self):
-        links_by_cat = {}
-        for link_elem in self.xml_root.findall("Links"):
-            cat_id = self._safe_find_text(link_elem, "KategorieID")
-            if cat_id not in links_by_cat:
-                links_by_cat[cat_id] = []
-            links_by_cat[cat_id].append(link_elem)
-
-        for cat_id, cat_name in self.categories.items():
-            cat_item_id = self.explorer_tree.insert(
-                "", 
-                "end", 
-                text=cat_name, 
-                values=("", ""),
-                open=False
-            )
-            if cat_id in links_by_cat:
-                for link_elem in links_by_cat[cat_id]:
-                    url = self._safe_find_text(link_elem, "URL")
-                    title_text = self._safe_find_text(link_elem, "Title")
-                    if not title_text:
-                        title_text = url
-
-                    # NEW: gather tags
-                    tags_set = self._get_tags_for_link_elem(link_elem)
-                    tags_str = ", ".join(sorted(tags_set))
-
-                    self.explorer_tree.insert(
-                        cat_item_id,
-                        "end",
-                        text=title_text,
-                        # Now store URL as first column, tags as second
-                        values=(url, tags_str)
-                    )
-
-        if self.last_added_category_name:
-            self._expand_category_by_name(self.last_added_category_name)
-            self.last_added_category_name = None
-
-    def _expand_category_by_name(self, cat_name):
-        for item in self.explorer_tree.get_children():
-            if self.explorer_tree.item(item, "text") == cat_name:
-                self.explorer_tree.item(item, open=True)
-                break
-
-    def _safe_find_text(self, elem, tag):
-        child = elem.find(tag)
-        return child.text.strip() if (child is not None and child.text) else ""
-
-    # --------------------------------------------------------------------------
-    # 3. EVENT HANDLING - DEDUPER
-    # --------------------------------------------------------------------------
-    def on_tree_select(self, event):
-        selected = self.tree.selection()
-        if not selected:
-            self.current_selected_link = None
-            self.btn_apply_category.config(state=tk.DISABLED)
-            return
-        
-        sel_item = selected[0]
-        parent = self.tree.parent(sel_item)
-        
-        if not parent:
-            self.current_selected_link = None
-            self.btn_apply_category.config(state=tk.DISABLED)
-            return
-        
-        link_elem = self._find_link_by_tree_item(sel_item)
-        if link_elem:
-            self.current_selected_link = link_elem
-            kat_id = self._safe_find_text(link_elem, "KategorieID")
-            cat_name = self.categories.get(kat_id, f"<Unknown:{kat_id}>")
-            
-            all_values = list(self.category_combo["values"])
-            if cat_name not in all_values:
-                all_values.append(cat_name)
-                self.category_combo.config(values=all_values)
-            try:
-                self.category_combo.current(all_values.index(cat_name))
-            except ValueError:
-                self.category_combo.current(0)
-            
-            self.btn_apply_category.config(state=tk.NORMAL)
-        else:
-            self.current_selected_link = None
-            self.btn_apply_category.config(state=tk.DISABLED)
-
-    def on_tree_double_click(self, event):
-        item_id = self.tree.focus()
-        if not item_id:
-            return
-        parent = self.tree.parent(item_id)
-        if not parent:
-            return
-        current_vals = list(self.tree.item(item_id, "values"))
-        marked = current_vals[-1]
-        new_marked = "No" if marked == "Yes" else "Yes"
-        current_vals[-1] = new_marked
-        self.tree.item(item_id, values=current_vals)
-        self.status_label.config(text=f"Marked toggled to '{new_marked}'.")
-
-    def _find_link_by_tree_item(self, item_id):
-        for link_elem, tid in self.link_to_tree_id.items():
-            if tid == item_id:
-                return link_elem
-        return None
-
-    # --------------------------------------------------------------------------
-    # 4. CATEGORY REASSIGNMENT (DEDUPER)
-    # --------------------------------------------------------------------------
-    def apply_category(self):
-        if not self.current_selected_link:
-            return
-        
-        new_cat_name = self.category_combo.get()
-        cat_id = None
-        for k, v in self.categories.items():
-            if v == new_cat_name:
-                cat_id = k
-                break
-        if cat_id is None:
-            cat_id = self._create_new_category(new_cat_name)
-
-        katid_elem = self.current_selected_link.find("KategorieID")
-        if katid_elem is None:
-            katid_elem = ET.SubElement(self.current_selected_link, "KategorieID")
-        katid_elem.text = cat_id
-        
-        item_id = self.link_to_tree_id[self.current_selected_link]
-        vals = list(self.tree.item(item_id, "values"))
-        vals[1] = new_cat_name
-        self.tree.item(item_id, values=vals)
-        
-        # Rebuild Explorer
-        for child in self.explorer_tree.get_children():
-            self.explorer_tree.delete(child)
-        self._populate_explorer_tree()
-
-        self.status_label.config(text=f"Category changed to '{new_cat_name}'.")
-
-    def _create_new_category(self, cat_name):
-        new_id = self._generate_new_category_id()
-        cat_elem = ET.SubElement(self.xml_root, "Kategorien")
-        
-        cat_id_elem = ET.SubElement(cat_elem, "ID")
-        cat_id_elem.text = str(new_id)
-        cat_name_elem = ET.SubElement(cat_elem, "Kategorie")
-        cat_name_elem.text = cat_name
-
-        self.categories[str(new_id)] = cat_name
-        return str(new_id)
-
-    def _generate_new_category_id(self):
-        existing_ids = []
-        for cid in self.categories:
-            try:
-                existing_ids.append(int(cid))
-            except ValueError:
-                pass
-        if not existing_ids:
-            return 1
-        else:
-            return max(existing_ids) + 1
-
-    # --------------------------------------------------------------------------
-    # 5. MARKING, UNMARKING, REMOVING (DEDUPER)
-    # --------------------------------------------------------------------------
-    def mark_all_but_one(self):
-        group_count = 0
-        for group_item in self.tree.get_children():
-            child_items = self.tree.get_children(group_item)
-            if len(child_items) > 1:
-                group_count += 1
-                for child_item in child_items[1:]:
-                    vals = list(self.tree.item(child_item, "values"))
-                    vals[-1] = "Yes"
-                    self.tree.item(child_item, values=vals)
-        self.status_label.config(text=f"Marked duplicates in {group_count} group(s).")
-
-    def unmark_selected(self):
-        selected = self.tree.selection()
-        unmarked_count = 0
-        for item_id in selected:
-            parent = self.tree.parent(item_id)
-            if parent:
-                vals = list(self.tree.item(item_id, "values"))
-                if vals[-1] == "Yes":
-                    vals[-1] = "No"
-                    self.tree.item(item_id, values=vals)
-                    unmarked_count += 1
-        self.status_label.config(text=f"Unmarked {unmarked_count} selected item(s).")
-
-    def remove_marked(self):
-        if not self.xml_root:
-            return
-        
-        removed_count = 0
-        for group_item in self.tree.get_children():
-            for child_item in self.tree.get_children(group_item):
-                vals = self.tree.item(child_item, "values")
-                if vals[-1] == "Yes":
-                    link_elem = self._find_link_by_tree_item(child_item)
-                    if link_elem is not None:
-                        self.xml_root.remove(link_elem)
-                        removed_count += 1
-                    self.tree.delete(child_item)
-        
-        # Rebuild Explorer
-        for child in self.explorer_tree.get_children():
-            self.explorer_tree.delete(child)
-        self._populate_explorer_tree()
-
-        self.status_label.config(text=f"Removed {removed_count} marked item(s).")
-
-    # --------------------------------------------------------------------------
-    # 6. EXPAND/COLLAPSE, SAVE (DEDUPER)
-    # --------------------------------------------------------------------------
-    def expand_collapse_all(self, expand=True):
-        for group_item in self.tree.get_children():
-            self.tree.item(group_item, open=expand)
-        if expand:
-            self.status_label.config(text="All groups expanded.")
-        else:
-            self.status_label.config(text="All groups collapsed.")
-
-    def save_xml(self):
-        if not self.xml_tree or not self.xml_root:
-            return
-        
-        file_path = filedialog.asksaveasfilename(
-            title="Save Cleaned XML",
-            defaultextension=".xml",
-            filetypes=[("XML Files", "*.xml"), ("All Files", "*.*")]
-        )
-        if not file_path:
-            return
-        
-        try:
-            self.xml_tree.write(file_path, encoding="utf-8", xml_declaration=True)
-            messagebox.showinfo("Saved", f"Saved cleaned XML to {file_path}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not save file:\n{e}")
-
-    # --------------------------------------------------------------------------
-    # 7. EXPLORER TAB: SELECTION + CATEGORY MGMT
-    # --------------------------------------------------------------------------
-    def on_explorer_select(self, event):
-        pass
-
-    def add_category(self):
-        new_name = self._prompt_for_text("New Category Name")
-        if not new_name:
-            return
-        
-        cat_id = self._create_new_category(new_name)
-        self._populate_category_combo()
-        for child in self.explorer_tree.get_children():
-            self.explorer_tree.delete(child)
-        self._populate_explorer_tree()
-
-        self.status_label.config(text=f"Added new category '{new_name}' (ID={cat_id}).")
-
-    def rename_category(self):
-        sel_items = self.explorer_tree.selection()
-        if not sel_items:
-            return
-        
-        item_id = sel_items[0]
-        parent = self.explorer_tree.parent(item_id)
-        if parent:
-            messagebox.showinfo("Info", "Please select a category to rename.")
-            return
-
-        old_name = self.explorer_tree.item(item_id, "text")
-        cat_id = self._find_category_id_by_name(old_name)
-        if not cat_id:
-            messagebox.showwarning("Warning", "Could not determine category ID for this category.")
-            return
-
-        new_name = self._prompt_for_text("New Category Name", default_value=old_name)
-        if not new_name or new_name == old_name:
-            return
-
-        self._rename_category_in_xml(cat_id, new_name)
-        self.categories[cat_id] = new_name
-
-        self._populate_category_combo()
-        for child in self.explorer_tree.get_children():
-            self.explorer_tree.delete(child)
-        self._populate_explorer_tree()
-
-        self.status_label.config(text=f"Renamed category '{old_name}' to '{new_name}'.")
-
-    def remove_category(self):
-        sel_items = self.explorer_tree.selection()
-        if not sel_items:
-            return
-        
-        item_id = sel_items[0]
-        parent = self.explorer_tree.parent(item_id)
-        if parent:
-            messagebox.showinfo("Info", "Please select a category to remove.")
-            return
-        
-        cat_name = self.explorer_tree.item(item_id, "text")
-        cat_id = self._find_category_id_by_name(cat_name)
-        if not cat_id:
-            messagebox.showwarning("Warning", "Could not determine category ID for this category.")
-            return
-
-        confirm = messagebox.askyesno("Confirm", 
-            f"Remove category '{cat_name}' (ID={cat_id}) and all associated bookmarks?")
-        if not confirm:
-            return
-        
-        cat_elem = self._find_category_elem_by_id(cat_id)
-        if cat_elem is not None:
-            self.xml_root.remove(cat_elem)
-        
-        removed_links_count = 0
-        for link_elem in list(self.xml_root.findall("Links")):
-            kid = self._safe_find_text(link_elem, "KategorieID")
-            if kid == cat_id:
-                self.xml_root.remove(link_elem)
-                removed_links_count += 1
-
-        if cat_id in self.categories:
-            del self.categories[cat_id]
-
-        self._populate_category_combo()
-        for child in self.explorer_tree.get_children():
-            self.explorer_tree.delete(child)
-        self._populate_explorer_tree()
-
-        # Rebuild deduper
-        for child in self.tree.get_children():
-            self.tree.delete(child)
-        self.links_by_group.clear()
-        self.group_ids.clear()
-        self.link_to_tree_id.clear()
-        self._group_links()
-        self._populate_deduper_tree()
-
-        self.status_label.config(
-            text=f"Removed category '{cat_name}' and {removed_links_count} associated bookmark(s)."
-        )
-
-    # --------------------------------------------------------------------------
-    # 8. EXPLORER TAB: ADDING BOOKMARKS (with Enhanced Title Extraction)
-    # --------------------------------------------------------------------------
-    def add_bookmark(self):
-        url = self.new_url_entry.get().strip()
-        if not url:
-            messagebox.showinfo("Info", "Please enter a valid URL.")
-            return
-        
-        cat_name = self.new_bmk_cat_combo.get()
-        cat_id = None
-        for k, v in self.categories.items():
-            if v == cat_name:
-                cat_id = k
-                break
-        if cat_id is None:
-            cat_id = self._create_new_category(cat_name)
-
-        title_text = self._extract_title_from_url(url)
-        if not title_text:
-            title_text = url
-
-        link_elem = ET.SubElement(self.xml_root, "Links")
-        
-        new_link_id = self._generate_new_link_id()
-        id_elem = ET.SubElement(link_elem, "ID")
-        id_elem.text = str(new_link_id)
-        
-        url_elem = ET.SubElement(link_elem, "URL")
-        url_elem.text = url
-        
-        katid_elem = ET.SubElement(link_elem, "KategorieID")
-        katid_elem.text = str(cat_id)
-
-        title_elem = ET.SubElement(link_elem, "Title")
-        title_elem.text = title_text
-
-        # Also create <Tags> sub-element
-        tags_elem = ET.SubElement(link_elem, "Tags")
-        tags_elem.text = ""
-
-        self.last_added_category_name = cat_name
-        for child in self.explorer_tree.get_children():
-            self.explorer_tree.delete(child)
-        self._populate_explorer_tree()
-
-        # Rebuild deduper
-        for child in self.tree.get_children():
-            self.tree.delete(child)
-        self.links_by_group.clear()
-        self.group_ids.clear()
-        self.link_to_tree_id.clear()
-        self._group_links()
-        self._populate_deduper_tree()
-
-        self.status_label.config(text=f"Added new bookmark (URL='{url}', Category='{cat_name}').")
-        self.new_url_entry.delete(0, tk.END)
-
-    def _generate_new_link_id(self):
-        existing_ids = []
-        for link_elem in self.xml_root.findall("Links"):
-            link_id_text = self._safe_find_text(link_elem, "ID")
-            if link_id_text.isdigit():
-                existing_ids.append(int(link_id_text))
-        if not existing_ids:
-            return 1
-        return max(existing_ids) + 1
-
-    def _extract_title_from_url(self, url):
-        try:
-            if not url.startswith(("http://", "https://")):
-                url = "http://" + url
-
-            resp = requests.get(url, timeout=5)
-            if resp.status_code == 200:
-                match = re.search(r"<title>(.*?)</title>", resp.text, re.IGNORECASE | re.DOTALL)
-                if match:
-                    raw_title = match.group(1).strip()
-                    decoded_title = html.unescape(raw_title)
-                    final_title = urllib.parse.unquote(decoded_title)
-                    return final_title
-        except Exception:
-            pass
-        return ""
-
-    # --------------------------------------------------------------------------
-    # 9. EXPLORER TAB: SORTING CATEGORIES/BOOKMARKS
-    # --------------------------------------------------------------------------
-    def sort_categories(self):
-        top_items = self.explorer_tree.get_children("")
-        cat_list = []
-        for itm in top_items:
-            cat_name = self.explorer_tree.item(itm, "text")
-            cat_list.append((cat_name, itm))
-        cat_list.sort(key=lambda x: x[0].lower())
-
-        for idx, (cat_name, itm) in enumerate(cat_list):
-            self.explorer_tree.move(itm, "", idx)
-
-        self.status_label.config(text="Sorted categories by title.")
-
-    def sort_bookmarks(self):
-        top_items = self.explorer_tree.get_children("")
-        for cat_item in top_items:
-            children = self.explorer_tree.get_children(cat_item)
-            bookmark_list = []
-            for child_id in children:
-                # URL is index=0 in .item(...,"values")
-                url_val = self.explorer_tree.item(child_id, "values")[0]
-                bookmark_list.append((url_val, child_id))
-            bookmark_list.sort(key=lambda x: x[0].lower())
-
-            for idx, (url_val, c_id) in enumerate(bookmark_list):
-                self.explorer_tree.move(c_id, cat_item, idx)
-
-        self.status_label.config(text="Sorted bookmarks by URL.")
-
-    # --------------------------------------------------------------------------
-    #  DRAG & DROP (EXPLORER)
-    # --------------------------------------------------------------------------
-    def toggle_drag_drop(self):
-        self.drag_mode = not self.drag_mode
-        if self.drag_mode:
-            self.drag_drop_btn.configure(text="Disable Drag & Drop")
-            self.status_label.config(text="Drag & Drop mode enabled. Select bookmarks and drag them to another category.")
-        else:
-            self.drag_drop_btn.configure(text="Enable Drag & Drop")
-            self.status_label.config(text="Drag & Drop mode disabled.")
-
-    def on_tree_button_press(self, event):
-        if not self.drag_mode:
-            return
-        item_id = self.explorer_tree.identify_row(event.y)
-        if not item_id:
-            return
-        sel = self.explorer_tree.selection()
-        self.dragging_items = []
-        for s in sel:
-            parent = self.explorer_tree.parent(s)
-            if parent:
-                self.dragging_items.append(s)
-        if self.dragging_items:
-            self._show_drag_tooltip(len(self.dragging_items), event.x_root, event.y_root)
-
-    def on_tree_motion(self, event):
-        if not self.drag_mode or not self.dragging_items:
-            return
-        self._move_drag_tooltip(event.x_root, event.y_root)
-
-    def on_tree_button_release(self, event):
-        if not self.drag_mode or not self.dragging_items:
-            self._hide_drag_tooltip()
-            return
-
-        drop_item_id = self.explorer_tree.identify_row(event.y)
-        if not drop_item_id:
-            self._hide_drag_tooltip()
-            self.dragging_items = None
-            return
-
-        parent = self.explorer_tree.parent(drop_item_id)
-        if parent:
-            new_category_item = parent
-        else:
-            new_category_item = drop_item_id
-
-        cat_name = self.explorer_tree.item(new_category_item, "text")
-        cat_id = self._find_category_id_by_name(cat_name)
-
-        for bm_item in self.dragging_items:
-            old_parent = self.explorer_tree.parent(bm_item)
-            if old_parent != new_category_item:
-                self.explorer_tree.move(bm_item, new_category_item, 'end')
-
-                url_val = self.explorer_tree.item(bm_item, "values")[0]
-                bookmark_title = self.explorer_tree.item(bm_item, "text")
-                link_elem = self._find_link_elem_by_url_and_title(url_val, bookmark_title, old_parent)
-                if link_elem is not None:
-                    if cat_id is None:
-                        cat_id = self._create_new_category(cat_name)
-                    katid_elem = link_elem.find("KategorieID")
-                    if katid_elem is None:
-                        katid_elem = ET.SubElement(link_elem, "KategorieID")
-                    katid_elem.text = str(cat_id)
-
-        self._hide_drag_tooltip()
-        self.dragging_items = None
-        self.status_label.config(text=f"Moved bookmark(s) to '{cat_name}' category.")
-
-    def _find_link_elem_by_url_and_title(self, url, title, old_parent_item):
-        old_parent_cat_name = self.explorer_tree.item(old_parent_item, "text")
-        old_cat_id = self._find_category_id_by_name(old_parent_cat_name)
-
-        for link_elem in self.xml_root.findall("Links"):
-            kid = self._safe_find_text(link_elem, "KategorieID")
-            if kid == old_cat_id:
-                link_url = self._safe_find_text(link_elem, "URL")
-                link_title = self._safe_find_text(link_elem, "Title")
-                if not link_title:
-                    link_title = link_url
-
-                if link_url == url and link_title == title:
-                    return link_elem
-        return None
-
-    def _show_drag_tooltip(self, count, x, y):
-        if not self.drag_tooltip:
-            self.drag_tooltip = tk.Toplevel(self.master)
-            self.drag_tooltip.overrideredirect(True)
-            self.drag_tooltip_label = tk.Label(self.drag_tooltip, bg="lightyellow", bd=1, relief="solid")
-            self.drag_tooltip_label.pack()
-        text = f"{count} item(s) selected"
-        self.drag_tooltip_label.config(text=text)
-        self._move_drag_tooltip(x, y)
-        self.drag_tooltip.deiconify()
-
-    def _move_drag_tooltip(self, x, y):
-        if self.drag_tooltip:
-            self.drag_tooltip.geometry(f"+{x+12}+{y+12}")
-
-    def _hide_drag_tooltip(self):
-        if self.drag_tooltip:
-            self.drag_tooltip.withdraw()
-
-    # --------------------------------------------------------------------------
-    #  HELPER METHODS - CATEGORY UTILS
-    # --------------------------------------------------------------------------
-    def _find_category_id_by_name(self, cat_name):
-        for cid, cname in self.categories.items():
-            if cname == cat_name:
-                return cid
-        return None
-
-    def _find_category_elem_by_id(self, cat_id):
-        for cat_elem in self.xml_root.findall("Kategorien"):
-            cid = self._safe_find_text(cat_elem, "ID")
-            if cid == cat_id:
-                return cat_elem
-        return None
-
-    def _rename_category_in_xml(self, cat_id, new_name):
-        cat_elem = self._find_category_elem_by_id(cat_id)
-        if cat_elem is None:
-            return
-        cat_name_elem = cat_elem.find("Kategorie")
-        if cat_name_elem is not None:
-            cat_name_elem.text = new_name
-
-    # --------------------------------------------------------------------------
-    #  SMALL UTILITY FOR TEXT PROMPT
-    # --------------------------------------------------------------------------
-    def _prompt_for_text(self, title, default_value=""):
-        dialog = tk.Toplevel(self.master)
-        dialog.title(title)
-        dialog.transient(self.master)
-        dialog.grab_set()
-
-        tk.Label(dialog, text=title).pack(padx=10, pady=(10,0))
-
-        entry_var = tk.StringVar(value=default_value)
-        entry = tk.Entry(dialog, textvariable=entry_var, width=40)
-        entry.pack(padx=10, pady=(0,10))
-        entry.focus()
-
-        result = [None]
-        
-        def on_ok():
-            result[0] = entry_var.get().strip()
-            dialog.destroy()
-        def on_cancel():
-            result[0] = None
-            dialog.destroy()
-
-        btn_frame = tk.Frame(dialog)
-        btn_frame.pack(pady=(0,10))
-        
-        ok_btn = tk.Button(btn_frame, text="OK", command=on_ok)
-        ok_btn.pack(side=tk.LEFT, padx=5)
-        cancel_btn = tk.Button(btn_frame, text="Cancel", command=on_cancel)
-        cancel_btn.pack(side=tk.LEFT, padx=5)
-
-        dialog.wait_window()
-        return result[0]
-
-    # --------------------------------------------------------------------------
-    #  COPY & DELETE SELECTED BOOKMARKS
-    # --------------------------------------------------------------------------
-    def copy_selected_bookmark_url(self):
-        sel = self.explorer_tree.selection()
-        if not sel:
-            return
-        
-        urls_to_copy = []
-        for item_id in sel:
-            parent = self.explorer_tree.parent(item_id)
-            if parent:
-                url_val = self.explorer_tree.item(item_id, "values")[0]
-                urls_to_copy.append(url_val)
-        if not urls_to_copy:
-            self.status_label.config(text="No bookmarks selected to copy.")
-            return
-
-        clip_text = "\n".join(urls_to_copy)
-        self.master.clipboard_clear()
-        self.master.clipboard_append(clip_text)
-        self.status_label.config(text=f"Copied {len(urls_to_copy)} URL(s) to clipboard.")
-
-    def delete_selected_bookmarks(self):
-        sel = self.explorer_tree.selection()
-        if not sel:
-            return
-
-        delete_count = 0
-        for item_id in sel:
-            parent = self.explorer_tree.parent(item_id)
-            if parent:
-                url_val = self.explorer_tree.item(item_id, "values")[0]
-                bookmark_title = self.explorer_tree.item(item_id, "text")
-
-                link_elem = self._find_link_elem_by_url_and_title(url_val, bookmark_title, parent)
-                if link_elem is not None:
-                    self.xml_root.remove(link_elem)
-                    delete_count += 1
-
-                self.explorer_tree.delete(item_id)
-
-        if delete_count > 0:
-            for child in self.tree.get_children():
-                self.tree.delete(child)
-            self.links_by_group.clear()
-            self.group_ids.clear()
-            self.link_to_tree_id.clear()
-            self._group_links()
-            self._populate_deduper_tree()
-
-        self.status_label.config(text=f"Deleted {delete_count} bookmark(s).")
-
-    # --------------------------------------------------------------------------
-    #  CREATE AN EMPTY XML
-    # --------------------------------------------------------------------------
-    def create_empty_xml(self):
-        file_path = filedialog.asksaveasfilename(
-            title="Create Empty XML",
-            defaultextension=".xml",
-            filetypes=[("XML Files", "*.xml"), ("All Files", "*.*")]
-        )
-        if not file_path:
-            return
-        
-        new_root = ET.Element("SafavorRoot")
-        new_tree = ET.ElementTree(new_root)
-
-        try:
-            new_tree.write(file_path, encoding="utf-8", xml_declaration=True)
-            messagebox.showinfo("Success", f"Empty XML created at: {file_path}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to create file:\n{e}")
-
-    # --------------------------------------------------------------------------
-    #  REFRESH DEDUPER
-    # --------------------------------------------------------------------------
-    def refresh_deduper(self):
-        for child in self.tree.get_children():
-            self.tree.delete(child)
-        self.links_by_group.clear()
-        self.group_ids.clear()
-        self.link_to_tree_id.clear()
-        self.current_selected_link = None
-
-        self._group_links()
-        self._populate_deduper_tree()
-
-        self.status_label.config(text="Deduper tab refreshed with latest changes from Explorer.")
-
-    # --------------------------------------------------------------------------
-    #  TAGGING HELPER METHODS
-    # --------------------------------------------------------------------------
-    def _get_tags_for_link_elem(self, link_elem):
-        tags_elem = link_elem.find("Tags")
-        if tags_elem is None or not tags_elem.text:
-            return set()
-        raw = tags_elem.text.strip()
-        return set(t.strip() for t in raw.split(",") if t.strip())
-
-    def _set_tags_for_link_elem(self, link_elem, tags_set):
-        tags_elem = link_elem.find("Tags")
-        if tags_elem is None:
-            tags_elem = ET.SubElement(link_elem, "Tags")
-        tags_elem.text = ",".join(sorted(tags_set))
-
-    # --------------------------------------------------------------------------
-    #  ADD / REMOVE TAGS
-    # --------------------------------------------------------------------------
-    def add_tags_to_selected(self):
-        sel = self.explorer_tree.selection()
-        if not sel:
-            return
-
-        tags_input = self._prompt_for_text("Enter one or more tags (comma-separated)")
-        if not tags_input:
-            return
-
-        new_tags = set(t.strip() for t in tags_input.split(",") if t.strip())
-
-        updated_count = 0
-        for item_id in sel:
-            parent = self.explorer_tree.parent(item_id)
-            if parent:  # It's a bookmark
-                url_val = self.explorer_tree.item(item_id, "values")[0]
-                bookmark_title = self.explorer_tree.item(item_id, "text")
-                link_elem = self._find_link_elem_by_url_and_title(url_val, bookmark_title, parent)
-                if link_elem is not None:
-                    # 1. Update the XML <Tags> element
-                    current_tags = self._get_tags_for_link_elem(link_elem)
-                    updated_tags = current_tags.union(new_tags)
-                    self._set_tags_for_link_elem(link_elem, updated_tags)
-                    
-                    # 2. Update the Explorer Tree “Tags” column in-place
-                    tags_str = ", ".join(sorted(updated_tags))
-                    # The Explorer’s columns are (URL, Tags), so index 1 is the Tags column
-                    old_vals = list(self.explorer_tree.item(item_id, "values"))
-                    old_vals[1] = tags_str
-                    self.explorer_tree.item(item_id, values=old_vals)
-
-                    # 3. If the filter is on, check if we need to detach/reinsert
-                    if self.filter_mode:
-                        if self._bookmark_matches_filter(updated_tags):
-                            # If it was hidden but now qualifies, re-show it
-                            if item_id in [h[0] for h in self.hidden_items]:
-                                self._reinsert_item(item_id)
-                        else:
-                            # If it doesn't match, hide it
-                            if item_id not in [h[0] for h in self.hidden_items]:
-                                self._detach_item(item_id)
-
-                    updated_count += 1
-
-        self.status_label.config(text=f"Added tags to {updated_count} bookmark(s).")
-
-
-    def remove_tags_from_selected(self):
-        sel = self.explorer_tree.selection()
-        if not sel:
-            return
-
-        tags_input = self._prompt_for_text("Enter one or more tags to remove (comma-separated)")
-        if not tags_input:
-            return
-
-        remove_tags = set(t.strip() for t in tags_input.split(",") if t.strip())
-
-        updated_count = 0
-        for item_id in sel:
-            parent = self.explorer_tree.parent(item_id)
-            if parent:  # It's a bookmark
-                url_val = self.explorer_tree.item(item_id, "values")[0]
-                bookmark_title = self.explorer_tree.item(item_id, "text")
-                link_elem = self._find_link_elem_by_url_and_title(url_val, bookmark_title, parent)
-                if link_elem is not None:
-                    # 1. Update the XML <Tags> element
-                    current_tags = self._get_tags_for_link_elem(link_elem)
-                    updated_tags = current_tags - remove_tags
-                    self._set_tags_for_link_elem(link_elem, updated_tags)
-
-                    # 2. Update the Explorer Tree “Tags” column in-place
-                    tags_str = ", ".join(sorted(updated_tags))
-                    old_vals = list(self.explorer_tree.item(item_id, "values"))
-                    old_vals[1] = tags_str  # tags are in second column
-                    self.explorer_tree.item(item_id, values=old_vals)
-
-                    # 3. If filter is on, check if we need to detach/reinsert
-                    if self.filter_mode:
-                        if self._bookmark_matches_filter(updated_tags):
-                            if item_id in [h[0] for h in self.hidden_items]:
-                                self._reinsert_item(item_id)
-                        else:
-                            if item_id not in [h[0] for h in self.hidden_items]:
-                                self._detach_item(item_id)
-
-                    updated_count += 1
-
-        self.status_label.config(text=f"Removed tags from {updated_count} bookmark(s).")
-
-
-    # --------------------------------------------------------------------------
-    #  TOGGLE FILTER BY TAG
-    # --------------------------------------------------------------------------
-    def toggle_filter_by_tag(self):
-        if not self.filter_mode:
-            tags_input = self._prompt_for_text("Enter tag(s) to filter by (comma-separated)")
-            if not tags_input:
-                return
-            self.filter_tags = set(t.strip() for t in tags_input.split(",") if t.strip())
-            self.filter_mode = True
-            self.btn_filter_by_tag.config(text="Disable Filter by Tag")
-            self._apply_filter()
-            self.status_label.config(text=f"Filter ON. Showing only bookmarks that have all tags: {', '.join(self.filter_tags)}")
-        else:
-            self.filter_mode = False
-            self.filter_tags.clear()
-            self.btn_filter_by_tag.config(text="Enable Filter by Tag")
-            self._restore_hidden_items()
-            self.hidden_items.clear()
-            self.status_label.config(text="Filter OFF. Restored all bookmarks.")
-
-    def _apply_filter(self):
-        self.hidden_items.clear()
-        top_items = self.explorer_tree.get_children("")
-        for cat_item in top_items:
-            bookmark_children = self.explorer_tree.get_children(cat_item)
-            match_count = 0
-            for bm_item in bookmark_children:
-                url_val = self.explorer_tree.item(bm_item, "values")[0]
-                bookmark_title = self.explorer_tree.item(bm_item, "text")
-                link_elem = self._find_link_elem_by_url_and_title(url_val, bookmark_title, cat_item)
-                if link_elem is not None:
-                    tags_set = self._get_tags_for_link_elem(link_elem)
-                    if self._bookmark_matches_filter(tags_set):
-                        match_count += 1
-                    else:
-                        self._detach_item(bm_item)
-                else:
-                    self._detach_item(bm_item)
-
-            if match_count == 0:
-                self._detach_item(cat_item)
-
-    def _bookmark_matches_filter(self, bookmark_tags):
-        return self.filter_tags.issubset(bookmark_tags)
-
-    def _detach_item(self, item_id):
-        parent_id = self.explorer_tree.parent(item_id)
-        index_in_parent = self.explorer_tree.index(item_id)
-        self.hidden_items.append((item_id, parent_id, index_in_parent))
-        self.explorer_tree.detach(item_id)
-
-    def _reinsert_item(self, item_id):
-        record = None
-        for h in self.hidden_items:
-            if h[0] == item_id:
-                record = h
-                break
-        if not record:
-            return
-        (itm, parent_id, index_in_parent) = record
-        self.explorer_tree.move(itm, parent_id, index_in_parent)
-        self.hidden_items.remove(record)
-
-    def _restore_hidden_items(self):
-        self.hidden_items.sort(key=lambda x: (x[1], x[2]))
-        for (itm, parent_id, index_in_parent) in self.hidden_items:
-            self.explorer_tree.move(itm, parent_id, index_in_parent)
-
-# --------------------------------------------------------------------------
-#  MAIN
-# --------------------------------------------------------------------------
-def main():
-    root = tk.Tk()
-    root.geometry("1200x700")
-    app = SafavorCleanerApp(root)
-    root.mainloop()
-
-if __name__ == "__main__":
-    main()
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+import xml.etree.ElementTree as ET
+import bisect
+import os
+import sqlite3
+import tempfile
+import time
+from collections import defaultdict, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from bookmark_store import (
+    BookmarkStore, ItemIndex, normalize_url, F_URL, F_TITLE,
+    LINK_ADDED, LINK_REMOVED, LINK_MOVED, LINK_UPDATED, GROUP_CHANGED, GROUPS_REBUILT,
+    CATEGORY_ADDED, CATEGORY_RENAMED, CATEGORY_REMOVED,
+)
+from bookmark_db import BookmarkDB, is_db_path
+from atomic_save import atomic_write
+from change_journal import open_journal
+from model_cache import file_key, load_model, save_model
+import instrumentation
+from workers import UiBridge, BackgroundTask, TaskRegistry
+from ui_scheduler import UiScheduler, PRIORITY_VISIBLE, PRIORITY_BACKGROUND
+from title_fetch import TitleFetcher
+from near_dupes import find_near_duplicates
+from url_canon import CanonPipeline, RULES, DEFAULT_RULES
+from tag_query import TagQuery, TagQueryError, iter_bits
+from search_index import trigrams
+from metadata_cache import MetadataCache, cache_key, DAY
+from link_check import (
+    LinkChecker, health_class,
+    HEALTH_OK, HEALTH_REDIRECTED, HEALTH_CLIENT_ERROR, HEALTH_SERVER_ERROR, HEALTH_UNREACHABLE,
+)
+
+class SafavorCleanerApp:
+    # Explorer link status filter: (combo label, health class). None shows
+    # everything; "" selects links that were never checked.
+    LINK_STATUS_FILTERS = (
+        ("All", None),
+        ("OK", HEALTH_OK),
+        ("Redirected", HEALTH_REDIRECTED),
+        ("Broken (4xx)", HEALTH_CLIENT_ERROR),
+        ("Server error (5xx)", HEALTH_SERVER_ERROR),
+        ("Unreachable", HEALTH_UNREACHABLE),
+        ("Not checked", ""),
+    )
+
+    # Deduper group orderings: (combo label, order key)
+    DEDUPER_ORDERS = (
+        ("Group size", "size"),
+        ("Domain", "domain"),
+        ("URL", "url"),
+    )
+
+    # Deduper modes: (combo label, mode)
+    DEDUPER_MODES = (
+        ("Exact URL", "exact"),
+        ("Near-duplicates", "near"),
+    )
+
+    def __init__(self, master):
+        self.master = master
+        self.master.title("Bookmark Manager")
+
+        # Data structures
+        self.current_path = None
+        
+        # Indexed model of the loaded XML (links, categories, groups, tree items).
+        # Both trees patch themselves from the store's change events.
+        self.store = BookmarkStore()
+        self.store.subscribe(self._on_store_event)
+        # SQLite database the store was opened from, or None for XML. Edits
+        # are written through to it and committed once Tk is idle.
+        self.db = None
+
+        # Unsaved changes: change_count counts store mutations, saved_count
+        # those the last finished save covered. An XML collection is
+        # autosaved autosave_delay_ms after its first unsaved change. Saves
+        # serialize a snapshot on a worker and replace the file atomically,
+        # keeping save_backups older versions.
+        self.change_count = 0
+        self.saved_count = 0
+        self.save_task = None
+        self.save_queued = None
+        self.close_after_save = False
+        self.autosave_var = tk.BooleanVar(value=True)
+        self.autosave_delay_ms = 30000
+        self.autosave_after_id = None
+        self.save_backups = 3
+        # Append-only journal next to an XML collection: edits are durable
+        # as soon as they are journaled, and the journal is folded into the
+        # XML by a background save once it grows past its size limit
+        self.journal = None
+        self.compact_after_id = None
+        
+        # Displayed duplicate group keys in display order (Deduper tab), with a
+        # parallel sorted list of their sort keys so groups can be placed by bisect
+        self.group_ids = []
+        self.group_sort_keys = []
+        self.group_sort_key_of = {}
+        self.deduper_order = "size"
+        # url_canon rule names that decide which URLs count as exact duplicates;
+        # kept across loads
+        self.url_rules = DEFAULT_RULES
+
+        # Near-duplicate mode: the Deduper shows MinHash/LSH clusters instead
+        # of exact groups. Clusters are keyed by a cluster number; each lid
+        # keeps its similarity score against the cluster's first link.
+        self.deduper_mode = "exact"
+        self.near_threshold = 0.7
+        self.near_clusters = {}
+        self.near_cluster_of = {}
+        self.near_cluster_url = {}
+        self.near_scores = {}
+        self.near_task = None
+
+        # map each link (lid) <-> child_item_id, and each group key <-> group item,
+        # in the Deduper TreeView. Group children are only inserted once a group
+        # is opened; until then the group holds a placeholder row.
+        self.deduper_items = ItemIndex()
+        self.deduper_groups = ItemIndex()
+        self.deduper_placeholders = {}
+        self.deduper_materialized = set()
+
+        # Links marked for removal. Kept outside the widget so unopened groups
+        # can be marked too.
+        self.marked_links = set()
+
+        # Keep track of the currently selected link (lid) in the Deduper tab
+        self.current_selected_link = None
+
+        # For Drag & Drop
+        self.drag_mode = False
+        self.dragging_items = None  # list of selected item IDs
+        self.drag_tooltip = None
+        self.drag_tooltip_label = None
+
+        # TAG/FILTER: the parsed tag query and the lids matching it, kept
+        # current from store events while the filter is on
+        self.filter_mode = False
+        self.filter_query = None
+        self.filter_matches = set()
+        # Detached Explorer items: item_id -> (parent_id, index_in_parent)
+        self.hidden_items = {}
+
+        # Lazy Explorer: categories whose bookmark rows exist in the tree, in
+        # least-recently-opened order, and placeholder rows of the others
+        self.materialized_categories = OrderedDict()
+        self.explorer_placeholders = {}
+        self.max_materialized_rows = 20000
+        self.bookmark_sort_by_url = False
+
+        # Background work (loading, saving, fetching, checking, indexing)
+        # runs on a shared thread pool and reports back through the bridge.
+        # Running tasks are listed in the registry, which drives the task
+        # area: one progress bar and Cancel button for all of them.
+        self.bridge = UiBridge(self.master)
+        self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="worker")
+        self.tasks = TaskRegistry(on_change=self._show_tasks)
+        self.load_task = None
+
+        # Large tree fills (both trees' headers, opened categories, expand
+        # all) run in time slices between repaints; see ui_scheduler
+        self.scheduler = UiScheduler(self.master)
+
+        # Page titles are fetched on a worker pool; results come back through
+        # the bridge and are applied to the store
+        self.title_fetcher = TitleFetcher()
+        self.title_task = None
+        self.metadata_cache = None
+
+        # Link health: results by cache_key(url), restored from the metadata
+        # cache on load. Links checked within link_recheck_after are skipped,
+        # which is what lets an interrupted run resume.
+        self.link_checker = LinkChecker()
+        self.link_check_task = None
+        self.link_health = {}
+        self.link_recheck_after = DAY
+        self.status_filter = None
+
+        # Search: the store's trigram index is built on a worker after each
+        # load. Typing is debounced by search_delay_ms; the best
+        # search_limit hits are kept and revealed one at a time.
+        self.search_index_task = None
+        self.search_after_id = None
+        self.search_delay_ms = 150
+        self.search_limit = 200
+        self.search_results = []
+        self.search_pos = 0
+        self.search_summary = ""
+
+        # Developer instrumentation, toggled with F12: user actions and
+        # background tasks are timed with their counters, and the last of
+        # each is shown under the status bar. Shift+F12 cycles per-action
+        # profiling. Spans are logged, and captures written, to
+        # instrumentation_dir.
+        self.instrumentation_dir = os.path.join(tempfile.gettempdir(), "bookmark-manager-instrumentation")
+        self.instrumentation_profiler = None
+        self.instrumenting = False
+        self.last_spans = {}
+        self.master.bind("<F12>", self.toggle_instrumentation)
+        self.master.bind("<Shift-F12>", self.cycle_profiler)
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # -------------
+        # UI: NOTEBOOK
+        # -------------
+        self.notebook = ttk.Notebook(self.master)
+        self.notebook.pack(fill=tk.BOTH, expand=True)
+
+        # Top-level toolbar (common for both tabs)
+        self._build_top_toolbar()
+
+        # ============================
+        # TAB 1: EXPLORER (FIRST)
+        # ============================
+        self.explorer_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.explorer_frame, text="Explorer")
+
+        self._build_explorer_tab()
+
+        # ============================
+        # TAB 2: DEDUPER (SECOND)
+        # ============================
+        self.deduper_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.deduper_frame, text="Deduper")
+        
+        self._build_deduper_tab()
+
+        # Task area, packed above the status label while tasks run
+        self.task_frame = tk.Frame(self.master)
+        self.task_label = tk.Label(self.task_frame, text="", anchor="w")
+        self.task_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.btn_cancel_task = tk.Button(self.task_frame, text="Cancel", command=self.cancel_current_task)
+        self.btn_cancel_task.pack(side=tk.RIGHT, padx=(5, 0))
+        self.task_progress = ttk.Progressbar(self.task_frame, length=200, maximum=1.0)
+        self.task_progress.pack(side=tk.RIGHT)
+
+        # Status label (bottom)
+        self.status_label = tk.Label(self.master, text="Load an XML file to begin.")
+        self.status_label.pack(pady=(0, 5))
+        # Developer overlay, packed while instrumentation is on
+        self.instrumentation_label = tk.Label(self.master, anchor="w", fg="gray30", font="TkFixedFont")
+
+    # --------------------------------------------------------------------------
+    #  UI BUILDERS
+    # --------------------------------------------------------------------------
+    def _build_top_toolbar(self):
+        """Build the top row of buttons that are always visible."""
+        self.top_frame = tk.Frame(self.master)
+        self.top_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        # Load & Save
+        self.btn_load = tk.Button(self.top_frame, text="Open...", command=self.load_xml)
+        self.btn_load.pack(side=tk.LEFT, padx=(0, 5))
+
+        self.btn_import_db = tk.Button(self.top_frame, text="Import XML to Database...", command=self.import_to_db)
+        self.btn_import_db.pack(side=tk.LEFT, padx=5)
+
+        self.btn_cancel_load = tk.Button(self.top_frame, text="Cancel Load", command=self.cancel_load, state=tk.DISABLED)
+        self.btn_cancel_load.pack(side=tk.LEFT, padx=5)
+        
+        self.btn_save = tk.Button(self.top_frame, text="Save", command=self.save_xml, state=tk.DISABLED)
+        self.btn_save.pack(side=tk.LEFT, padx=5)
+
+        self.btn_save_as = tk.Button(self.top_frame, text="Save As...", command=self.save_xml_as, state=tk.DISABLED)
+        self.btn_save_as.pack(side=tk.LEFT, padx=5)
+
+        self.chk_autosave = tk.Checkbutton(
+            self.top_frame, text="Autosave", variable=self.autosave_var, command=self.on_autosave_toggled
+        )
+        self.chk_autosave.pack(side=tk.LEFT, padx=5)
+
+        # Create Empty XML
+        self.btn_create_empty_xml = tk.Button(self.top_frame, text="Create Empty XML", command=self.create_empty_xml)
+        self.btn_create_empty_xml.pack(side=tk.LEFT, padx=5)
+
+    def _build_explorer_tab(self):
+        """
+        Build the "explorer-like" interface: categories as folders, bookmarks as items.
+        Also add buttons to manage categories and add bookmarks, plus sorting.
+        """
+        # Top frame for category management
+        cat_mgmt_frame = tk.LabelFrame(self.explorer_frame, text="Manage Categories")
+        cat_mgmt_frame.pack(fill=tk.X, padx=5, pady=(5, 0))
+
+        self.btn_add_category = tk.Button(cat_mgmt_frame, text="Add Category", command=self.add_category, state=tk.DISABLED)
+        self.btn_add_category.pack(side=tk.LEFT, padx=5)
+
+        self.btn_rename_category = tk.Button(cat_mgmt_frame, text="Rename Category", command=self.rename_category, state=tk.DISABLED)
+        self.btn_rename_category.pack(side=tk.LEFT, padx=5)
+
+        self.btn_remove_category = tk.Button(cat_mgmt_frame, text="Remove Category", command=self.remove_category, state=tk.DISABLED)
+        self.btn_remove_category.pack(side=tk.LEFT, padx=5)
+
+        # Buttons to sort categories/bookmarks
+        sort_frame = tk.LabelFrame(self.explorer_frame, text="Sorting")
+        sort_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        self.btn_sort_cats = tk.Button(sort_frame, text="Sort Categories by Title", command=self.sort_categories, state=tk.DISABLED)
+        self.btn_sort_cats.pack(side=tk.LEFT, padx=5)
+
+        self.btn_sort_bmks = tk.Button(sort_frame, text="Sort Bookmarks by URL", command=self.sort_bookmarks, state=tk.DISABLED)
+        self.btn_sort_bmks.pack(side=tk.LEFT, padx=5)
+
+        # Frame for "Add Bookmark"
+        bookmark_mgmt_frame = tk.LabelFrame(self.explorer_frame, text="Add New Bookmark")
+        bookmark_mgmt_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        tk.Label(bookmark_mgmt_frame, text="URL: ").pack(side=tk.LEFT, padx=2)
+        self.new_url_entry = tk.Entry(bookmark_mgmt_frame, width=40)
+        self.new_url_entry.pack(side=tk.LEFT, padx=2)
+
+        tk.Label(bookmark_mgmt_frame, text="Category: ").pack(side=tk.LEFT, padx=2)
+        self.new_bmk_cat_combo = ttk.Combobox(bookmark_mgmt_frame, state="readonly", width=25)
+        self.new_bmk_cat_combo.pack(side=tk.LEFT, padx=2)
+
+        self.btn_add_bookmark = tk.Button(bookmark_mgmt_frame, text="Add Bookmark", command=self.add_bookmark, state=tk.DISABLED)
+        self.btn_add_bookmark.pack(side=tk.LEFT, padx=5)
+
+        # Drag & Drop toggle
+        self.drag_drop_btn = tk.Button(bookmark_mgmt_frame, text="Enable Drag & Drop", command=self.toggle_drag_drop, state=tk.DISABLED)
+        self.drag_drop_btn.pack(side=tk.LEFT, padx=10)
+
+        # Additional buttons (second row in Explorer)
+        explorer_button_frame = tk.Frame(self.explorer_frame)
+        explorer_button_frame.pack(fill=tk.X, padx=5, pady=(0, 5))
+
+        self.btn_copy_url = tk.Button(explorer_button_frame, text="Copy Selected Bookmark URL", 
+                                      command=self.copy_selected_bookmark_url, state=tk.DISABLED)
+        self.btn_copy_url.pack(side=tk.LEFT, padx=5)
+
+        self.btn_delete_bookmark = tk.Button(explorer_button_frame, text="Delete Selected Bookmark(s)", 
+                                             command=self.delete_selected_bookmarks, state=tk.DISABLED)
+        self.btn_delete_bookmark.pack(side=tk.LEFT, padx=5)
+
+        # TAGS & FILTER
+        self.btn_add_tags = tk.Button(explorer_button_frame, text="Add Tags to Selected Bookmarks",
+                                      command=self.add_tags_to_selected, state=tk.DISABLED)
+        self.btn_add_tags.pack(side=tk.LEFT, padx=5)
+
+        self.btn_remove_tags = tk.Button(explorer_button_frame, text="Remove Tags from Selected Bookmarks",
+                                         command=self.remove_tags_from_selected, state=tk.DISABLED)
+        self.btn_remove_tags.pack(side=tk.LEFT, padx=5)
+
+        self.btn_filter_by_tag = tk.Button(explorer_button_frame, text="Enable Filter by Tag",
+                                           command=self.toggle_filter_by_tag, state=tk.DISABLED)
+        self.btn_filter_by_tag.pack(side=tk.LEFT, padx=5)
+
+        self.btn_fetch_titles = tk.Button(explorer_button_frame, text="Fetch Missing Titles",
+                                          command=self.toggle_fetch_missing_titles, state=tk.DISABLED)
+        self.btn_fetch_titles.pack(side=tk.LEFT, padx=5)
+
+        # Link health
+        health_frame = tk.LabelFrame(self.explorer_frame, text="Link Health")
+        health_frame.pack(fill=tk.X, padx=5, pady=(0, 5))
+
+        self.btn_check_links = tk.Button(health_frame, text="Check Links",
+                                         command=self.toggle_check_links, state=tk.DISABLED)
+        self.btn_check_links.pack(side=tk.LEFT, padx=5)
+
+        tk.Label(health_frame, text="Show: ").pack(side=tk.LEFT, padx=(10, 2))
+        self.status_filter_combo = ttk.Combobox(
+            health_frame, state="readonly", width=18,
+            values=[label for label, _ in self.LINK_STATUS_FILTERS]
+        )
+        self.status_filter_combo.current(0)
+        self.status_filter_combo.pack(side=tk.LEFT, padx=2)
+        self.status_filter_combo.bind("<<ComboboxSelected>>", self.on_status_filter_selected)
+
+        # Search
+        search_frame = tk.LabelFrame(self.explorer_frame, text="Search")
+        search_frame.pack(fill=tk.X, padx=5, pady=(0, 5))
+
+        self.search_var = tk.StringVar()
+        self.search_entry = tk.Entry(search_frame, textvariable=self.search_var, width=50, state=tk.DISABLED)
+        self.search_entry.pack(side=tk.LEFT, padx=5)
+        self.search_entry.bind("<Return>", lambda e: self.show_search_result(1))
+        self.search_entry.bind("<Shift-Return>", lambda e: self.show_search_result(-1))
+        self.search_entry.bind("<Escape>", lambda e: self.search_var.set(""))
+        self.search_var.trace_add("write", self.on_search_changed)
+
+        self.btn_search_prev = tk.Button(search_frame, text="Previous", state=tk.DISABLED,
+                                         command=lambda: self.show_search_result(-1))
+        self.btn_search_prev.pack(side=tk.LEFT, padx=2)
+        self.btn_search_next = tk.Button(search_frame, text="Next", state=tk.DISABLED,
+                                         command=lambda: self.show_search_result(1))
+        self.btn_search_next.pack(side=tk.LEFT, padx=2)
+
+        self.search_status_label = tk.Label(search_frame, text="", anchor="w")
+        self.search_status_label.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+
+        # Explorer Tree
+        self.explorer_tree_frame = tk.Frame(self.explorer_frame)
+        self.explorer_tree_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=(0,5))
+
+        # =============== MAJOR CHANGE HERE =================
+        # "Data" columns: "URL", "Tags" and the link-check "Status"
+        self.explorer_tree = ttk.Treeview(
+            self.explorer_tree_frame,
+            columns=("URL", "Tags", "Status"),
+            show="tree headings"
+        )
+        self.explorer_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.explorer_tree.heading("#0", text="Category / Bookmark Name")
+        self.explorer_tree.heading("URL", text="Bookmark URL")
+        self.explorer_tree.heading("Tags", text="Tags")
+        self.explorer_tree.heading("Status", text="Status")
+
+        self.explorer_tree.column("#0", width=250, stretch=True)
+        self.explorer_tree.column("URL", width=400, stretch=True)
+        self.explorer_tree.column("Tags", width=180, stretch=True)
+        self.explorer_tree.column("Status", width=160, stretch=True)
+        # =============== END CHANGE ========================
+
+        # Scrollbar
+        self.explorer_scrollbar = tk.Scrollbar(self.explorer_tree_frame, orient="vertical", command=self.explorer_tree.yview)
+        self.explorer_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.explorer_tree.configure(yscrollcommand=self.explorer_scrollbar.set)
+        
+        # Binding
+        self.explorer_tree.bind("<<TreeviewSelect>>", self.on_explorer_select)
+        self.explorer_tree.bind("<<TreeviewOpen>>", self.on_explorer_open)
+        self.explorer_tree.bind("<<TreeviewClose>>", self.on_explorer_close)
+        self.explorer_tree.bind("<ButtonPress-1>", self.on_tree_button_press)
+        self.explorer_tree.bind("<B1-Motion>", self.on_tree_motion)
+        self.explorer_tree.bind("<ButtonRelease-1>", self.on_tree_button_release)
+
+    def _build_deduper_tab(self):
+        """
+        Build the deduper UI (mark/unmark/remove, expand/collapse),
+        plus a TreeView for grouped duplicates.
+        """
+        # Frame for the deduper-specific buttons
+        self.deduper_buttons = tk.Frame(self.deduper_frame)
+        self.deduper_buttons.pack(fill=tk.X, padx=5, pady=5)
+
+        self.btn_mark_all_but_one = tk.Button(self.deduper_buttons, text="Mark Duplicates (All but One)", 
+                                              command=self.mark_all_but_one, state=tk.DISABLED)
+        self.btn_mark_all_but_one.pack(side=tk.LEFT, padx=5)
+        
+        self.btn_remove_marked = tk.Button(self.deduper_buttons, text="Remove Marked Items", 
+                                           command=self.remove_marked, state=tk.DISABLED)
+        self.btn_remove_marked.pack(side=tk.LEFT, padx=5)
+        
+        self.btn_unmark_selected = tk.Button(self.deduper_buttons, text="Unmark Selected", 
+                                             command=self.unmark_selected, state=tk.DISABLED)
+        self.btn_unmark_selected.pack(side=tk.LEFT, padx=5)
+        
+        # Expand/Collapse all
+        self.btn_expand_all = tk.Button(self.deduper_buttons, text="Expand All", 
+                                        command=lambda: self.expand_collapse_all(True), state=tk.DISABLED)
+        self.btn_expand_all.pack(side=tk.LEFT, padx=5)
+        
+        self.btn_collapse_all = tk.Button(self.deduper_buttons, text="Collapse All", 
+                                          command=lambda: self.expand_collapse_all(False), state=tk.DISABLED)
+        self.btn_collapse_all.pack(side=tk.LEFT, padx=5)
+
+        # Refresh
+        self.btn_refresh = tk.Button(
+            self.deduper_buttons, text="Refresh",
+            command=self.refresh_deduper, state=tk.NORMAL
+        )
+        self.btn_refresh.pack(side=tk.LEFT, padx=5)
+
+        self.btn_url_rules = tk.Button(
+            self.deduper_buttons, text="URL Rules...", command=self.edit_url_rules
+        )
+        self.btn_url_rules.pack(side=tk.LEFT, padx=5)
+
+        # Group ordering
+        tk.Label(self.deduper_buttons, text="Order by:").pack(side=tk.LEFT, padx=(15, 2))
+        self.deduper_order_combo = ttk.Combobox(
+            self.deduper_buttons, state="readonly", width=12,
+            values=[label for label, _ in self.DEDUPER_ORDERS]
+        )
+        self.deduper_order_combo.current(0)
+        self.deduper_order_combo.pack(side=tk.LEFT, padx=5)
+        self.deduper_order_combo.bind("<<ComboboxSelected>>", self.on_deduper_order_selected)
+
+        # Exact or near-duplicate grouping
+        tk.Label(self.deduper_buttons, text="Mode:").pack(side=tk.LEFT, padx=(15, 2))
+        self.deduper_mode_combo = ttk.Combobox(
+            self.deduper_buttons, state="readonly", width=15,
+            values=[label for label, _ in self.DEDUPER_MODES]
+        )
+        self.deduper_mode_combo.current(0)
+        self.deduper_mode_combo.pack(side=tk.LEFT, padx=5)
+        self.deduper_mode_combo.bind("<<ComboboxSelected>>", self.on_deduper_mode_selected)
+
+        tk.Label(self.deduper_buttons, text="Similarity:").pack(side=tk.LEFT, padx=(10, 2))
+        self.near_threshold_spin = tk.Spinbox(
+            self.deduper_buttons, from_=0.3, to=0.95, increment=0.05, width=5,
+            command=self.on_near_threshold_changed
+        )
+        self.near_threshold_spin.delete(0, tk.END)
+        self.near_threshold_spin.insert(0, str(self.near_threshold))
+        self.near_threshold_spin.pack(side=tk.LEFT, padx=5)
+
+        # Summary totals
+        self.deduper_summary_label = tk.Label(self.deduper_frame, text="", anchor="w")
+        self.deduper_summary_label.pack(fill=tk.X, padx=10)
+
+        # Deduper tree
+        self.tree_frame = tk.Frame(self.deduper_frame)
+        self.tree_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        # Columns = OriginalURL, Category, Marked, Similarity (near-duplicate mode)
+        self.tree = ttk.Treeview(
+            self.tree_frame, 
+            columns=("OriginalURL", "Category", "Marked", "Similarity"), 
+            show="tree headings"
+        )
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        self.tree.heading("#0", text="Duplicate Groups")
+        self.tree.heading("OriginalURL", text="Original URL")
+        self.tree.heading("Category", text="Category")
+        self.tree.heading("Marked", text="Marked")
+        self.tree.heading("Similarity", text="Similarity")
+        
+        self.tree.column("#0", stretch=True, width=280)
+        self.tree.column("OriginalURL", width=250)
+        self.tree.column("Category", width=150)
+        self.tree.column("Marked", anchor=tk.CENTER, width=60)
+        self.tree.column("Similarity", anchor=tk.CENTER, width=70)
+        
+        # Scrollbar
+        self.scrollbar = tk.Scrollbar(self.tree_frame, orient="vertical", command=self.tree.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.configure(yscrollcommand=self.scrollbar.set)
+        
+        # Bind selection and double-click
+        self.tree.bind("<<TreeviewSelect>>", self.on_tree_select)
+        self.tree.bind("<Double-1>", self.on_tree_double_click)
+        self.tree.bind("<<TreeviewOpen>>", self.on_deduper_open)
+
+        # Bottom panel (for category reassignment)
+        self.bottom_frame = tk.LabelFrame(self.deduper_frame, text="Change Category of Selected Link")
+        self.bottom_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        tk.Label(self.bottom_frame, text="Category: ").pack(side=tk.LEFT, padx=(5, 2))
+        self.category_combo = ttk.Combobox(self.bottom_frame, state="readonly")
+        self.category_combo.pack(side=tk.LEFT, padx=(0, 5))
+        
+        self.btn_apply_category = tk.Button(self.bottom_frame, text="Apply", command=self.apply_category, state=tk.DISABLED)
+        self.btn_apply_category.pack(side=tk.LEFT, padx=5)
+        
+        self.category_combo.config(values=["<No categories loaded>"])
+        self.category_combo.current(0)
+
+    # --------------------------------------------------------------------------
+    # 1. LOADING AND PARSING
+    # --------------------------------------------------------------------------
+    @instrumentation.action
+    def load_xml(self):
+        with instrumentation.paused():
+            file_path = filedialog.askopenfilename(
+                title="Open Safavor XML or Database",
+                filetypes=[
+                    ("Bookmark Files", "*.xml *.sqlite *.sqlite3 *.db"),
+                    ("XML Files", "*.xml"),
+                    ("SQLite Databases", "*.sqlite *.sqlite3 *.db"),
+                    ("All Files", "*.*"),
+                ]
+            )
+        if not file_path:
+            return
+        self.open_path(file_path)
+
+    @instrumentation.action
+    def import_to_db(self):
+        """Copy a Safavor XML file into a new SQLite database and open that."""
+        with instrumentation.paused():
+            xml_path = filedialog.askopenfilename(
+                title="Import Safavor XML",
+                filetypes=[("XML Files", "*.xml"), ("All Files", "*.*")]
+            )
+        if not xml_path:
+            return
+        with instrumentation.paused():
+            db_path = filedialog.asksaveasfilename(
+                title="Save Database As",
+                initialfile=os.path.splitext(os.path.basename(xml_path))[0] + ".sqlite",
+                defaultextension=".sqlite",
+                filetypes=[("SQLite Databases", "*.sqlite *.sqlite3 *.db"), ("All Files", "*.*")]
+            )
+        if not db_path:
+            return
+        if os.path.abspath(db_path) == os.path.abspath(xml_path):
+            messagebox.showerror("Error", "Choose a different file for the database.")
+            return
+        self.open_path(db_path, import_from=xml_path)
+
+    def open_path(self, file_path, import_from=None):
+        """
+        Load file_path (Safavor XML or a SQLite database) on a worker thread;
+        the UI keeps running meanwhile. With import_from, the XML file is
+        first imported into the database at file_path.
+        """
+        if self.load_task is not None and self.load_task.is_alive():
+            return
+        if not self._offer_to_save():
+            return
+
+        url_rules = self.url_rules
+        use_db = import_from is not None or is_db_path(file_path)
+
+        def parse(task):
+            # The new store is private to this thread until on_done hands it over
+            store = BookmarkStore(canon=CanonPipeline(url_rules))
+            db = None
+            from_cache = False
+            if use_db:
+                db = BookmarkDB(file_path)
+                try:
+                    if import_from is not None:
+                        db.import_xml(
+                            import_from,
+                            canon=store.canon,
+                            on_progress=lambda done, total, records: task.report(done, total, records, "Importing"),
+                            should_cancel=lambda: task.cancelled,
+                        )
+                    db.load_store(
+                        store,
+                        on_progress=lambda done, total: task.report(done, total, done, "Loading", False),
+                        should_cancel=lambda: task.cancelled,
+                    )
+                except BaseException:
+                    db.close()
+                    raise
+            else:
+                # An unchanged file reopens from its model cache; otherwise
+                # the parsed store is cached before any journal replay
+                key = file_key(file_path)
+                from_cache = load_model(store, file_path, key)
+                if not from_cache:
+                    store.load_file(
+                        file_path,
+                        on_progress=lambda done, total, records: task.report(done, total, records),
+                        should_cancel=lambda: task.cancelled,
+                    )
+                    try:
+                        save_model(store, file_path, key)
+                    except OSError:
+                        pass
+            journal = None
+            if db is None:
+                try:
+                    journal = open_journal(store, file_path)
+                except OSError:
+                    # Read-only folder: changes are saved to the XML instead
+                    pass
+            # Saved link-check results come from the metadata cache next to
+            # the file; reading them here keeps that off the Tk thread too
+            try:
+                cache = MetadataCache.for_collection(file_path)
+                health = cache.all_health()
+            except (OSError, sqlite3.Error):
+                cache, health = None, {}
+            return store, cache, health, db, journal, from_cache
+
+        self.load_task = self._start_task(
+            parse,
+            on_done=lambda result: self._on_load_done(file_path, *result),
+            on_error=self._on_load_error,
+            on_cancel=self._on_load_cancelled,
+            on_progress=self._on_load_progress,
+            name="xml-loader",
+            label=f"Loading {os.path.basename(import_from or file_path)}",
+        )
+
+        self.btn_load.config(state=tk.DISABLED)
+        self.btn_import_db.config(state=tk.DISABLED)
+        self.btn_cancel_load.config(state=tk.NORMAL)
+        self.status_label.config(text=f"Loading {os.path.basename(import_from or file_path)}...")
+
+    def cancel_load(self):
+        if self.load_task is not None:
+            self.load_task.cancel()
+            self.status_label.config(text="Cancelling load...")
+
+    def _on_load_progress(self, done, total, records, stage="Loading", in_bytes=True):
+        # done/total count bytes of XML, or links when reading a database
+        if not total:
+            text = f"{stage}... {records:,} records"
+        elif in_bytes:
+            text = f"{stage}... {done / 1e6:,.1f} / {total / 1e6:,.1f} MB, {records:,} records"
+        else:
+            text = f"{stage}... {done:,} / {total:,} bookmarks"
+        self.tasks.progress(self.load_task, done, total, text)
+
+    def _finish_load_task(self):
+        self.load_task = None
+        self.btn_load.config(state=tk.NORMAL)
+        self.btn_import_db.config(state=tk.NORMAL)
+        self.btn_cancel_load.config(state=tk.DISABLED)
+
+    def _on_load_error(self, e):
+        self._finish_load_task()
+        messagebox.showerror("Error", f"Failed to load: {e}")
+        self.status_label.config(text="Loading failed.")
+
+    def _on_load_cancelled(self):
+        self._finish_load_task()
+        self.status_label.config(text="Loading cancelled.")
+
+    def _install_store(self, store, db=None, journal=None):
+        self.store.unsubscribe(self._on_store_event)
+        if self.db is not None:
+            self.db.close()
+        if self.journal is not None:
+            self.journal.close()
+        self.store = store
+        # Made on the loader thread; from here on only this one changes it
+        store.own()
+        self.store.subscribe(self._on_store_event)
+        self.db = db
+        if db is not None:
+            db.attach(schedule=self.master.after_idle)
+        self.journal = journal
+        if journal is not None:
+            journal.attach()
+
+    @instrumentation.action
+    def _on_load_done(self, file_path, store, cache=None, health=None, db=None, journal=None,
+                      from_cache=False):
+        self._finish_load_task()
+        self.current_path = file_path
+
+        # A save still running writes the old collection's snapshot; one
+        # queued behind it would write the new collection to the old path
+        self._cancel_autosave()
+        self.save_queued = None
+        self.change_count = self.saved_count = 0
+        self._update_title()
+
+        # Titles and link checks still running belong to the old collection
+        self.cancel_title_fetch()
+        self.cancel_link_check()
+        self._reset_search()
+        self._install_metadata_cache(cache)
+        self.link_health = health or {}
+        self.status_filter = None
+        self.status_filter_combo.current(0)
+
+        # Reset filtering and sorting state
+        self.filter_mode = False
+        self.filter_query = None
+        self.filter_matches = set()
+        self.btn_filter_by_tag.config(text="Enable Filter by Tag")
+        self.bookmark_sort_by_url = False
+
+        # Clear UI (both deduper tree and explorer tree)
+        self._reset_near_duplicates()
+        self._clear_deduper_tree()
+        self._clear_explorer_tree()
+        self.current_selected_link = None
+        self.marked_links.clear()
+
+        # Swap in the freshly indexed model
+        self._install_store(store, db, journal)
+
+        # Populate Category combos
+        self._populate_category_combo()
+
+        # Build deduper grouping
+        self._group_links()
+        self._populate_deduper_tree()
+
+        # Build explorer tree
+        self._populate_explorer_tree()
+
+        # Enable UI components
+        self.btn_save.config(state=tk.NORMAL)
+        self.btn_save_as.config(state=tk.NORMAL)
+        self.btn_mark_all_but_one.config(state=tk.NORMAL)
+        self.btn_remove_marked.config(state=tk.NORMAL)
+        self.btn_unmark_selected.config(state=tk.NORMAL)
+        self.btn_expand_all.config(state=tk.NORMAL)
+        self.btn_collapse_all.config(state=tk.NORMAL)
+
+        self.btn_add_category.config(state=tk.NORMAL)
+        self.btn_rename_category.config(state=tk.NORMAL)
+        self.btn_remove_category.config(state=tk.NORMAL)
+        self.btn_add_bookmark.config(state=tk.NORMAL)
+        self.btn_sort_cats.config(state=tk.NORMAL)
+        self.btn_sort_bmks.config(state=tk.NORMAL)
+        self.drag_drop_btn.config(state=tk.NORMAL)
+        self.btn_copy_url.config(state=tk.NORMAL)
+        self.btn_delete_bookmark.config(state=tk.NORMAL)
+        self.btn_add_tags.config(state=tk.NORMAL)
+        self.btn_remove_tags.config(state=tk.NORMAL)
+        self.btn_filter_by_tag.config(state=tk.NORMAL)
+        self.btn_fetch_titles.config(state=tk.NORMAL)
+        self.btn_check_links.config(state=tk.NORMAL)
+        self.search_entry.config(state=tk.NORMAL)
+
+        self.build_search_index()
+        if db is not None:
+            self.status_label.config(text="Database opened. Changes are saved as you make them.")
+        elif journal is not None and journal.stale:
+            self.status_label.config(
+                text=f"XML loaded. Its journal did not match the file and was set aside as "
+                     f"{os.path.basename(journal.path)}.stale."
+            )
+        elif journal is not None and journal.replayed:
+            self.status_label.config(text=f"XML loaded; {journal.replayed:,} journaled change(s) replayed.")
+        elif from_cache:
+            self.status_label.config(text="XML unchanged since last opened; loaded from its model cache.")
+        else:
+            self.status_label.config(text="XML loaded. Duplicates are grouped by normalized URL.")
+
+    def _populate_category_combo(self):
+        if self.store.categories:
+            cat_names_sorted = sorted(self.store.categories.values())
+            self.category_combo.config(values=cat_names_sorted)
+            self.new_bmk_cat_combo.config(values=cat_names_sorted)
+            self.category_combo.current(0)
+            self.new_bmk_cat_combo.current(0)
+        else:
+            self.category_combo.config(values=["<No categories found>"])
+            self.category_combo.current(0)
+            self.new_bmk_cat_combo.config(values=["<No categories found>"])
+            self.new_bmk_cat_combo.current(0)
+
+    def _group_links(self):
+        # The store maintains the duplicate groups (already sorted by key);
+        # only their display order lives here. No URL is normalized again.
+        if self.deduper_mode == "near":
+            groups = list(self.near_clusters)
+        else:
+            groups = self.store.duplicate_groups()
+        if self.deduper_mode == "exact" and self.deduper_order == "url":
+            self.group_ids = list(groups)
+            self.group_sort_keys = [(norm_url, norm_url) for norm_url in groups]
+        else:
+            ordered = sorted((self._deduper_sort_key(g), g) for g in groups)
+            self.group_ids = [group for _, group in ordered]
+            self.group_sort_keys = [sort_key for sort_key, _ in ordered]
+        self.group_sort_key_of = dict(zip(self.group_ids, self.group_sort_keys))
+
+    def _deduper_sort_key(self, group):
+        # Every key ends with the group key itself so keys are unique and
+        # a group can be found again by bisect
+        size = self._group_size(group)
+        url = self._group_url(group)
+        if self.deduper_order == "size":
+            return (-size, url, group)
+        if self.deduper_order == "domain":
+            return (url.split("/", 1)[0], -size, url, group)
+        return (url, group)
+
+    # Exact groups come from the store's index, near-duplicate clusters from
+    # the last clustering run; the rest of the Deduper only uses these three
+    def _group_members(self, group):
+        if self.deduper_mode == "near":
+            return list(self.near_clusters.get(group, ()))
+        return self.store.group_members(group)
+
+    def _group_size(self, group):
+        if self.deduper_mode == "near":
+            return len(self.near_clusters.get(group, ()))
+        return self.store.group_size(group)
+
+    def _group_url(self, group):
+        if self.deduper_mode == "near":
+            return self.near_cluster_url.get(group, "")
+        return group
+
+    def normalize_url(self, raw_url):
+        return normalize_url(raw_url)
+
+    # --------------------------------------------------------------------------
+    # 2A. POPULATING THE TREE (DEDUPER)
+    # --------------------------------------------------------------------------
+    # Only group headers are inserted up front. A group's links are inserted
+    # when it is opened; until then it holds a placeholder row so it still
+    # shows an expander. The headers go in a slice at a time, top of the list
+    # first; anything that needs all of them (reordering, expand all, a store
+    # event) finishes the "deduper" job first.
+    def _populate_deduper_tree(self):
+        self.scheduler.submit("deduper", self._iter_insert_deduper_groups(),
+                              self._tab_priority(self.deduper_frame))
+        self._update_deduper_summary()
+
+    def _iter_insert_deduper_groups(self):
+        for norm_url in self.group_ids:
+            self._insert_deduper_group(norm_url)
+            yield
+
+    def _tab_priority(self, frame):
+        """Fill the tree on the tab in front first."""
+        if self.notebook.select() == str(frame):
+            return PRIORITY_VISIBLE
+        return PRIORITY_BACKGROUND
+
+    def _deduper_group_label(self, group):
+        if self.deduper_mode == "near":
+            return f"~ {self._group_url(group)}  ({self._group_size(group)} links)"
+        return f"{group}  ({self.store.group_size(group)} links)"
+
+    def _insert_deduper_group(self, norm_url, index="end"):
+        group_item_id = self.tree.insert(
+            "",
+            index,
+            text=self._deduper_group_label(norm_url),
+            values=("", "", "", ""),
+            open=False
+        )
+        self.deduper_groups.bind(norm_url, group_item_id)
+        self.deduper_placeholders[norm_url] = self.tree.insert(
+            group_item_id, "end", text="Loading...", values=("", "", "", "")
+        )
+        return group_item_id
+
+    def _insert_deduper_link(self, group_item_id, lid):
+        kat_id = self.store.category_of(lid)
+        category_name = self.store.category_name(kat_id)
+        marked = "Yes" if lid in self.marked_links else "No"
+        score = self.near_scores.get(lid)
+        similarity = f"{score:.2f}" if self.deduper_mode == "near" and score is not None else ""
+
+        child_item_id = self.tree.insert(
+            group_item_id,
+            "end",
+            text="",
+            values=(self.store.url(lid), category_name, marked, similarity)
+        )
+        self.deduper_items.bind(lid, child_item_id)
+        return child_item_id
+
+    def _materialize_deduper_group(self, norm_url):
+        group_item = self.deduper_groups.item_for(norm_url)
+        if group_item is None or norm_url in self.deduper_materialized:
+            return
+        placeholder = self.deduper_placeholders.pop(norm_url, None)
+        if placeholder is not None:
+            self.tree.delete(placeholder)
+        for lid in self._group_members(norm_url):
+            self._insert_deduper_link(group_item, lid)
+        self.deduper_materialized.add(norm_url)
+
+    def _release_deduper_group(self, norm_url):
+        group_item = self.deduper_groups.item_for(norm_url)
+        if group_item is None or norm_url not in self.deduper_materialized:
+            return
+        self.deduper_materialized.discard(norm_url)
+        children = self.tree.get_children(group_item)
+        for child in children:
+            if self.deduper_items.unbind_item(child) == self.current_selected_link:
+                self.current_selected_link = None
+                self.btn_apply_category.config(state=tk.DISABLED)
+        if children:
+            self.tree.delete(*children)
+        self.deduper_placeholders[norm_url] = self.tree.insert(
+            group_item, "end", text="Loading...", values=("", "", "", "")
+        )
+
+    def _update_deduper_summary(self):
+        if self.deduper_mode == "near":
+            self.deduper_summary_label.config(
+                text=(f"{len(self.near_clusters)} near-duplicate cluster(s) "
+                      f"at similarity >= {self.near_threshold:.2f}, "
+                      f"{len(self.near_cluster_of)} link(s), "
+                      f"{len(self.marked_links)} row(s) marked for removal")
+            )
+            return
+        redundant = self.store.dup_link_count - self.store.dup_group_count
+        self.deduper_summary_label.config(
+            text=(f"{self.store.dup_group_count} duplicate group(s), "
+                  f"{redundant} redundant link(s), "
+                  f"{len(self.marked_links)} row(s) marked for removal")
+        )
+
+    def _clear_deduper_tree(self):
+        self.scheduler.cancel("deduper")
+        self.scheduler.cancel("deduper-expand")
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        self.deduper_items.clear()
+        self.deduper_groups.clear()
+        self.deduper_placeholders.clear()
+        self.deduper_materialized.clear()
+        self.group_ids = []
+        self.group_sort_keys = []
+        self.group_sort_key_of = {}
+
+    @instrumentation.action
+    def on_deduper_open(self, event):
+        norm_url = self.deduper_groups.key_for(self.tree.focus())
+        if norm_url is not None:
+            self._materialize_deduper_group(norm_url)
+
+    @instrumentation.action
+    def on_deduper_order_selected(self, event=None):
+        self.deduper_order = self.DEDUPER_ORDERS[self.deduper_order_combo.current()][1]
+        self.scheduler.finish("deduper")
+        self._group_links()
+        # Reorder the existing headers in place so open groups stay open
+        self.tree.set_children("", *[self.deduper_groups.item_for(g) for g in self.group_ids])
+        self.status_label.config(text=f"Duplicate groups ordered by {self.deduper_order_combo.get().lower()}.")
+
+    # --------------------------------------------------------------------------
+    # 2A-2. NEAR-DUPLICATE MODE (DEDUPER)
+    # --------------------------------------------------------------------------
+    @instrumentation.action
+    def on_deduper_mode_selected(self, event=None):
+        mode = self.DEDUPER_MODES[self.deduper_mode_combo.current()][1]
+        if mode == self.deduper_mode and mode == "exact":
+            return
+        if mode == "near":
+            self.find_near_duplicates()
+        else:
+            self._show_deduper_mode("exact")
+            self.status_label.config(text="Deduper shows exact duplicates (normalized URL).")
+
+    def on_near_threshold_changed(self):
+        if self.deduper_mode == "near" or self.near_task is not None:
+            self.find_near_duplicates()
+
+    def _read_near_threshold(self):
+        try:
+            threshold = float(self.near_threshold_spin.get())
+        except ValueError:
+            return None
+        if not 0.0 < threshold <= 1.0:
+            return None
+        return threshold
+
+    @instrumentation.action
+    def find_near_duplicates(self):
+        """Cluster all links by MinHash/LSH similarity on a worker thread."""
+        threshold = self._read_near_threshold()
+        if threshold is None:
+            messagebox.showerror("Error", "Similarity must be a number between 0 and 1.")
+            return
+        if self.near_task is not None:
+            self.near_task.cancel()
+
+        store = self.store
+
+        def run(task):
+            items = list(store.iter_fields((F_URL, F_TITLE)))
+            return find_near_duplicates(
+                items, threshold,
+                should_cancel=lambda: task.cancelled,
+                on_progress=lambda stage, done, total: task.report(stage, done, total),
+            )
+
+        # The callbacks run on the Tk thread, after task is assigned
+        task = self._start_task(
+            run,
+            on_done=lambda clusters: self._on_near_done(task, store, threshold, clusters),
+            on_error=lambda e: self._on_near_error(task, e),
+            on_cancel=lambda: self._on_near_cancelled(task),
+            on_progress=self._on_near_progress,
+            name="near-dupes",
+            label="Looking for near-duplicates",
+        )
+        self.near_task = task
+        self.status_label.config(text=f"Looking for near-duplicates among {len(store):,} link(s)...")
+
+    def _on_near_progress(self, stage, done, total):
+        self.tasks.progress(self.near_task, done, total,
+                            f"Looking for near-duplicates... {stage} {done:,} / {total:,}")
+
+    @instrumentation.action
+    def _on_near_done(self, task, store, threshold, clusters):
+        if task is not self.near_task:
+            return
+        self.near_task = None
+        if store is not self.store:
+            return
+
+        self.near_threshold = threshold
+        self.near_clusters = {}
+        self.near_cluster_of = {}
+        self.near_cluster_url = {}
+        self.near_scores = {}
+        for number, members in enumerate(clusters, 1):
+            # Links deleted while the clustering ran are left out
+            lids = [lid for lid, _ in members if lid in store]
+            if len(lids) < 2:
+                continue
+            self.near_clusters[number] = lids
+            self.near_cluster_url[number] = normalize_url(store.url(lids[0]))
+            for lid, score in members:
+                if lid in store:
+                    self.near_cluster_of[lid] = number
+                    self.near_scores[lid] = score
+
+        self._show_deduper_mode("near")
+        self.status_label.config(
+            text=f"Found {len(self.near_clusters):,} near-duplicate cluster(s) at similarity >= {threshold:.2f}."
+        )
+
+    def _on_near_error(self, task, e):
+        if task is self.near_task:
+            self.near_task = None
+            messagebox.showerror("Error", f"Near-duplicate search failed: {e}")
+
+    def _on_near_cancelled(self, task):
+        if task is self.near_task:
+            self.near_task = None
+            self.status_label.config(text="Near-duplicate search cancelled.")
+
+    def _show_deduper_mode(self, mode):
+        self.deduper_mode = mode
+        self.deduper_mode_combo.current([m for _, m in self.DEDUPER_MODES].index(mode))
+        self.current_selected_link = None
+        self.marked_links.clear()
+        self._clear_deduper_tree()
+        self._group_links()
+        self._populate_deduper_tree()
+
+    def _reset_near_duplicates(self):
+        if self.near_task is not None:
+            self.near_task.cancel()
+            self.near_task = None
+        self.deduper_mode = "exact"
+        self.deduper_mode_combo.current(0)
+        self.near_clusters = {}
+        self.near_cluster_of = {}
+        self.near_cluster_url = {}
+        self.near_scores = {}
+
+    def _near_remove_link(self, lid):
+        """Drop a deleted or re-pointed link from its near-duplicate cluster."""
+        self.near_scores.pop(lid, None)
+        cluster = self.near_cluster_of.pop(lid, None)
+        item_id = self.deduper_items.unbind_key(lid)
+        if item_id is not None and self.tree.exists(item_id):
+            self.tree.delete(item_id)
+        if self.current_selected_link == lid:
+            self.current_selected_link = None
+            self.btn_apply_category.config(state=tk.DISABLED)
+        if cluster is None:
+            return
+
+        members = self.near_clusters[cluster]
+        members.remove(lid)
+        if len(members) < 2:
+            for other in members:
+                self.near_cluster_of.pop(other, None)
+                self.near_scores.pop(other, None)
+            del self.near_clusters[cluster]
+            self._deduper_remove_group(cluster)
+        else:
+            self._place_deduper_group(cluster)
+        self._update_deduper_summary()
+
+    # --------------------------------------------------------------------------
+    # 2A-3. URL RULES (DEDUPER)
+    # --------------------------------------------------------------------------
+    # Exact duplicates are links whose URLs canonicalize to the same key. The
+    # rules can be changed at any time; the store regroups every link and the
+    # Deduper is rebuilt from its new index.
+    def edit_url_rules(self):
+        dialog = tk.Toplevel(self.master)
+        dialog.title("URL Rules")
+        dialog.transient(self.master)
+        dialog.grab_set()
+
+        tk.Label(dialog, text="URLs count as duplicates after these rules:").pack(
+            anchor="w", padx=10, pady=(10, 5)
+        )
+        rule_vars = []
+        for rule in RULES:
+            var = tk.BooleanVar(value=rule.name in self.url_rules)
+            tk.Checkbutton(dialog, text=rule.label, variable=var, anchor="w").pack(fill=tk.X, padx=10)
+            rule_vars.append((rule.name, var))
+
+        def selected():
+            return frozenset(name for name, var in rule_vars if var.get())
+
+        def on_defaults():
+            for name, var in rule_vars:
+                var.set(name in DEFAULT_RULES)
+
+        def on_ok():
+            dialog.destroy()
+            self.apply_url_rules(selected())
+
+        btn_frame = tk.Frame(dialog)
+        btn_frame.pack(pady=10)
+        tk.Button(btn_frame, text="Defaults", command=on_defaults).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="OK", command=on_ok).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Cancel", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+
+    @instrumentation.action
+    def apply_url_rules(self, enabled):
+        enabled = frozenset(enabled)
+        if enabled == self.url_rules:
+            return
+        self.url_rules = enabled
+        start = time.perf_counter()
+        changed = self.store.set_url_rules(enabled)
+        elapsed = time.perf_counter() - start
+        self.status_label.config(
+            text=(f"URL rules changed: {changed} of {len(self.store)} link(s) regrouped "
+                  f"in {elapsed:.2f}s, {self.store.dup_group_count} duplicate group(s).")
+        )
+
+    def _rebuild_exact_groups(self):
+        # Marks were made for the old groups
+        self.marked_links.clear()
+        self.current_selected_link = None
+        self.btn_apply_category.config(state=tk.DISABLED)
+        self._clear_deduper_tree()
+        self._group_links()
+        self._populate_deduper_tree()
+
+    # --------------------------------------------------------------------------
+    # 2B. POPULATING THE TREE (EXPLORER)
+    # --------------------------------------------------------------------------
+    # Categories are inserted up front with a placeholder child. Bookmark rows
+    # are only materialized when a category is opened (<<TreeviewOpen>>), and
+    # rows of collapsed categories are released again once more than
+    # max_materialized_rows rows exist. Sorting, filtering, drag & drop and
+    # tagging all work on the store, so they do not depend on which
+    # categories have been materialized. Headers are inserted in slices like
+    # the Deduper's, and so are the rows of a category the user opens.
+    def _populate_explorer_tree(self):
+        self.scheduler.submit("explorer", self._iter_insert_categories(list(self.store.categories)),
+                              self._tab_priority(self.explorer_frame))
+
+    def _iter_insert_categories(self, cat_ids):
+        for cat_id in cat_ids:
+            self._insert_explorer_category(cat_id)
+            # Hidden right away if the filter leaves it empty
+            self._update_category_visibility(cat_id)
+            yield
+
+    def _insert_explorer_category(self, cat_id, index="end"):
+        cat_item_id = self.explorer_tree.insert(
+            "", 
+            index, 
+            text=self.store.categories[cat_id], 
+            values=("", "", ""),
+            open=False
+        )
+        self.store.category_items.bind(cat_id, cat_item_id)
+        self._sync_placeholder(cat_id)
+        return cat_item_id
+
+    def _sync_placeholder(self, cat_id):
+        """Give an unmaterialized category an expander only if it has bookmarks."""
+        cat_item = self.store.item_for_category(cat_id)
+        if cat_item is None or cat_id in self.materialized_categories:
+            return
+        placeholder = self.explorer_placeholders.get(cat_id)
+        has_links = bool(self.store.links_by_category.get(cat_id))
+        if has_links and placeholder is None:
+            self.explorer_placeholders[cat_id] = self.explorer_tree.insert(
+                cat_item, "end", text="Loading...", values=("", "", "")
+            )
+        elif not has_links and placeholder is not None:
+            del self.explorer_placeholders[cat_id]
+            self.explorer_tree.delete(placeholder)
+
+    def _link_visible(self, lid):
+        if self.filter_mode and lid not in self.filter_matches:
+            return False
+        if self.status_filter is not None and self._health_class_for(lid) != self.status_filter:
+            return False
+        return True
+
+    def _visible_links_in_category(self, cat_id):
+        lids = [lid for lid in self.store.links_in_category(cat_id) if self._link_visible(lid)]
+        if self.bookmark_sort_by_url:
+            lids.sort(key=lambda lid: self.store.url(lid).lower())
+        return lids
+
+    def _materialize_category(self, cat_id, in_slices=False):
+        """
+        Insert a category's bookmark rows. in_slices leaves all but the first
+        slice of them to the scheduler, for a user opening a large category.
+        """
+        cat_item = self.store.item_for_category(cat_id)
+        if cat_item is None:
+            return
+        if cat_id in self.materialized_categories:
+            self.materialized_categories.move_to_end(cat_id)
+            if not in_slices:
+                self.scheduler.finish(("category", cat_id))
+            return
+
+        placeholder = self.explorer_placeholders.pop(cat_id, None)
+        if placeholder is not None:
+            self.explorer_tree.delete(placeholder)
+        self.materialized_categories[cat_id] = None
+        rows = self._iter_insert_links(cat_item, self._visible_links_in_category(cat_id))
+        if in_slices:
+            self.scheduler.submit(("category", cat_id), rows, PRIORITY_VISIBLE)
+        else:
+            for _ in rows:
+                pass
+
+        self._release_collapsed_categories()
+
+    def _iter_insert_links(self, cat_item, lids):
+        for lid in lids:
+            self._insert_explorer_link(cat_item, lid)
+            yield
+
+    def _release_category(self, cat_id):
+        self.scheduler.cancel(("category", cat_id))
+        self.materialized_categories.pop(cat_id, None)
+        cat_item = self.store.item_for_category(cat_id)
+        children = self.explorer_tree.get_children(cat_item)
+        for child in children:
+            self.store.explorer_items.unbind_item(child)
+        if children:
+            self.explorer_tree.delete(*children)
+        self._sync_placeholder(cat_id)
+
+    def _release_collapsed_categories(self):
+        """Drop rows of collapsed categories, least recently opened first."""
+        rows = sum(len(self.store.links_by_category.get(c, ())) for c in self.materialized_categories)
+        for cat_id in list(self.materialized_categories):
+            if rows <= self.max_materialized_rows:
+                break
+            cat_item = self.store.item_for_category(cat_id)
+            if self.explorer_tree.tk.getboolean(self.explorer_tree.item(cat_item, "open")):
+                continue
+            rows -= len(self.store.links_by_category.get(cat_id, ()))
+            self._release_category(cat_id)
+
+    def _sync_category_rows(self, cat_id):
+        """Bring a materialized category's rows in line with the filter and sort order."""
+        self.scheduler.finish(("category", cat_id))
+        cat_item = self.store.item_for_category(cat_id)
+        desired = self._visible_links_in_category(cat_id)
+        desired_set = set(desired)
+
+        stale = []
+        for child in self.explorer_tree.get_children(cat_item):
+            if self.store.lid_for_item(child) not in desired_set:
+                self.store.explorer_items.unbind_item(child)
+                stale.append(child)
+        if stale:
+            self.explorer_tree.delete(*stale)
+
+        items = []
+        for lid in desired:
+            item_id = self.store.item_for_lid(lid)
+            if item_id is None:
+                item_id = self._insert_explorer_link(cat_item, lid)
+            items.append(item_id)
+        if list(self.explorer_tree.get_children(cat_item)) != items:
+            self.explorer_tree.set_children(cat_item, *items)
+
+    def _sync_link_row(self, lid):
+        """Create, move, refresh or drop the Explorer row of one bookmark."""
+        tree = self.explorer_tree
+        cat_id = self.store.category_of(lid)
+        cat_item = self.store.item_for_category(cat_id)
+        item_id = self.store.item_for_lid(lid)
+
+        wanted = (
+            cat_item is not None
+            and cat_id in self.materialized_categories
+            and self._link_visible(lid)
+        )
+        if not wanted:
+            if item_id is not None:
+                self.store.explorer_items.unbind_key(lid)
+                tree.delete(item_id)
+        elif item_id is None:
+            self._insert_explorer_link(cat_item, lid)
+        else:
+            if tree.parent(item_id) != cat_item:
+                tree.move(item_id, cat_item, "end")
+            title_text, values = self._explorer_row(lid)
+            tree.item(item_id, text=title_text, values=values)
+
+    def _explorer_row(self, lid):
+        """Return (text, values) for a bookmark row in the Explorer tree."""
+        url = self.store.url(lid)
+        title_text = self.store.title(lid)
+        if not title_text:
+            title_text = url
+
+        tags_str = ", ".join(sorted(self.store.tags(lid)))
+        # URL is the first column, tags the second, link status the third
+        return title_text, (url, tags_str, self._health_text(self._health_for(lid)))
+
+    def _insert_explorer_link(self, cat_item_id, lid, index="end"):
+        title_text, values = self._explorer_row(lid)
+        item_id = self.explorer_tree.insert(
+            cat_item_id,
+            index,
+            text=title_text,
+            values=values
+        )
+        self.store.explorer_items.bind(lid, item_id)
+        return item_id
+
+    def _clear_explorer_tree(self):
+        self.scheduler.cancel("explorer")
+        self.scheduler.cancel_if(lambda key: isinstance(key, tuple) and key[0] == "category")
+        # Detached (filtered-out) categories are not returned by get_children()
+        for item_id in self.hidden_items:
+            if self.explorer_tree.exists(item_id):
+                self.explorer_tree.delete(item_id)
+        self.hidden_items.clear()
+        children = self.explorer_tree.get_children()
+        if children:
+            self.explorer_tree.delete(*children)
+        self.store.explorer_items.clear()
+        self.store.category_items.clear()
+        self.materialized_categories.clear()
+        self.explorer_placeholders.clear()
+
+    def _open_category(self, cat_id):
+        self.scheduler.finish("explorer")
+        item = self.store.item_for_category(cat_id)
+        if item is not None:
+            self._materialize_category(cat_id)
+            self.explorer_tree.item(item, open=True)
+
+    def _expand_category_by_name(self, cat_name):
+        self._open_category(self.store.category_id_by_name(cat_name))
+
+    @instrumentation.action
+    def on_explorer_open(self, event):
+        cat_id = self.store.category_for_item(self.explorer_tree.focus())
+        if cat_id is not None:
+            self._materialize_category(cat_id, in_slices=True)
+
+    def on_explorer_close(self, event):
+        self._release_collapsed_categories()
+
+    # --------------------------------------------------------------------------
+    # 2C. APPLYING MODEL CHANGES (BOTH TREES)
+    # --------------------------------------------------------------------------
+    # Every store mutation arrives here as one StoreEvent. Both trees patch only
+    # the rows the event names, so open/closed and selection state survive.
+    def _on_store_event(self, event):
+        self._settle_tree_work()
+        if event.kind != GROUPS_REBUILT:
+            # URL rules only change grouping, not what is saved
+            self._note_change()
+        self._apply_event_to_filter(event)
+        self._apply_event_to_explorer(event)
+        self._apply_event_to_deduper(event)
+        if event.kind == LINK_REMOVED:
+            index = self.store.search_index
+            if index is not None and index.needs_compaction():
+                self.build_search_index()
+        if event.kind in (CATEGORY_ADDED, CATEGORY_RENAMED, CATEGORY_REMOVED):
+            self.scheduler.request("category-combo", self._populate_category_combo)
+
+    def _settle_tree_work(self):
+        """
+        Finish the sliced inserts before an event patches the trees, which
+        places rows by index. Expand/collapse all only goes by group key and
+        carries on.
+        """
+        for key in self.scheduler.keys():
+            if key != "deduper-expand":
+                self.scheduler.finish(key)
+
+    def _request_category_state(self, cat_id):
+        # Bulk edits send one event per link; a category's expander and
+        # filter visibility only need checking once they are done
+        self.scheduler.request(("category-state", cat_id), self._sync_category_state, cat_id)
+
+    def _sync_category_state(self, cat_id):
+        self._sync_placeholder(cat_id)
+        self._update_category_visibility(cat_id)
+
+    def _apply_event_to_filter(self, event):
+        if not self.filter_mode:
+            return
+        if event.kind in (LINK_ADDED, LINK_UPDATED):
+            if self._bookmark_matches_filter(self._get_tags_for_link_elem(event.lid)):
+                self.filter_matches.add(event.lid)
+            else:
+                self.filter_matches.discard(event.lid)
+        elif event.kind == LINK_REMOVED:
+            self.filter_matches.discard(event.lid)
+
+    def _apply_event_to_explorer(self, event):
+        kind = event.kind
+        tree = self.explorer_tree
+
+        if kind in (LINK_ADDED, LINK_UPDATED):
+            self._sync_link_row(event.lid)
+            self._request_category_state(event.cat_id or self.store.category_of(event.lid))
+
+        elif kind == LINK_MOVED:
+            self._sync_link_row(event.lid)
+            for cat_id in (event.old_cat_id, event.cat_id):
+                self._request_category_state(cat_id)
+
+        elif kind == LINK_REMOVED:
+            item_id = self.store.item_for_lid(event.lid)
+            if item_id is not None and tree.exists(item_id):
+                tree.delete(item_id)
+            self._request_category_state(event.cat_id)
+
+        elif kind == CATEGORY_ADDED:
+            self._insert_explorer_category(event.cat_id)
+            self._update_category_visibility(event.cat_id)
+
+        elif kind == CATEGORY_RENAMED:
+            cat_item = self.store.item_for_category(event.cat_id)
+            if cat_item is not None:
+                tree.item(cat_item, text=self.store.categories[event.cat_id])
+
+        elif kind == CATEGORY_REMOVED:
+            cat_item = self.store.item_for_category(event.cat_id)
+            self.materialized_categories.pop(event.cat_id, None)
+            self.explorer_placeholders.pop(event.cat_id, None)
+            if cat_item is not None:
+                self._forget_hidden_item(cat_item)
+                if tree.exists(cat_item):
+                    tree.delete(cat_item)
+
+    def _apply_event_to_deduper(self, event):
+        kind = event.kind
+
+        if kind == GROUPS_REBUILT:
+            # Near-duplicate clusters do not depend on the URL rules
+            if self.deduper_mode == "exact":
+                self._rebuild_exact_groups()
+
+        elif self.deduper_mode == "near" and kind in (LINK_ADDED, LINK_REMOVED, GROUP_CHANGED):
+            # Clusters are a snapshot: new links wait for the next Refresh, and
+            # a link whose URL changed no longer has a meaningful score
+            if kind != LINK_ADDED:
+                self.marked_links.discard(event.lid)
+                self._near_remove_link(event.lid)
+
+        elif kind == LINK_ADDED:
+            self._deduper_add_to_group(event.lid, event.group)
+
+        elif kind == LINK_REMOVED:
+            self.marked_links.discard(event.lid)
+            self._deduper_remove_from_group(event.lid, event.group)
+
+        elif kind == GROUP_CHANGED:
+            # A mark made for the old group means nothing in the new one
+            self.marked_links.discard(event.lid)
+            self._deduper_remove_from_group(event.lid, event.old_group)
+            self._deduper_add_to_group(event.lid, event.group)
+
+        elif kind == LINK_MOVED:
+            self._set_deduper_value(event.lid, 1, self.store.category_name(event.cat_id))
+
+        elif kind == LINK_UPDATED:
+            self._set_deduper_value(event.lid, 0, self.store.url(event.lid))
+
+        elif kind == CATEGORY_RENAMED:
+            cat_name = self.store.category_name(event.cat_id)
+            for lid in self.store.links_in_category(event.cat_id):
+                self._set_deduper_value(lid, 1, cat_name)
+
+    def _set_deduper_value(self, lid, column, value):
+        item_id = self.deduper_items.item_for(lid)
+        if item_id is None:
+            return
+        vals = list(self.tree.item(item_id, "values"))
+        vals[column] = value
+        self.tree.item(item_id, values=vals)
+
+    def _deduper_add_to_group(self, lid, norm_url):
+        if self.store.group_size(norm_url) < 2:
+            return
+
+        group_item = self.deduper_groups.item_for(norm_url)
+        if group_item is None:
+            # The group just became a duplicate group
+            self._place_deduper_group(norm_url)
+        else:
+            if norm_url in self.deduper_materialized:
+                self._insert_deduper_link(group_item, lid)
+            self._place_deduper_group(norm_url)
+        self.scheduler.request("deduper-summary", self._update_deduper_summary)
+
+    def _deduper_remove_from_group(self, lid, norm_url):
+        item_id = self.deduper_items.unbind_key(lid)
+        if item_id is not None and self.tree.exists(item_id):
+            self.tree.delete(item_id)
+        if self.current_selected_link == lid:
+            self.current_selected_link = None
+            self.btn_apply_category.config(state=tk.DISABLED)
+
+        if self.deduper_groups.item_for(norm_url) is None:
+            return
+        if self.store.group_size(norm_url) <= 1:
+            self._deduper_remove_group(norm_url)
+        else:
+            self._place_deduper_group(norm_url)
+        self.scheduler.request("deduper-summary", self._update_deduper_summary)
+
+    def _unplace_deduper_group(self, norm_url):
+        sort_key = self.group_sort_key_of.pop(norm_url, None)
+        if sort_key is None:
+            return
+        pos = bisect.bisect_left(self.group_sort_keys, sort_key)
+        if pos < len(self.group_sort_keys) and self.group_sort_keys[pos] == sort_key:
+            del self.group_sort_keys[pos]
+            del self.group_ids[pos]
+
+    def _place_deduper_group(self, norm_url):
+        """Insert or move a group header to where its current size puts it."""
+        self._unplace_deduper_group(norm_url)
+        sort_key = self._deduper_sort_key(norm_url)
+        pos = bisect.bisect_left(self.group_sort_keys, sort_key)
+        self.group_sort_keys.insert(pos, sort_key)
+        self.group_ids.insert(pos, norm_url)
+        self.group_sort_key_of[norm_url] = sort_key
+
+        group_item = self.deduper_groups.item_for(norm_url)
+        if group_item is None:
+            self._insert_deduper_group(norm_url, pos)
+        else:
+            self.tree.move(group_item, "", pos)
+            self.tree.item(group_item, text=self._deduper_group_label(norm_url))
+
+    def _deduper_remove_group(self, norm_url):
+        group_item = self.deduper_groups.unbind_key(norm_url)
+        if group_item is None:
+            return
+        for child in self.tree.get_children(group_item):
+            if self.deduper_items.unbind_item(child) == self.current_selected_link:
+                self.current_selected_link = None
+        self.tree.delete(group_item)
+        self.deduper_placeholders.pop(norm_url, None)
+        self.deduper_materialized.discard(norm_url)
+        self._unplace_deduper_group(norm_url)
+
+    # --------------------------------------------------------------------------
+    # 3. EVENT HANDLING - DEDUPER
+    # --------------------------------------------------------------------------
+    def on_tree_select(self, event):
+        selected = self.tree.selection()
+        if not selected:
+            self.current_selected_link = None
+            self.btn_apply_category.config(state=tk.DISABLED)
+            return
+        
+        sel_item = selected[0]
+        parent = self.tree.parent(sel_item)
+        
+        if not parent:
+            self.current_selected_link = None
+            self.btn_apply_category.config(state=tk.DISABLED)
+            return
+        
+        lid = self._find_link_by_tree_item(sel_item)
+        if lid is not None:
+            self.current_selected_link = lid
+            kat_id = self.store.category_of(lid)
+            cat_name = self.store.category_name(kat_id)
+            
+            all_values = list(self.category_combo["values"])
+            if cat_name not in all_values:
+                all_values.append(cat_name)
+                self.category_combo.config(values=all_values)
+            try:
+                self.category_combo.current(all_values.index(cat_name))
+            except ValueError:
+                self.category_combo.current(0)
+            
+            self.btn_apply_category.config(state=tk.NORMAL)
+        else:
+            self.current_selected_link = None
+            self.btn_apply_category.config(state=tk.DISABLED)
+
+    def on_tree_double_click(self, event):
+        item_id = self.tree.focus()
+        if not item_id:
+            return
+        lid = self.deduper_items.key_for(item_id)
+        if lid is None:
+            return
+        if lid in self.marked_links:
+            self.marked_links.discard(lid)
+            new_marked = "No"
+        else:
+            self.marked_links.add(lid)
+            new_marked = "Yes"
+        self._set_deduper_value(lid, 2, new_marked)
+        self._update_deduper_summary()
+        self.status_label.config(text=f"Marked toggled to '{new_marked}'.")
+
+    def _find_link_by_tree_item(self, item_id):
+        return self.deduper_items.key_for(item_id)
+
+    # --------------------------------------------------------------------------
+    # 4. CATEGORY REASSIGNMENT (DEDUPER)
+    # --------------------------------------------------------------------------
+    @instrumentation.action
+    def apply_category(self):
+        if self.current_selected_link not in self.store:
+            return
+        
+        new_cat_name = self.category_combo.get()
+        cat_id = self.store.ensure_category(new_cat_name)
+        # Both trees are patched by the resulting LINK_MOVED event
+        self.store.set_category(self.current_selected_link, cat_id)
+
+        self.status_label.config(text=f"Category changed to '{new_cat_name}'.")
+
+    def _create_new_category(self, cat_name):
+        return self.store.add_category(cat_name)
+
+    # --------------------------------------------------------------------------
+    # 5. MARKING, UNMARKING, REMOVING (DEDUPER)
+    # --------------------------------------------------------------------------
+    @instrumentation.action
+    def mark_all_but_one(self):
+        # Marks live in marked_links, so groups that were never opened are
+        # marked without inserting their rows
+        group_count = 0
+        for group in self.group_ids:
+            members = self._group_members(group)
+            if len(members) > 1:
+                group_count += 1
+                for lid in members[1:]:
+                    if lid not in self.marked_links:
+                        self.marked_links.add(lid)
+                        self._set_deduper_value(lid, 2, "Yes")
+        self._update_deduper_summary()
+        self.status_label.config(text=f"Marked duplicates in {group_count} group(s).")
+
+    @instrumentation.action
+    def unmark_selected(self):
+        selected = self.tree.selection()
+        unmarked_count = 0
+        for item_id in selected:
+            lid = self.deduper_items.key_for(item_id)
+            if lid in self.marked_links:
+                self.marked_links.discard(lid)
+                self._set_deduper_value(lid, 2, "No")
+                unmarked_count += 1
+        self._update_deduper_summary()
+        self.status_label.config(text=f"Unmarked {unmarked_count} selected item(s).")
+
+    @instrumentation.action
+    def remove_marked(self):
+        if not self.store.loaded:
+            return
+
+        marked_lids = [lid for lid in self.marked_links if lid in self.store]
+        self.marked_links.clear()
+
+        # Rows disappear from both trees through LINK_REMOVED events
+        removed_count = self.store.remove_links(marked_lids)
+        self._update_deduper_summary()
+
+        self.status_label.config(text=f"Removed {removed_count} marked item(s).")
+
+    # --------------------------------------------------------------------------
+    # 6. EXPAND/COLLAPSE (DEDUPER)
+    # --------------------------------------------------------------------------
+    @instrumentation.action
+    def expand_collapse_all(self, expand=True):
+        # Groups are opened in slices, starting from the ones in view; a
+        # second click replaces a run still going
+        self.scheduler.finish("deduper")
+        done = "All groups expanded." if expand else "All groups collapsed."
+        self.scheduler.submit(
+            "deduper-expand",
+            self._iter_expand_groups(self._deduper_groups_from_view(), expand),
+            PRIORITY_VISIBLE,
+            on_done=lambda: self.status_label.config(text=done),
+        )
+        if self.scheduler.busy("deduper-expand"):
+            self.status_label.config(text="Expanding groups..." if expand else "Collapsing groups...")
+
+    def _deduper_groups_from_view(self):
+        """group_ids rotated to start at the topmost group on screen."""
+        top = ""
+        # Skip the heading row
+        for y in range(1, 64, 4):
+            top = self.tree.identify_row(y)
+            if top:
+                break
+        group = self.deduper_groups.key_for(self.tree.parent(top) or top) if top else None
+        sort_key = self.group_sort_key_of.get(group)
+        if sort_key is None:
+            return list(self.group_ids)
+        pos = bisect.bisect_left(self.group_sort_keys, sort_key)
+        return self.group_ids[pos:] + self.group_ids[:pos]
+
+    def _iter_expand_groups(self, groups, expand):
+        for norm_url in groups:
+            group_item = self.deduper_groups.item_for(norm_url)
+            if group_item is None:
+                # Removed since the run started
+                continue
+            if expand:
+                self._materialize_deduper_group(norm_url)
+            else:
+                # Collapsing gives the rows back; they are rebuilt on the next open
+                self._release_deduper_group(norm_url)
+            self.tree.item(group_item, open=expand)
+            yield
+
+    # --------------------------------------------------------------------------
+    # 6B. SAVING AND AUTOSAVE
+    # --------------------------------------------------------------------------
+    def is_dirty(self):
+        return self.change_count != self.saved_count
+
+    def _note_change(self):
+        # A database commits every edit itself; only XML needs saving
+        if self.db is not None:
+            return
+        if self.journal is not None:
+            if self.journal.error is None:
+                # Not from inside the store's event dispatch: the journal
+                # has to see this change before a snapshot is taken
+                if self.journal.needs_compaction() and self.compact_after_id is None:
+                    self.compact_after_id = self.master.after_idle(self.compact_journal)
+                return
+            self._drop_journal()
+        was_dirty = self.is_dirty()
+        self.change_count += 1
+        if not was_dirty:
+            self._update_title()
+        self._schedule_autosave()
+
+    def _update_title(self):
+        title = "Bookmark Manager"
+        if self.current_path:
+            title += f" - {os.path.basename(self.current_path)}"
+        if self.is_dirty():
+            title += " *"
+        self.master.title(title)
+
+    def _schedule_autosave(self):
+        if (self.autosave_after_id is None and self.autosave_var.get() and self.is_dirty()
+                and self.db is None and self.current_path):
+            self.autosave_after_id = self.master.after(self.autosave_delay_ms, self.autosave)
+
+    def _cancel_autosave(self):
+        if self.autosave_after_id is not None:
+            self.master.after_cancel(self.autosave_after_id)
+            self.autosave_after_id = None
+
+    def on_autosave_toggled(self):
+        if self.autosave_var.get():
+            self._schedule_autosave()
+        else:
+            self._cancel_autosave()
+
+    @instrumentation.action
+    def autosave(self):
+        self.autosave_after_id = None
+        if self.is_dirty() and self.db is None and self.current_path:
+            self.save_to(self.current_path, "autosave")
+
+    @instrumentation.action
+    def compact_journal(self):
+        self.compact_after_id = None
+        # A running save already folds the journal; the next change checks again
+        if self.save_task is not None and self.save_task.is_alive():
+            return
+        if self.journal is not None and self.journal.needs_compaction():
+            self.save_to(self.current_path, "compact")
+
+    def _drop_journal(self):
+        """Fall back to saving the XML after the journal failed to write."""
+        error = self.journal.error
+        self.journal.close()
+        self.journal = None
+        # Whatever the journal lost is only in memory now
+        self.saved_count = self.change_count - 1
+        self._update_title()
+        self._schedule_autosave()
+        messagebox.showwarning(
+            "Journal", f"Changes can no longer be journaled:\n{error}\n\nSave the XML to keep them."
+        )
+
+    def _offer_to_save(self):
+        """Ask whether to save unsaved changes first; False means cancel."""
+        if not self.is_dirty():
+            return True
+        with instrumentation.paused():
+            answer = messagebox.askyesnocancel(
+                "Unsaved Changes", f"Save changes to {os.path.basename(self.current_path)}?"
+            )
+        if answer is None:
+            return False
+        if answer:
+            self.save_xml()
+        return True
+
+    @instrumentation.action
+    def save_xml(self):
+        """Save to the XML file the collection came from; a database is already saved."""
+        if not self.store.loaded:
+            return
+        if self.db is not None:
+            self.db.commit()
+            self.status_label.config(text="All changes are saved in the database.")
+            return
+        self.save_to(self.current_path)
+
+    @instrumentation.action
+    def save_xml_as(self):
+        if not self.store.loaded:
+            return
+        with instrumentation.paused():
+            file_path = filedialog.asksaveasfilename(
+                title="Export XML" if self.db is not None else "Save XML As",
+                defaultextension=".xml",
+                filetypes=[("XML Files", "*.xml"), ("All Files", "*.*")]
+            )
+        if not file_path:
+            return
+        self.save_to(file_path)
+
+    # save_to() kinds: (status while running, status when done)
+    SAVE_MESSAGES = {
+        "save": ("Saving", "Saved"),
+        "autosave": ("Autosaving", "Autosaved"),
+        "compact": ("Folding the journal into", "Folded the journal into"),
+    }
+
+    def save_to(self, file_path, kind="save"):
+        """
+        Write the collection to file_path on a worker. The snapshot is taken
+        here, so editing can go on while the file is written.
+        """
+        if self.save_task is not None and self.save_task.is_alive():
+            # Started again, from a fresh snapshot, once the running save is done
+            self.save_queued = (file_path, kind)
+            return
+        self._cancel_autosave()
+
+        store = self.store
+        write = store.snapshot()
+        count = self.change_count
+        backups = self.save_backups
+        journal = self.journal
+        if journal is not None:
+            journal.begin_save()
+
+        # The journal learns the new file's signature before the rename, so
+        # a crash before end_save() still finds the edits made meanwhile
+        mark = journal.mark_save if journal is not None else None
+
+        def run(task):
+            atomic_write(file_path, write, backups, before_replace=mark)
+
+        # Not cancellable: the file is replaced in one step at the end anyway
+        self.save_task = self._start_task(
+            run,
+            on_done=lambda result: self._on_save_done(store, journal, file_path, count, kind),
+            on_error=lambda e: self._on_save_error(journal, e),
+            name="xml-saver",
+            label=f"{self.SAVE_MESSAGES[kind][0]} {os.path.basename(file_path)}",
+            cancellable=False,
+        )
+        self.status_label.config(text=f"{self.SAVE_MESSAGES[kind][0]} {os.path.basename(file_path)}...")
+
+    @instrumentation.action
+    def _on_save_done(self, store, journal, file_path, count, kind):
+        self.save_task = None
+        if journal is not None:
+            # The XML now holds everything journaled up to the snapshot
+            journal.end_save(file_path)
+        if store is self.store and self.db is None:
+            # Save As moves the collection to the new file
+            self.current_path = file_path
+            self.saved_count = count
+            self._update_title()
+        self.status_label.config(
+            text=f"{self.SAVE_MESSAGES[kind][1]} {os.path.basename(file_path)} at {time.strftime('%H:%M:%S')}."
+        )
+
+        queued, self.save_queued = self.save_queued, None
+        if queued is not None:
+            self.save_to(*queued)
+        elif self.close_after_save:
+            self._close()
+        else:
+            self._schedule_autosave()
+
+    def _on_save_error(self, journal, e):
+        self.save_task = None
+        if journal is not None:
+            journal.abort_save()
+        self.save_queued = None
+        self.close_after_save = False
+        messagebox.showerror("Error", f"Could not save file:\n{e}")
+        self.status_label.config(text="Saving failed; your changes are not saved yet.")
+
+    # --------------------------------------------------------------------------
+    # 7. EXPLORER TAB: SELECTION + CATEGORY MGMT
+    # --------------------------------------------------------------------------
+    def on_explorer_select(self, event):
+        pass
+
+    @instrumentation.action
+    def add_category(self):
+        new_name = self._prompt_for_text("New Category Name")
+        if not new_name:
+            return
+        
+        cat_id = self._create_new_category(new_name)
+
+        self.status_label.config(text=f"Added new category '{new_name}' (ID={cat_id}).")
+
+    @instrumentation.action
+    def rename_category(self):
+        sel_items = self.explorer_tree.selection()
+        if not sel_items:
+            return
+        
+        item_id = sel_items[0]
+        parent = self.explorer_tree.parent(item_id)
+        if parent:
+            messagebox.showinfo("Info", "Please select a category to rename.")
+            return
+
+        old_name = self.explorer_tree.item(item_id, "text")
+        cat_id = self.store.category_for_item(item_id)
+        if cat_id is None:
+            messagebox.showwarning("Warning", "Could not determine category ID for this category.")
+            return
+
+        new_name = self._prompt_for_text("New Category Name", default_value=old_name)
+        if not new_name or new_name == old_name:
+            return
+
+        self.store.rename_category(cat_id, new_name)
+
+        self.status_label.config(text=f"Renamed category '{old_name}' to '{new_name}'.")
+
+    @instrumentation.action
+    def remove_category(self):
+        sel_items = self.explorer_tree.selection()
+        if not sel_items:
+            return
+        
+        item_id = sel_items[0]
+        parent = self.explorer_tree.parent(item_id)
+        if parent:
+            messagebox.showinfo("Info", "Please select a category to remove.")
+            return
+        
+        cat_name = self.explorer_tree.item(item_id, "text")
+        cat_id = self.store.category_for_item(item_id)
+        if cat_id is None:
+            messagebox.showwarning("Warning", "Could not determine category ID for this category.")
+            return
+
+        with instrumentation.paused():
+            confirm = messagebox.askyesno("Confirm", 
+                f"Remove category '{cat_name}' (ID={cat_id}) and all associated bookmarks?")
+        if not confirm:
+            return
+        
+        removed_links_count = len(self.store.remove_category(cat_id))
+
+        self.status_label.config(
+            text=f"Removed category '{cat_name}' and {removed_links_count} associated bookmark(s)."
+        )
+
+    # --------------------------------------------------------------------------
+    # 8. EXPLORER TAB: ADDING BOOKMARKS (with Enhanced Title Extraction)
+    # --------------------------------------------------------------------------
+    @instrumentation.action
+    def add_bookmark(self):
+        url = self.new_url_entry.get().strip()
+        if not url:
+            messagebox.showinfo("Info", "Please enter a valid URL.")
+            return
+        
+        cat_name = self.new_bmk_cat_combo.get()
+        cat_id = self.store.ensure_category(cat_name)
+
+        # The URL stands in as the title until the page title arrives
+        lid = self.store.add_link(url, cat_id, title=url)
+        self._expand_category_by_name(cat_name)
+
+        store = self.store
+        future = self.title_fetcher.submit(url)
+        future.add_done_callback(
+            lambda f: f.cancelled() or self.bridge.post(self._apply_fetched_title, store, lid, url, f.result())
+        )
+
+        self.status_label.config(text=f"Added new bookmark (URL='{url}', Category='{cat_name}').")
+        self.new_url_entry.delete(0, tk.END)
+
+    # --------------------------------------------------------------------------
+    # 8B. EXPLORER TAB: FETCHING TITLES
+    # --------------------------------------------------------------------------
+    def _install_metadata_cache(self, cache):
+        """Switch title fetching to cache (None runs without a cache)."""
+        if self.metadata_cache is not None:
+            self.title_fetcher.cache = None
+            self.metadata_cache.close()
+        self.metadata_cache = cache
+        self.title_fetcher.cache = cache
+
+    def _title_missing(self, lid):
+        title = self.store.title(lid)
+        return not title or title == self.store.url(lid)
+
+    def _apply_fetched_title(self, store, lid, url, title):
+        # Skip results for a collection that has since been replaced, and for
+        # links that were deleted or pointed elsewhere while the fetch ran
+        if not title or store is not self.store or lid not in store:
+            return False
+        if store.url(lid) != url or not self._title_missing(lid):
+            return False
+        store.set_title(lid, title)
+        return True
+
+    @instrumentation.action
+    def toggle_fetch_missing_titles(self):
+        if self.title_task is not None:
+            self.cancel_title_fetch()
+        else:
+            self.fetch_missing_titles()
+
+    def fetch_missing_titles(self):
+        if self.title_task is not None:
+            return
+        store = self.store
+
+        def run(task):
+            # The same test as _title_missing(), on the worker's side of the lock
+            jobs = [(lid, url) for lid, url, title in store.iter_fields((F_URL, F_TITLE))
+                    if url and (not title or title == url)]
+            total = len(jobs)
+            done = found = 0
+            task.report(done, total, found, force=True)
+            for lid, url, title in self.title_fetcher.fetch_many(jobs, should_cancel=lambda: task.cancelled):
+                done += 1
+                if title:
+                    found += 1
+                    self.bridge.post(self._apply_fetched_title, store, lid, url, title)
+                task.report(done, total, found)
+            task.check_cancelled()
+            return done, found
+
+        self.title_task = self._start_task(
+            run,
+            on_done=self._on_titles_done,
+            on_error=self._on_titles_error,
+            on_cancel=self._on_titles_cancelled,
+            on_progress=self._on_titles_progress,
+            name="title-fetch",
+            label="Fetching titles",
+        )
+
+        self.btn_fetch_titles.config(text="Cancel Title Fetch")
+        self.status_label.config(text="Fetching missing titles...")
+
+    def cancel_title_fetch(self):
+        if self.title_task is not None:
+            self.title_task.cancel()
+            self.status_label.config(text="Cancelling title fetch...")
+
+    def _on_titles_progress(self, done, total, found):
+        self.tasks.progress(self.title_task, done, total,
+                            f"Fetching titles... {done:,} / {total:,} ({found:,} found)")
+
+    def _finish_title_task(self):
+        self.title_task = None
+        self.btn_fetch_titles.config(text="Fetch Missing Titles")
+
+    def _on_titles_done(self, result):
+        self._finish_title_task()
+        done, found = result
+        if not done:
+            self.status_label.config(text="No bookmarks with missing titles.")
+        else:
+            self.status_label.config(text=f"Fetched titles for {found:,} of {done:,} bookmark(s).")
+
+    def _on_titles_error(self, e):
+        self._finish_title_task()
+        messagebox.showerror("Error", f"Title fetch failed: {e}")
+
+    def _on_titles_cancelled(self):
+        self._finish_title_task()
+        self.status_label.config(text="Title fetch cancelled.")
+
+    # --------------------------------------------------------------------------
+    # 8C. EXPLORER TAB: CHECKING LINKS
+    # --------------------------------------------------------------------------
+    def _health_for(self, lid):
+        url = self.store.url(lid)
+        return self.link_health.get(cache_key(url)) if url else None
+
+    def _health_class_for(self, lid):
+        health = self._health_for(lid)
+        return health_class(health) if health is not None else ""
+
+    def _health_text(self, health):
+        if health is None:
+            return ""
+        if health.status is None:
+            return f"unreachable ({health.error})"
+        text = f"{health.status}, {health.latency_ms:.0f} ms"
+        if health_class(health) == HEALTH_REDIRECTED:
+            text += f" -> {health.final_url}"
+        return text
+
+    @instrumentation.action
+    def toggle_check_links(self):
+        if self.link_check_task is not None:
+            self.cancel_link_check()
+        else:
+            self.check_links()
+
+    def check_links(self):
+        if self.link_check_task is not None:
+            return
+        store = self.store
+        cache = self.metadata_cache
+        # Only this run adds to link_health until the next load replaces it
+        link_health = self.link_health
+        recheck_after = self.link_recheck_after
+
+        def run(task):
+            # One check per distinct URL; links checked recently are skipped so a
+            # cancelled or interrupted run picks up where it stopped
+            now = time.time()
+            lids_by_key = {}
+            jobs = []
+            skipped = set()
+            for lid, url in store.iter_fields((F_URL,)):
+                if not url:
+                    continue
+                key = cache_key(url)
+                if key in lids_by_key:
+                    lids_by_key[key].append(lid)
+                    continue
+                if key in skipped:
+                    continue
+                health = link_health.get(key)
+                if health is not None and now - health.checked_at < recheck_after:
+                    skipped.add(key)
+                    continue
+                lids_by_key[key] = [lid]
+                jobs.append((key, url))
+            total = len(jobs)
+
+            done = broken = 0
+            task.report(done, total, broken, force=True)
+            for key, url, health in self.link_checker.check_many(jobs, should_cancel=lambda: task.cancelled):
+                done += 1
+                if health_class(health) in (HEALTH_CLIENT_ERROR, HEALTH_SERVER_ERROR, HEALTH_UNREACHABLE):
+                    broken += 1
+                if cache is not None:
+                    cache.put_health(health)
+                self.bridge.post(self._apply_link_health, store, key, health, lids_by_key[key])
+                task.report(done, total, broken)
+            task.check_cancelled()
+            return done, broken, len(skipped)
+
+        self.link_check_task = self._start_task(
+            run,
+            on_done=self._on_link_check_done,
+            on_error=self._on_link_check_error,
+            on_cancel=self._on_link_check_cancelled,
+            on_progress=self._on_link_check_progress,
+            name="link-check",
+            label="Checking links",
+        )
+
+        self.btn_check_links.config(text="Cancel Link Check")
+        self.status_label.config(text="Checking links...")
+
+    def _apply_link_health(self, store, key, health, lids):
+        if store is not self.store:
+            return
+        self.link_health[key] = health
+        cat_ids = set()
+        for lid in lids:
+            if lid in store:
+                self._sync_link_row(lid)
+                cat_ids.add(store.category_of(lid))
+        for cat_id in cat_ids:
+            self._update_category_visibility(cat_id)
+
+    def cancel_link_check(self):
+        if self.link_check_task is not None:
+            self.link_check_task.cancel()
+            self.status_label.config(text="Cancelling link check...")
+
+    def _on_link_check_progress(self, done, total, broken):
+        self.tasks.progress(self.link_check_task, done, total,
+                            f"Checking links... {done:,} / {total:,} ({broken:,} broken)")
+
+    def _finish_link_check_task(self):
+        self.link_check_task = None
+        self.btn_check_links.config(text="Check Links")
+
+    def _on_link_check_done(self, result):
+        self._finish_link_check_task()
+        done, broken, skipped = result
+        if not done:
+            self.status_label.config(text="All links were checked recently.")
+            return
+        msg = f"Checked {done:,} link(s); {broken:,} broken or unreachable."
+        if skipped:
+            msg += f" {skipped:,} checked recently were skipped."
+        self.status_label.config(text=msg)
+
+    def _on_link_check_error(self, e):
+        self._finish_link_check_task()
+        messagebox.showerror("Error", f"Link check failed: {e}")
+
+    def _on_link_check_cancelled(self):
+        self._finish_link_check_task()
+        self.status_label.config(text="Link check cancelled. Run it again to resume.")
+
+    @instrumentation.action
+    def on_status_filter_selected(self, event=None):
+        label, self.status_filter = self.LINK_STATUS_FILTERS[self.status_filter_combo.current()]
+        self._apply_filter()
+        if self.status_filter is None:
+            self.status_label.config(text="Showing bookmarks of any link status.")
+        else:
+            self.status_label.config(text=f"Showing only bookmarks with link status: {label}.")
+
+    # --------------------------------------------------------------------------
+    # 8D. EXPLORER TAB: SEARCH
+    # --------------------------------------------------------------------------
+    # The index is filled on a worker thread, which reads the links under the
+    # store's read lock, and handed to the store, which keeps it current on
+    # every edit from then on.
+    def build_search_index(self):
+        if self.search_index_task is not None:
+            self.search_index_task.cancel()
+        store = self.store
+        index, rows = store.begin_search_index()
+        total = len(store)
+
+        def run(task):
+            n = 0
+            for n, (lid, title, url, tags) in enumerate(rows, 1):
+                index.add(lid, title, url, tags)
+                if n % 5000 == 0:
+                    task.check_cancelled()
+                    task.report(n, total)
+            instrumentation.count("records_indexed", n)
+            return index
+
+        task = self._start_task(
+            run,
+            on_done=lambda result: self._on_search_index_done(task, store, result),
+            on_error=lambda e: self._on_search_index_error(task, e),
+            on_progress=self._on_search_index_progress,
+            name="search-index",
+            label="Indexing for search",
+        )
+        self.search_index_task = task
+
+    def _on_search_index_progress(self, done, total):
+        text = f"Indexing for search... {done:,} / {total:,}"
+        self.search_status_label.config(text=text)
+        self.tasks.progress(self.search_index_task, done, total, text)
+
+    def _on_search_index_done(self, task, store, index):
+        if task is not self.search_index_task:
+            return
+        self.search_index_task = None
+        if store is not self.store:
+            return
+        store.install_search_index(index)
+        if self.search_var.get().strip():
+            self.run_search()
+        else:
+            self.search_status_label.config(text=f"{len(store):,} bookmark(s) indexed.")
+
+    def _on_search_index_error(self, task, e):
+        if task is self.search_index_task:
+            self.search_index_task = None
+            self.search_status_label.config(text=f"Search index failed: {e}")
+
+    def _reset_search(self):
+        if self.search_index_task is not None:
+            self.search_index_task.cancel()
+            self.search_index_task = None
+        if self.search_after_id is not None:
+            self.master.after_cancel(self.search_after_id)
+            self.search_after_id = None
+        self.search_results = []
+        self.search_pos = 0
+        self.search_var.set("")
+        self.search_status_label.config(text="")
+
+    def on_search_changed(self, *args):
+        if self.search_after_id is not None:
+            self.master.after_cancel(self.search_after_id)
+        self.search_after_id = self.master.after(self.search_delay_ms, self.run_search)
+
+    @instrumentation.action
+    def run_search(self):
+        self.search_after_id = None
+        text = self.search_var.get().strip()
+        self.search_results = []
+        self.search_pos = 0
+        self.btn_search_prev.config(state=tk.DISABLED)
+        self.btn_search_next.config(state=tk.DISABLED)
+        if not text:
+            self.search_status_label.config(text="")
+            return
+        if not trigrams(text.lower().split()):
+            self.search_status_label.config(text="Type at least 3 letters or digits.")
+            return
+
+        start = time.perf_counter()
+        # Bookmarks hidden by the tag or status filter are left out before
+        # the best search_limit are picked, so they cannot crowd out visible ones
+        accept = self._link_visible if self._filter_active() else None
+        hits = self.store.search(text, self.search_limit, accept)
+        if hits is None:
+            # Searched again once the index is ready
+            self.search_status_label.config(text="Search index is still being built...")
+            return
+        self.search_results = list(hits.keys)
+        elapsed = time.perf_counter() - start
+
+        matched = f"{hits.matched:,}" + ("" if hits.complete else "+")
+        if not self.search_results:
+            self.search_status_label.config(text=f"No visible matches ({matched} found, {elapsed * 1000:.0f} ms).")
+            return
+        state = tk.NORMAL if len(self.search_results) > 1 else tk.DISABLED
+        self.btn_search_prev.config(state=state)
+        self.btn_search_next.config(state=state)
+        self.search_summary = f"{matched} match(es), {elapsed * 1000:.0f} ms"
+        self.show_search_result(0)
+
+    @instrumentation.action
+    def show_search_result(self, step):
+        """Reveal the current search result, or the one step places away."""
+        if not self.search_results:
+            return
+        self.search_pos = (self.search_pos + step) % len(self.search_results)
+        lid = self.search_results[self.search_pos]
+        if lid not in self.store:
+            self.search_results.remove(lid)
+            self.search_pos = 0
+            return self.show_search_result(0)
+
+        self._open_category(self.store.category_of(lid))
+        item_id = self.store.item_for_lid(lid)
+        if item_id is not None:
+            self.explorer_tree.selection_set(item_id)
+            self.explorer_tree.focus(item_id)
+            self.explorer_tree.see(item_id)
+        self.search_status_label.config(
+            text=f"Result {self.search_pos + 1} of {len(self.search_results)} ({self.search_summary})"
+        )
+
+    # --------------------------------------------------------------------------
+    # 9. EXPLORER TAB: SORTING CATEGORIES/BOOKMARKS
+    # --------------------------------------------------------------------------
+    @instrumentation.action
+    def sort_categories(self):
+        self.scheduler.finish("explorer")
+        top_items = self.explorer_tree.get_children("")
+        cat_list = []
+        for itm in top_items:
+            cat_name = self.explorer_tree.item(itm, "text")
+            cat_list.append((cat_name, itm))
+        cat_list.sort(key=lambda x: x[0].lower())
+
+        for idx, (cat_name, itm) in enumerate(cat_list):
+            self.explorer_tree.move(itm, "", idx)
+
+        self.status_label.config(text="Sorted categories by title.")
+
+    @instrumentation.action
+    def sort_bookmarks(self):
+        # Categories that are not materialized yet pick the order up when opened
+        self.bookmark_sort_by_url = True
+        for cat_id in list(self.materialized_categories):
+            self._sync_category_rows(cat_id)
+
+        self.status_label.config(text="Sorted bookmarks by URL.")
+
+    # --------------------------------------------------------------------------
+    #  DRAG & DROP (EXPLORER)
+    # --------------------------------------------------------------------------
+    @instrumentation.action
+    def toggle_drag_drop(self):
+        self.drag_mode = not self.drag_mode
+        if self.drag_mode:
+            self.drag_drop_btn.configure(text="Disable Drag & Drop")
+            self.status_label.config(text="Drag & Drop mode enabled. Select bookmarks and drag them to another category.")
+        else:
+            self.drag_drop_btn.configure(text="Enable Drag & Drop")
+            self.status_label.config(text="Drag & Drop mode disabled.")
+
+    def on_tree_button_press(self, event):
+        if not self.drag_mode:
+            return
+        item_id = self.explorer_tree.identify_row(event.y)
+        if not item_id:
+            return
+        sel = self.explorer_tree.selection()
+        self.dragging_items = []
+        for s in sel:
+            parent = self.explorer_tree.parent(s)
+            if parent:
+                self.dragging_items.append(s)
+        if self.dragging_items:
+            self._show_drag_tooltip(len(self.dragging_items), event.x_root, event.y_root)
+
+    def on_tree_motion(self, event):
+        if not self.drag_mode or not self.dragging_items:
+            return
+        self._move_drag_tooltip(event.x_root, event.y_root)
+
+    @instrumentation.action
+    def on_tree_button_release(self, event):
+        if not self.drag_mode or not self.dragging_items:
+            self._hide_drag_tooltip()
+            return
+
+        drop_item_id = self.explorer_tree.identify_row(event.y)
+        if not drop_item_id:
+            self._hide_drag_tooltip()
+            self.dragging_items = None
+            return
+
+        parent = self.explorer_tree.parent(drop_item_id)
+        if parent:
+            new_category_item = parent
+        else:
+            new_category_item = drop_item_id
+
+        cat_name = self.explorer_tree.item(new_category_item, "text")
+        cat_id = self.store.category_for_item(new_category_item)
+
+        for bm_item in self.dragging_items:
+            old_parent = self.explorer_tree.parent(bm_item)
+            if old_parent != new_category_item:
+                # The LINK_MOVED event moves the row to the end of the new category
+                lid = self.store.lid_for_item(bm_item)
+                if lid is not None:
+                    if cat_id is None:
+                        cat_id = self._create_new_category(cat_name)
+                    self.store.set_category(lid, cat_id)
+
+        self._hide_drag_tooltip()
+        self.dragging_items = None
+        self.status_label.config(text=f"Moved bookmark(s) to '{cat_name}' category.")
+
+    def _show_drag_tooltip(self, count, x, y):
+        if not self.drag_tooltip:
+            self.drag_tooltip = tk.Toplevel(self.master)
+            self.drag_tooltip.overrideredirect(True)
+            self.drag_tooltip_label = tk.Label(self.drag_tooltip, bg="lightyellow", bd=1, relief="solid")
+            self.drag_tooltip_label.pack()
+        text = f"{count} item(s) selected"
+        self.drag_tooltip_label.config(text=text)
+        self._move_drag_tooltip(x, y)
+        self.drag_tooltip.deiconify()
+
+    def _move_drag_tooltip(self, x, y):
+        if self.drag_tooltip:
+            self.drag_tooltip.geometry(f"+{x+12}+{y+12}")
+
+    def _hide_drag_tooltip(self):
+        if self.drag_tooltip:
+            self.drag_tooltip.withdraw()
+
+    # --------------------------------------------------------------------------
+    #  HELPER METHODS - CATEGORY UTILS
+    # --------------------------------------------------------------------------
+    def _find_category_id_by_name(self, cat_name):
+        return self.store.category_id_by_name(cat_name)
+
+    # --------------------------------------------------------------------------
+    #  SMALL UTILITY FOR TEXT PROMPT
+    # --------------------------------------------------------------------------
+    def _prompt_for_text(self, title, default_value=""):
+        dialog = tk.Toplevel(self.master)
+        dialog.title(title)
+        dialog.transient(self.master)
+        dialog.grab_set()
+
+        tk.Label(dialog, text=title).pack(padx=10, pady=(10,0))
+
+        entry_var = tk.StringVar(value=default_value)
+        entry = tk.Entry(dialog, textvariable=entry_var, width=40)
+        entry.pack(padx=10, pady=(0,10))
+        entry.focus()
+
+        result = [None]
+        
+        def on_ok():
+            result[0] = entry_var.get().strip()
+            dialog.destroy()
+        def on_cancel():
+            result[0] = None
+            dialog.destroy()
+
+        btn_frame = tk.Frame(dialog)
+        btn_frame.pack(pady=(0,10))
+        
+        ok_btn = tk.Button(btn_frame, text="OK", command=on_ok)
+        ok_btn.pack(side=tk.LEFT, padx=5)
+        cancel_btn = tk.Button(btn_frame, text="Cancel", command=on_cancel)
+        cancel_btn.pack(side=tk.LEFT, padx=5)
+
+        with instrumentation.paused():
+            dialog.wait_window()
+        return result[0]
+
+    # --------------------------------------------------------------------------
+    #  COPY & DELETE SELECTED BOOKMARKS
+    # --------------------------------------------------------------------------
+    @instrumentation.action
+    def copy_selected_bookmark_url(self):
+        sel = self.explorer_tree.selection()
+        if not sel:
+            return
+        
+        urls_to_copy = []
+        for item_id in sel:
+            parent = self.explorer_tree.parent(item_id)
+            lid = self.store.lid_for_item(item_id)
+            if parent and lid is not None:
+                urls_to_copy.append(self.store.url(lid))
+        if not urls_to_copy:
+            self.status_label.config(text="No bookmarks selected to copy.")
+            return
+
+        clip_text = "\n".join(urls_to_copy)
+        self.master.clipboard_clear()
+        self.master.clipboard_append(clip_text)
+        self.status_label.config(text=f"Copied {len(urls_to_copy)} URL(s) to clipboard.")
+
+    @instrumentation.action
+    def delete_selected_bookmarks(self):
+        sel = self.explorer_tree.selection()
+        if not sel:
+            return
+
+        doomed_lids = []
+        for item_id in sel:
+            parent = self.explorer_tree.parent(item_id)
+            if parent:
+                lid = self.store.lid_for_item(item_id)
+                if lid is not None:
+                    doomed_lids.append(lid)
+
+        # One pass over the XML root for the whole selection; the rows are
+        # removed from both trees through LINK_REMOVED events
+        delete_count = self.store.remove_links(doomed_lids)
+
+        self.status_label.config(text=f"Deleted {delete_count} bookmark(s).")
+
+    # --------------------------------------------------------------------------
+    #  CREATE AN EMPTY XML
+    # --------------------------------------------------------------------------
+    @instrumentation.action
+    def create_empty_xml(self):
+        with instrumentation.paused():
+            file_path = filedialog.asksaveasfilename(
+                title="Create Empty XML",
+                defaultextension=".xml",
+                filetypes=[("XML Files", "*.xml"), ("All Files", "*.*")]
+            )
+        if not file_path:
+            return
+        
+        new_root = ET.Element("SafavorRoot")
+        new_tree = ET.ElementTree(new_root)
+
+        try:
+            new_tree.write(file_path, encoding="utf-8", xml_declaration=True)
+            messagebox.showinfo("Success", f"Empty XML created at: {file_path}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to create file:\n{e}")
+
+    # --------------------------------------------------------------------------
+    #  REFRESH DEDUPER
+    # --------------------------------------------------------------------------
+    def _sync_deduper_tree(self):
+        """
+        Reconcile the Deduper tree with the store's duplicate-group index.
+        Events keep the tree current, so this normally only re-sorts headers.
+        """
+        self.scheduler.finish("deduper")
+        self._group_links()
+        for norm_url in list(self.deduper_groups.key_to_item):
+            if norm_url not in self.group_sort_key_of:
+                self._deduper_remove_group(norm_url)
+
+        group_items = []
+        for norm_url in self.group_ids:
+            group_item = self.deduper_groups.item_for(norm_url)
+            if group_item is None:
+                group_item = self._insert_deduper_group(norm_url)
+            else:
+                self.tree.item(group_item, text=self._deduper_group_label(norm_url))
+                if norm_url in self.deduper_materialized:
+                    shown = {self.deduper_items.key_for(c) for c in self.tree.get_children(group_item)}
+                    if shown != set(self.store.group_members(norm_url)):
+                        self._release_deduper_group(norm_url)
+                        self._materialize_deduper_group(norm_url)
+            group_items.append(group_item)
+        self.tree.set_children("", *group_items)
+        self._update_deduper_summary()
+
+    @instrumentation.action
+    def refresh_deduper(self):
+        if self.deduper_mode == "near":
+            # Clusters are recomputed from scratch, with new links included
+            self.find_near_duplicates()
+            return
+        self.current_selected_link = None
+        self._sync_deduper_tree()
+
+        self.status_label.config(text="Deduper tab refreshed with latest changes from Explorer.")
+
+    # --------------------------------------------------------------------------
+    #  TAGGING HELPER METHODS
+    # --------------------------------------------------------------------------
+    def _get_tags_for_link_elem(self, lid):
+        return self.store.tags(lid)
+
+    def _set_tags_for_link_elem(self, lid, tags_set):
+        self.store.set_tags(lid, tags_set)
+
+    # --------------------------------------------------------------------------
+    #  ADD / REMOVE TAGS
+    # --------------------------------------------------------------------------
+    @instrumentation.action
+    def add_tags_to_selected(self):
+        sel = self.explorer_tree.selection()
+        if not sel:
+            return
+
+        tags_input = self._prompt_for_text("Enter one or more tags (comma-separated)")
+        if not tags_input:
+            return
+
+        new_tags = set(t.strip() for t in tags_input.split(",") if t.strip())
+
+        updated_count = 0
+        for item_id in sel:
+            parent = self.explorer_tree.parent(item_id)
+            if parent:  # It's a bookmark
+                lid = self.store.lid_for_item(item_id)
+                if lid is not None:
+                    # Update the XML <Tags> element; the LINK_UPDATED event
+                    # refreshes the "Tags" column and the filter visibility
+                    current_tags = self._get_tags_for_link_elem(lid)
+                    updated_tags = current_tags.union(new_tags)
+                    self._set_tags_for_link_elem(lid, updated_tags)
+                    updated_count += 1
+
+        self.status_label.config(text=f"Added tags to {updated_count} bookmark(s).")
+
+
+    @instrumentation.action
+    def remove_tags_from_selected(self):
+        sel = self.explorer_tree.selection()
+        if not sel:
+            return
+
+        tags_input = self._prompt_for_text("Enter one or more tags to remove (comma-separated)")
+        if not tags_input:
+            return
+
+        remove_tags = set(t.strip() for t in tags_input.split(",") if t.strip())
+
+        updated_count = 0
+        for item_id in sel:
+            parent = self.explorer_tree.parent(item_id)
+            if parent:  # It's a bookmark
+                lid = self.store.lid_for_item(item_id)
+                if lid is not None:
+                    # Update the XML <Tags> element; the LINK_UPDATED event
+                    # refreshes the "Tags" column and the filter visibility
+                    current_tags = self._get_tags_for_link_elem(lid)
+                    updated_tags = current_tags - remove_tags
+                    self._set_tags_for_link_elem(lid, updated_tags)
+                    updated_count += 1
+
+        self.status_label.config(text=f"Removed tags from {updated_count} bookmark(s).")
+
+
+    # --------------------------------------------------------------------------
+    #  TOGGLE FILTER BY TAG
+    # --------------------------------------------------------------------------
+    @instrumentation.action
+    def toggle_filter_by_tag(self):
+        if not self.filter_mode:
+            query_text = self._prompt_for_text(
+                "Filter by tags (a, b = both; a OR b; NOT c; parentheses group)"
+            )
+            if not query_text:
+                return
+            try:
+                query = TagQuery(query_text)
+            except TagQueryError as e:
+                messagebox.showerror("Error", f"Invalid tag filter:\n{e}")
+                return
+            start = time.perf_counter()
+            self.filter_query = query
+            self.filter_matches = set(iter_bits(self.store.query_tags(query)))
+            self.filter_mode = True
+            self.btn_filter_by_tag.config(text="Disable Filter by Tag")
+            self._apply_filter()
+            elapsed = time.perf_counter() - start
+            self.status_label.config(
+                text=(f"Filter ON. {len(self.filter_matches)} bookmark(s) match {query} "
+                      f"({elapsed * 1000:.0f} ms).")
+            )
+        else:
+            self.filter_mode = False
+            self.filter_query = None
+            self.filter_matches = set()
+            self.btn_filter_by_tag.config(text="Enable Filter by Tag")
+            self._apply_filter()
+            self.status_label.config(text="Filter OFF. Restored all bookmarks.")
+
+    def _apply_filter(self):
+        # Categories without a single match are detached; rows that do not
+        # match are simply not materialized
+        self._restore_hidden_items()
+        self.hidden_items.clear()
+        for cat_id in self.store.categories:
+            self._update_category_visibility(cat_id)
+        for cat_id in list(self.materialized_categories):
+            self._sync_category_rows(cat_id)
+
+    def _bookmark_matches_filter(self, bookmark_tags):
+        return self.filter_query.matches(bookmark_tags)
+
+    def _filter_active(self):
+        return self.filter_mode or self.status_filter is not None
+
+    def _update_category_visibility(self, cat_id):
+        if not self._filter_active():
+            return
+        cat_item = self.store.item_for_category(cat_id)
+        if cat_item is None:
+            return
+        lids = self.store.links_by_category.get(cat_id, ())
+        if self.status_filter is None:
+            # Tag filter only: one set operation instead of a test per link
+            has_match = not self.filter_matches.isdisjoint(lids)
+        else:
+            has_match = any(self._link_visible(lid) for lid in lids)
+        if has_match and self._is_hidden(cat_item):
+            self._reinsert_item(cat_item)
+        elif not has_match and not self._is_hidden(cat_item):
+            self._detach_item(cat_item)
+
+    def _detach_item(self, item_id):
+        parent_id = self.explorer_tree.parent(item_id)
+        index_in_parent = self.explorer_tree.index(item_id)
+        self.hidden_items[item_id] = (parent_id, index_in_parent)
+        self.explorer_tree.detach(item_id)
+
+    def _reinsert_item(self, item_id):
+        position = self.hidden_items.pop(item_id, None)
+        if position is None:
+            return
+        parent_id, index_in_parent = position
+        self.explorer_tree.move(item_id, parent_id, index_in_parent)
+
+    def _restore_hidden_items(self):
+        for item_id, (parent_id, index_in_parent) in sorted(self.hidden_items.items(), key=lambda x: x[1]):
+            self.explorer_tree.move(item_id, parent_id, index_in_parent)
+
+    def _is_hidden(self, item_id):
+        return item_id in self.hidden_items
+
+    def _forget_hidden_item(self, item_id):
+        self.hidden_items.pop(item_id, None)
+
+    # --------------------------------------------------------------------------
+    #  BACKGROUND TASKS
+    # --------------------------------------------------------------------------
+    # Workers never change the store: they read it through iter_fields() (or
+    # a snapshot taken here) and post their results back, which are applied
+    # on the Tk thread like any other edit.
+    def _start_task(self, target, name, label, cancellable=True, **callbacks):
+        """Run target(task) on the worker pool, listed in the task area as label."""
+        return BackgroundTask(
+            self.bridge, target, name=name, label=label, cancellable=cancellable,
+            executor=self.executor, registry=self.tasks, **callbacks
+        ).start()
+
+    def _show_tasks(self):
+        entry = self.tasks.current()
+        if entry is None:
+            self.task_frame.pack_forget()
+            return
+        text = entry.text or f"{entry.label}..."
+        others = len(self.tasks) - 1
+        if others:
+            text += f"  (+{others} more)"
+        self.task_label.config(text=text)
+        self.task_progress.config(value=entry.fraction or 0.0)
+        self.btn_cancel_task.config(state=tk.NORMAL if entry.task.cancellable else tk.DISABLED)
+        if not self.task_frame.winfo_manager():
+            self.task_frame.pack(fill=tk.X, padx=5, before=self.status_label)
+
+    def cancel_current_task(self):
+        """Cancel the task the task area shows."""
+        entry = self.tasks.current()
+        if entry is None or not entry.task.cancellable:
+            return
+        entry.task.cancel()
+        self.status_label.config(text=f"Cancelling: {entry.label}...")
+
+    # --------------------------------------------------------------------------
+    #  DEVELOPER INSTRUMENTATION
+    # --------------------------------------------------------------------------
+    # Treeview calls counted while instrumentation is on: method -> (counter,
+    # rows the call touches). item() and set() count only when they write.
+    TREE_COUNTERS = {
+        "insert": ("rows_inserted", lambda args, kw: 1),
+        "delete": ("rows_deleted", lambda args, kw: len(args)),
+        "detach": ("rows_detached", lambda args, kw: len(args)),
+        "move": ("rows_moved", lambda args, kw: 1),
+        "item": ("rows_updated", lambda args, kw: 1 if kw else 0),
+        "set": ("rows_updated", lambda args, kw: 1 if len(args) > 2 or "value" in kw else 0),
+    }
+
+    def toggle_instrumentation(self, event=None):
+        if self.instrumenting:
+            instrumentation.disable()
+            instrumentation.remove_listener(self._on_span_finished)
+            self.instrumenting = False
+            for tree in (self.explorer_tree, self.tree):
+                self._unwatch_tree(tree)
+            self.instrumentation_label.pack_forget()
+            self.status_label.config(text="Instrumentation off.")
+        else:
+            self._enable_instrumentation()
+
+    def cycle_profiler(self, event=None):
+        """Step through profiling each action: off, cProfile, tracemalloc."""
+        modes = (None,) + instrumentation.PROFILERS
+        self.instrumentation_profiler = modes[(modes.index(self.instrumentation_profiler) + 1) % len(modes)]
+        self._enable_instrumentation()
+
+    def _enable_instrumentation(self):
+        log = os.path.join(self.instrumentation_dir, "spans.jsonl")
+        try:
+            instrumentation.enable(self.instrumentation_profiler, self.instrumentation_dir, log)
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not turn instrumentation on:\n{e}")
+            return
+        if not self.instrumenting:
+            self.instrumenting = True
+            instrumentation.add_listener(self._on_span_finished)
+            for tree in (self.explorer_tree, self.tree):
+                self._watch_tree(tree)
+            self.last_spans = {}
+            self.instrumentation_label.config(text="Instrumentation on; waiting for an action.")
+            self.instrumentation_label.pack(fill=tk.X, padx=5, pady=(0, 5))
+        text = f"Instrumentation on (F12 turns it off). Spans are logged to {log}."
+        if self.instrumentation_profiler:
+            text += f" Each action is profiled with {self.instrumentation_profiler} (Shift+F12 for the next)."
+        self.status_label.config(text=text)
+
+    def _watch_tree(self, tree):
+        # Instance attributes shadow the Treeview methods until unwatched,
+        # so nothing is counted (or slowed down) while instrumentation is off
+        for method, (counter, rows) in self.TREE_COUNTERS.items():
+            def counted(*args, _call=getattr(tree, method), _counter=counter, _rows=rows, **kw):
+                n = _rows(args, kw)
+                if n:
+                    instrumentation.count(_counter, n)
+                return _call(*args, **kw)
+            setattr(tree, method, counted)
+
+    def _unwatch_tree(self, tree):
+        for method in self.TREE_COUNTERS:
+            tree.__dict__.pop(method, None)
+
+    def _on_span_finished(self, span):
+        # Tasks finish on their worker threads
+        self.bridge.post(self._show_span, span)
+
+    def _show_span(self, span):
+        if not instrumentation.enabled:
+            return
+        text = span.summary()
+        if span.capture_path:
+            text += f" | {os.path.basename(span.capture_path)}"
+        self.last_spans[span.kind] = text
+        self.instrumentation_label.config(
+            text="   ".join(f"{kind}: {self.last_spans[kind]}" for kind in ("action", "task") if kind in self.last_spans)
+        )
+
+    def on_close(self):
+        if not self._offer_to_save():
+            return
+        if self.save_task is not None and self.save_task.is_alive():
+            # Closed by _on_save_done once the file is safely written
+            self.close_after_save = True
+            self.status_label.config(text="Saving before exit...")
+            return
+        self._close()
+
+    def _close(self):
+        self.tasks.cancel_all()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.title_fetcher.shutdown()
+        self.link_checker.shutdown()
+        if self.metadata_cache is not None:
+            self.metadata_cache.close()
+        if self.db is not None:
+            self.db.close()
+        if self.journal is not None:
+            self.journal.close()
+        self.bridge.stop()
+        self.scheduler.stop()
+        self.master.destroy()
+
+# --------------------------------------------------------------------------
+#  MAIN
+# --------------------------------------------------------------------------
+def main():
+    root = tk.Tk()
+    root.geometry("1200x700")
+    app = SafavorCleanerApp(root)
+    root.mainloop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,557 @@
+"""
+Headless bookmark cleanup: the grouping, tag and category logic of the
+Bookmark Manager without its window, for cron jobs and CI.
+
+    python bookmark_cli.py stats bookmarks.xml
+    python bookmark_cli.py dedupe bookmarks.xml -o clean.xml --keep best
+    python bookmark_cli.py tag bookmarks.xml -o out.xml --add read-later --where "news AND NOT done"
+    python bookmark_cli.py move bookmarks.xml -o out.xml --to Archive --url-contains example.com
+    python bookmark_cli.py export bookmarks.xml -o bookmarks.sqlite
+
+Files are Safavor XML, or a database when they end in .sqlite, .sqlite3 or
+.db; "-" reads XML from stdin or writes it to stdout. Records stream from
+input to output one batch at a time, so memory does not grow with the file
+(dedupe keeps one key per URL group; dedupe --keep best reads its input
+twice, and buffers stdin to do so). XML output is written atomically, so
+-o may name the input file.
+
+Edits the app has journaled but not yet folded into an XML file are
+applied to it on reading, as the app would on opening it. load --cache
+also reads and writes the app's model cache (see model_cache).
+
+Timings go to stderr; -q silences them.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+from atomic_save import atomic_write
+from bookmark_db import BookmarkDB, is_db_path
+from bookmark_store import (
+    BookmarkStore, F_URL, F_CAT, F_TITLE, F_TAGS, EMPTY_URL_KEY,
+    group_keys_for_urls, parse_tags,
+)
+from change_journal import entries_for, journal_path, read_journal, replay
+from model_cache import cache_path, file_key, load_model, save_model
+from tag_query import TagQuery, TagQueryError
+from url_canon import CanonPipeline, DEFAULT_RULES, RULE_NAMES
+from xml_loader import LINK_RECORD, CATEGORY_RECORD, iter_record_batches, write_batches
+
+
+class CliError(Exception):
+    pass
+
+
+class Report:
+    """Progress lines with elapsed wall time, on stderr."""
+
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+        self.start = time.perf_counter()
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def __call__(self, message):
+        if not self.quiet:
+            print(f"[{self.elapsed():7.2f}s] {message}", file=sys.stderr)
+
+    def rate(self, links):
+        seconds = self.elapsed()
+        return f"{links:,} links in {seconds:.2f}s ({links / max(seconds, 1e-9):,.0f}/s)"
+
+
+# ------------------------------------------------------------------------------
+#  1. INPUT AND OUTPUT
+# ------------------------------------------------------------------------------
+def _pending_journal(xml_path):
+    """Entries of the app's journal for xml_path, if it belongs to this version of the file."""
+    path = journal_path(xml_path)
+    if not os.path.exists(path):
+        return []
+    header, entries, _complete = read_journal(path)
+    return entries_for(xml_path, header, entries) or []
+
+
+def open_input(path, batch_size, report, replayable=False):
+    """
+    Return batches(), which yields the collection at path as batches of
+    (kind, record) tuples (see xml_loader.iter_record_batches). With
+    replayable, batches() may be called more than once.
+    """
+    if path == "-":
+        batches = iter_record_batches(sys.stdin.buffer, batch_size)
+        if not replayable:
+            return lambda: batches
+        batches = list(batches)
+        return lambda: iter(batches)
+
+    if not os.path.exists(path):
+        raise CliError(f"{path}: no such file")
+    if is_db_path(path):
+        return lambda: _db_batches(path, batch_size)
+
+    entries = _pending_journal(path)
+    if not entries:
+        return lambda: iter_record_batches(path, batch_size)
+    # Journaled edits need the whole collection in memory to apply
+    store = BookmarkStore()
+    store.load_file(path, batch_size)
+    applied = replay(store, entries, dict(enumerate(store.records, 1)))
+    report(f"applied {applied:,} unsaved edits from {journal_path(path)}")
+    return lambda: store.iter_record_batches(batch_size)
+
+
+def _db_batches(path, batch_size):
+    db = BookmarkDB(path)
+    try:
+        yield from db.iter_record_batches(batch_size)
+    finally:
+        db.close()
+
+
+def write_output(path, batches, canon, input_path=None):
+    """Write batches to path as XML, a database, or XML on stdout ("-")."""
+    if path == "-":
+        out = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+        try:
+            write_batches(out, batches)
+        finally:
+            out.flush()
+            out.detach()
+    elif is_db_path(path):
+        if input_path is not None and os.path.exists(path) and os.path.samefile(path, input_path):
+            raise CliError(f"{path}: cannot rewrite a database while reading it; write to a new file")
+        db = BookmarkDB(path)
+        try:
+            db.import_batches(batches, canon)
+        finally:
+            db.close()
+    else:
+        atomic_write(path, lambda out: write_batches(out, batches))
+
+
+def counting_links(batches, counts):
+    """Pass batches through, counting links into counts["links"]."""
+    for batch in batches:
+        counts["links"] += sum(1 for kind, _record in batch if kind == LINK_RECORD)
+        yield batch
+
+
+# ------------------------------------------------------------------------------
+#  2. SELECTING LINKS
+# ------------------------------------------------------------------------------
+class LinkFilter:
+    """
+    Which links tag and move act on: all options given must match, and no
+    option matches every link. Category names are learned from the category
+    records as they stream past (see_category).
+    """
+
+    def __init__(self, where=None, categories=(), url_contains=()):
+        self.query = TagQuery(where) if where else None
+        self.categories = set(categories)
+        self.url_parts = [part.lower() for part in url_contains]
+        self._names = {}
+
+    def see_category(self, record):
+        self._names[record[0]] = record[1]
+
+    def __call__(self, record):
+        if self.categories and self._names.get(record[F_CAT]) not in self.categories:
+            return False
+        if self.url_parts:
+            url = (record[F_URL] or "").lower()
+            if not any(part in url for part in self.url_parts):
+                return False
+        if self.query is not None and not self.query.matches(parse_tags(record[F_TAGS])):
+            return False
+        return True
+
+
+def _link_filter(args):
+    try:
+        return LinkFilter(args.where, args.category, args.url_contains)
+    except TagQueryError as e:
+        raise CliError(f"--where: {e}")
+
+
+# ------------------------------------------------------------------------------
+#  3. TRANSFORMS
+# ------------------------------------------------------------------------------
+# Each takes and yields batches; records that change are copied first, since
+# a store may share them (BookmarkStore.iter_record_batches).
+
+def _with_groups(batches, canon):
+    """(batch, group keys of its links in order) pairs."""
+    for batch in batches:
+        yield batch, group_keys_for_urls(canon, [r[F_URL] for kind, r in batch if kind == LINK_RECORD])
+
+
+def link_quality(record):
+    """Rank of a link within its group for dedupe --keep best: titled, most tags, https."""
+    return (
+        bool((record[F_TITLE] or "").strip()),
+        len(parse_tags(record[F_TAGS])),
+        (record[F_URL] or "").lower().startswith("https://"),
+    )
+
+
+def best_of_groups(batches, canon):
+    """group key -> position (among links) of its best link; ties go to the first."""
+    best = {}
+    pos = 0
+    for batch, groups in _with_groups(batches, canon):
+        groups = iter(groups)
+        for kind, record in batch:
+            if kind != LINK_RECORD:
+                continue
+            key = next(groups)
+            quality = link_quality(record)
+            current = best.get(key)
+            if current is None or quality > current[1]:
+                best[key] = (pos, quality)
+            pos += 1
+    return {key: entry[0] for key, entry in best.items()}
+
+
+def dedupe(batches, canon, counts, keep_pos=None):
+    """
+    Drop all but one link per URL group: the first, or with keep_pos (from
+    best_of_groups) the one at that position. Links without a URL are kept.
+    """
+    seen = set()
+    dup_groups = set()
+    pos = 0
+    for batch, groups in _with_groups(batches, canon):
+        groups = iter(groups)
+        out = []
+        for kind, record in batch:
+            if kind == LINK_RECORD:
+                key = next(groups)
+                pos += 1
+                if key != EMPTY_URL_KEY:
+                    if keep_pos is not None:
+                        drop = keep_pos[key] != pos - 1
+                    else:
+                        drop = key in seen
+                        seen.add(key)
+                    if drop:
+                        counts["removed"] += 1
+                        dup_groups.add(key)
+                        continue
+            out.append((kind, record))
+        yield out
+    counts["groups"] = len(dup_groups)
+
+
+def tag_links(batches, selected, add, remove, counts):
+    for batch in batches:
+        out = []
+        for kind, record in batch:
+            if kind == CATEGORY_RECORD:
+                selected.see_category(record)
+            elif kind == LINK_RECORD and selected(record):
+                counts["matched"] += 1
+                tags = parse_tags(record[F_TAGS])
+                new_tags = (tags | add) - remove
+                if new_tags != tags:
+                    record = list(record)
+                    record[F_TAGS] = ",".join(sorted(new_tags))
+                    counts["changed"] += 1
+            out.append((kind, record))
+        yield out
+
+
+def move_links(batches, selected, target_name, counts):
+    """
+    Move selected links to the category named target_name. If there is no
+    such category by the first selected link, one is created just before it.
+    """
+    ids_by_name = {}
+    max_id = 0
+    target = None
+    for batch in batches:
+        out = []
+        for kind, record in batch:
+            if kind == CATEGORY_RECORD:
+                selected.see_category(record)
+                ids_by_name.setdefault(record[1], record[0])
+                try:
+                    max_id = max(max_id, int(record[0]))
+                except ValueError:
+                    pass
+            elif kind == LINK_RECORD and selected(record):
+                counts["matched"] += 1
+                if target is None:
+                    target = ids_by_name.get(target_name)
+                    if target is None:
+                        # Same numbering as BookmarkStore._generate_new_category_id
+                        target = str(max_id + 1)
+                        new_category = (target, target_name, None)
+                        selected.see_category(new_category)
+                        out.append((CATEGORY_RECORD, new_category))
+                        counts["created"] += 1
+                if record[F_CAT] != target:
+                    record = list(record)
+                    record[F_CAT] = target
+                    counts["moved"] += 1
+            out.append((kind, record))
+        yield out
+
+
+# ------------------------------------------------------------------------------
+#  4. COMMANDS
+# ------------------------------------------------------------------------------
+def _canon(args):
+    return CanonPipeline(args.rules)
+
+
+def cmd_load(args, report):
+    """Build the app's in-memory model, as opening the file would."""
+    canon = _canon(args)
+    store = BookmarkStore(canon)
+    if args.input != "-" and is_db_path(args.input):
+        if not os.path.exists(args.input):
+            raise CliError(f"{args.input}: no such file")
+        db = BookmarkDB(args.input)
+        try:
+            db.load_store(store, args.batch_size)
+        finally:
+            db.close()
+    elif args.input == "-":
+        for batch in iter_record_batches(sys.stdin.buffer, args.batch_size):
+            store.add_records(batch)
+    else:
+        if not os.path.exists(args.input):
+            raise CliError(f"{args.input}: no such file")
+        key = file_key(args.input) if args.cache else None
+        if load_model(store, args.input, key):
+            report(f"read {cache_path(args.input)}")
+        else:
+            store.load_file(args.input, args.batch_size)
+            try:
+                if save_model(store, args.input, key):
+                    report(f"wrote {cache_path(args.input)}")
+            except OSError as e:
+                report(f"could not write {cache_path(args.input)}: {e}")
+        entries = _pending_journal(args.input)
+        if entries:
+            applied = replay(store, entries, dict(enumerate(store.records, 1)))
+            report(f"applied {applied:,} unsaved edits from {journal_path(args.input)}")
+    report(f"loaded {report.rate(len(store.records))}")
+    groups = store.duplicate_groups()
+    report(f"{len(store.categories):,} categories, {len(groups):,} duplicate groups, "
+           f"{len(store.links_by_tag):,} tags")
+    if args.search:
+        index, rows = store.begin_search_index()
+        for lid, title, url, tags in rows:
+            index.add(lid, title, url, tags)
+        store.install_search_index(index)
+        report(f"search index: {len(index):,} trigrams, {index.live_entries:,} postings")
+    return 0
+
+
+def _host(key):
+    rest = key.split("://", 1)[-1]
+    return rest.split("/", 1)[0].split("?", 1)[0]
+
+
+def cmd_stats(args, report):
+    canon = _canon(args)
+    group_sizes = Counter()
+    tags = Counter()
+    per_category = Counter()
+    names = {}
+    untitled = 0
+    for batch, groups in _with_groups(open_input(args.input, args.batch_size, report)(), canon):
+        groups = iter(groups)
+        for kind, record in batch:
+            if kind == CATEGORY_RECORD:
+                names[record[0]] = record[1]
+            elif kind == LINK_RECORD:
+                group_sizes[next(groups)] += 1
+                tags.update(parse_tags(record[F_TAGS]))
+                per_category[record[F_CAT]] += 1
+                if not (record[F_TITLE] or "").strip():
+                    untitled += 1
+    links = sum(group_sizes.values())
+    no_url = group_sizes.pop(EMPTY_URL_KEY, 0)
+    dup_sizes = [size for size in group_sizes.values() if size > 1]
+    hosts = Counter()
+    for key, size in group_sizes.items():
+        hosts[_host(key)] += size
+    report(f"read {report.rate(links)}")
+
+    top = args.top
+    stats = {
+        "links": links,
+        "categories": len(names),
+        "duplicate_groups": len(dup_sizes),
+        "redundant_links": sum(dup_sizes) - len(dup_sizes),
+        "untitled": untitled,
+        "without_url": no_url,
+        "distinct_tags": len(tags),
+        "top_categories": [[names.get(cid, cid), n] for cid, n in per_category.most_common(top)],
+        "top_tags": tags.most_common(top),
+        "top_hosts": hosts.most_common(top),
+    }
+    if args.json:
+        json.dump(stats, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return 0
+    for label in ("links", "categories", "duplicate_groups", "redundant_links",
+                  "untitled", "without_url", "distinct_tags"):
+        print(f"{label.replace('_', ' '):<18}{stats[label]:>12,}")
+    for label in ("top_categories", "top_tags", "top_hosts"):
+        print(f"\n{label.replace('_', ' ')}:")
+        for name, n in stats[label]:
+            print(f"  {n:>10,}  {name}")
+    return 0
+
+
+def cmd_dedupe(args, report):
+    canon = _canon(args)
+    counts = Counter()
+    batches = open_input(args.input, args.batch_size, report, replayable=args.keep == "best")
+    keep_pos = None
+    if args.keep == "best":
+        keep_pos = best_of_groups(batches(), canon)
+        report(f"ranked {len(keep_pos):,} URL groups")
+    result = dedupe(counting_links(batches(), counts), canon, counts, keep_pos)
+    write_output(args.output, result, canon, args.input)
+    report(f"removed {counts['removed']:,} duplicates from {counts['groups']:,} groups; "
+           f"read {report.rate(counts['links'])}")
+    return 0
+
+
+def cmd_tag(args, report):
+    add = set(t.strip() for t in args.add if t.strip())
+    remove = set(t.strip() for t in args.remove if t.strip())
+    if not add and not remove:
+        raise CliError("nothing to do: give --add and/or --remove")
+    counts = Counter()
+    selected = _link_filter(args)
+    batches = open_input(args.input, args.batch_size, report)()
+    result = tag_links(counting_links(batches, counts), selected, add, remove, counts)
+    write_output(args.output, result, _canon(args), args.input)
+    report(f"{counts['matched']:,} links matched, {counts['changed']:,} retagged; "
+           f"read {report.rate(counts['links'])}")
+    return 0
+
+
+def cmd_move(args, report):
+    counts = Counter()
+    selected = _link_filter(args)
+    batches = open_input(args.input, args.batch_size, report)()
+    result = move_links(counting_links(batches, counts), selected, args.to, counts)
+    write_output(args.output, result, _canon(args), args.input)
+    created = f" (new category {args.to!r})" if counts["created"] else ""
+    report(f"{counts['matched']:,} links matched, {counts['moved']:,} moved{created}; "
+           f"read {report.rate(counts['links'])}")
+    return 0
+
+
+def cmd_export(args, report):
+    counts = Counter()
+    batches = open_input(args.input, args.batch_size, report)()
+    write_output(args.output, counting_links(batches, counts), _canon(args), args.input)
+    report(f"exported {report.rate(counts['links'])}")
+    return 0
+
+
+# ------------------------------------------------------------------------------
+#  5. ARGUMENTS
+# ------------------------------------------------------------------------------
+def _rules(text):
+    names = set(name.strip() for name in text.split(",") if name.strip())
+    unknown = names - set(RULE_NAMES)
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown rule(s) {', '.join(sorted(unknown))}; choose from {', '.join(RULE_NAMES)}")
+    return frozenset(names)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="bookmark_cli",
+        description="Clean up Safavor bookmark collections without the GUI.",
+    )
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("input", help='Safavor XML or database file, or "-" for XML on stdin')
+    common.add_argument("--rules", type=_rules, default=DEFAULT_RULES,
+                        help="comma-separated URL rules links are grouped by "
+                             f"(default: {','.join(sorted(DEFAULT_RULES))})")
+    common.add_argument("--batch-size", type=int, default=5000, help="records per batch (default: 5000)")
+    common.add_argument("-q", "--quiet", action="store_true", help="do not report timings on stderr")
+
+    writes = argparse.ArgumentParser(add_help=False)
+    writes.add_argument("-o", "--output", required=True,
+                        help='XML or database file to write (may be the input XML), or "-" for stdout')
+
+    selects = argparse.ArgumentParser(add_help=False)
+    selects.add_argument("--where", help='tag filter, e.g. "python AND (web OR api) AND NOT old"')
+    selects.add_argument("--category", action="append", default=[], metavar="NAME",
+                         help="only links in this category (repeatable)")
+    selects.add_argument("--url-contains", action="append", default=[], metavar="TEXT",
+                         help="only links whose URL contains TEXT, ignoring case (repeatable)")
+
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("load", parents=[common], help="load into the app's model and report timings")
+    p.add_argument("--search", action="store_true", help="also build the search index")
+    p.add_argument("--cache", action="store_true",
+                   help="read the XML's model cache if it is current, and write one after parsing")
+    p.set_defaults(func=cmd_load)
+
+    p = sub.add_parser("stats", parents=[common], help="count links, duplicates, tags and hosts")
+    p.add_argument("--top", type=int, default=10, help="entries per top list (default: 10)")
+    p.add_argument("--json", action="store_true", help="print the statistics as JSON")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser("dedupe", parents=[common, writes], help="keep one link per URL group")
+    p.add_argument("--keep", choices=("first", "best"), default="first",
+                   help="which link of a group survives: the first, or the best titled and "
+                        "tagged (https preferred, then the first)")
+    p.set_defaults(func=cmd_dedupe)
+
+    p = sub.add_parser("tag", parents=[common, writes, selects], help="add or remove tags")
+    p.add_argument("--add", action="append", default=[], metavar="TAG", help="tag to add (repeatable)")
+    p.add_argument("--remove", action="append", default=[], metavar="TAG", help="tag to remove (repeatable)")
+    p.set_defaults(func=cmd_tag)
+
+    p = sub.add_parser("move", parents=[common, writes, selects], help="move links to a category")
+    p.add_argument("--to", required=True, metavar="NAME", help="target category, created if missing")
+    p.set_defaults(func=cmd_move)
+
+    p = sub.add_parser("export", parents=[common, writes], help="convert between XML and database")
+    p.set_defaults(func=cmd_export)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    report = Report(args.quiet)
+    try:
+        status = args.func(args, report)
+        # A closed pipe shows up here rather than in the flush at exit
+        sys.stdout.flush()
+        return status
+    except CliError as e:
+        print(f"bookmark_cli: error: {e}", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # The reader stopped early, as head does. stdout goes to devnull so
+        # the flush at exit cannot fail again; 141 is what a shell reports
+        # for a process killed by SIGPIPE.
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 141
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,374 @@
+import json
+import os
+import sqlite3
+import xml.etree.ElementTree as ET
+
+from bookmark_store import (
+    F_URL, F_TITLE, F_TAGS, F_EXTRA,
+    LINK_ADDED, LINK_REMOVED, LINK_MOVED, LINK_UPDATED, GROUPS_REBUILT,
+    CATEGORY_ADDED, CATEGORY_RENAMED, CATEGORY_REMOVED,
+    group_keys_for_urls, parse_tags,
+)
+from url_canon import CanonPipeline
+from xml_loader import (
+    LINK_RECORD, CATEGORY_RECORD, OTHER_RECORD, LoadCancelled,
+    iter_record_batches, write_records,
+)
+
+# File extensions the app opens as a database rather than as XML
+DB_EXTENSIONS = (".sqlite", ".sqlite3", ".db")
+
+SCHEMA_VERSION = 1
+
+# pos columns keep document order: rows are written back to XML in pos order
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS categories (
+    pos    INTEGER PRIMARY KEY,
+    cat_id TEXT NOT NULL UNIQUE,
+    name   TEXT NOT NULL,
+    extra  TEXT
+);
+CREATE TABLE IF NOT EXISTS links (
+    pos      INTEGER PRIMARY KEY,
+    link_id  TEXT,
+    url      TEXT,
+    cat_id   TEXT,
+    title    TEXT,
+    tags     TEXT,
+    extra    TEXT,
+    norm_url TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS links_cat_id ON links (cat_id);
+CREATE INDEX IF NOT EXISTS links_norm_url ON links (norm_url);
+CREATE TABLE IF NOT EXISTS link_tags (
+    tag  TEXT NOT NULL,
+    link INTEGER NOT NULL,
+    PRIMARY KEY (tag, link)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS link_tags_link ON link_tags (link);
+CREATE TABLE IF NOT EXISTS other_elems (
+    pos INTEGER PRIMARY KEY,
+    xml TEXT NOT NULL
+);
+"""
+
+_INSERT_LINK = (
+    "INSERT INTO links (pos, link_id, url, cat_id, title, tags, extra, norm_url) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_INSERT_CATEGORY = (
+    "INSERT INTO categories (cat_id, name, extra) VALUES (?, ?, ?) "
+    "ON CONFLICT (cat_id) DO UPDATE SET name = excluded.name"
+)
+
+
+def is_db_path(path):
+    return os.path.splitext(path)[1].lower() in DB_EXTENSIONS
+
+
+def _extra_text(elems):
+    """Unknown child elements, serialized for an extra column."""
+    if not elems:
+        return None
+    return "".join(ET.tostring(e, encoding="unicode") for e in elems)
+
+
+def _extra_elems(text):
+    if not text:
+        return None
+    return list(ET.fromstring(f"<extra>{text}</extra>"))
+
+
+def _tag_rows(pos, raw_tags):
+    return [(tag, pos) for tag in parse_tags(raw_tags)]
+
+
+# ------------------------------------------------------------------------------
+#  BOOKMARK DATABASE
+# ------------------------------------------------------------------------------
+class BookmarkDB:
+    """
+    SQLite storage for a Safavor collection, as an alternative to rewriting
+    the whole XML file on every save.
+
+    The tables mirror the XML schema (<Kategorien>, <Links>, unknown
+    elements kept verbatim), so import_xml() and export_xml() round-trip a
+    file. Links are indexed by category, normalized URL (under the URL rules
+    recorded in meta) and tag.
+
+    load_store() fills a BookmarkStore page by page. attach() then writes
+    every store mutation through as it happens; with a schedule callable
+    the writes of one burst are committed as one transaction, otherwise
+    each one commits on its own. The connection is used by one thread at a
+    time: the loader, then whoever attached.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.store = None
+        # lid of the attached store -> links.pos
+        self._pos_of = {}
+        self._schedule = None
+        self._commit_pending = False
+
+    # --------------------------------------------------------------------------
+    #  META
+    # --------------------------------------------------------------------------
+    def _meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row is not None else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, json.dumps(value)))
+
+    def url_rules(self):
+        """The url_canon rule names norm_url was computed with, or None."""
+        rules = self._meta("url_rules")
+        return frozenset(rules) if rules is not None else None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM links").fetchone()[0]
+
+    # --------------------------------------------------------------------------
+    #  XML IMPORT AND EXPORT
+    # --------------------------------------------------------------------------
+    def import_xml(self, source, canon=None, batch_size=5000, on_progress=None, should_cancel=None):
+        """
+        Replace the database contents with a Safavor XML file, streamed in
+        batches (see xml_loader.iter_record_batches) and committed as one
+        transaction. Links are grouped through canon (default rules if None).
+        """
+        return self.import_batches(
+            iter_record_batches(source, batch_size, on_progress, should_cancel), canon)
+
+    def import_batches(self, batches, canon=None):
+        """
+        Replace the database contents with batches of (kind, record) tuples
+        as iter_record_batches() yields them. Returns the number of links.
+        """
+        canon = canon if canon is not None else CanonPipeline()
+        conn = self.conn
+        pos = 0
+        with conn:
+            for table in ("links", "link_tags", "categories", "other_elems"):
+                conn.execute(f"DELETE FROM {table}")
+            self._set_meta("schema_version", SCHEMA_VERSION)
+            self._set_meta("url_rules", sorted(canon.enabled))
+            for batch in batches:
+                links = [record for kind, record in batch if kind == LINK_RECORD]
+                groups = group_keys_for_urls(canon, [record[F_URL] for record in links])
+                link_rows = []
+                tag_rows = []
+                for record, group in zip(links, groups):
+                    pos += 1
+                    link_rows.append((pos,) + tuple(record[:F_EXTRA]) + (_extra_text(record[F_EXTRA]), group))
+                    tag_rows.extend(_tag_rows(pos, record[F_TAGS]))
+                conn.executemany(_INSERT_LINK, link_rows)
+                conn.executemany("INSERT OR IGNORE INTO link_tags VALUES (?, ?)", tag_rows)
+                for kind, record in batch:
+                    if kind == CATEGORY_RECORD:
+                        cat_id, cat_name, extra = record
+                        conn.execute(_INSERT_CATEGORY, (cat_id, cat_name, _extra_text(extra)))
+                    elif kind == OTHER_RECORD:
+                        conn.execute("INSERT INTO other_elems (xml) VALUES (?)",
+                                     (ET.tostring(record, encoding="unicode"),))
+                    elif kind == "root":
+                        self._set_meta("root_tag", record[0])
+                        self._set_meta("root_attrib", record[1])
+        return pos
+
+    def _iter_categories(self):
+        for cat_id, name, extra in self.conn.execute(
+                "SELECT cat_id, name, extra FROM categories ORDER BY pos"):
+            yield cat_id, name, _extra_elems(extra)
+
+    def _iter_links(self):
+        for row in self.conn.execute(
+                "SELECT link_id, url, cat_id, title, tags, extra FROM links ORDER BY pos"):
+            record = list(row)
+            record[F_EXTRA] = _extra_elems(record[F_EXTRA])
+            yield record
+
+    def _other_elems(self):
+        return [ET.fromstring(xml) for (xml,) in self.conn.execute("SELECT xml FROM other_elems ORDER BY pos")]
+
+    def export_xml(self, out):
+        """Write the collection to a text stream as Safavor XML, row by row."""
+        write_records(
+            out,
+            self._meta("root_tag", "SafavorRoot"),
+            self._meta("root_attrib", {}),
+            self._iter_categories(),
+            self._iter_links(),
+            self._other_elems(),
+        )
+
+    def export_file(self, file_path):
+        with open(file_path, "w", encoding="utf-8") as out:
+            self.export_xml(out)
+
+    def iter_record_batches(self, batch_size=5000):
+        """
+        The collection as batches of (kind, record) tuples, in the same shape
+        and order as xml_loader.iter_record_batches() yields an exported
+        file, batch_size links per query.
+        """
+        yield ([("root", (self._meta("root_tag", "SafavorRoot"), self._meta("root_attrib", {})))]
+               + [(OTHER_RECORD, elem) for elem in self._other_elems()]
+               + [(CATEGORY_RECORD, record) for record in self._iter_categories()])
+        last_pos = 0
+        while True:
+            rows = self.conn.execute(
+                "SELECT pos, link_id, url, cat_id, title, tags, extra FROM links "
+                "WHERE pos > ? ORDER BY pos LIMIT ?",
+                (last_pos, batch_size),
+            ).fetchall()
+            if not rows:
+                return
+            yield [(LINK_RECORD, [row[1], row[2], row[3], row[4], row[5], _extra_elems(row[6])])
+                   for row in rows]
+            last_pos = rows[-1][0]
+
+    # --------------------------------------------------------------------------
+    #  LOADING INTO A STORE
+    # --------------------------------------------------------------------------
+    def load_store(self, store, batch_size=5000, on_progress=None, should_cancel=None):
+        """
+        Fill an empty BookmarkStore from the database, batch_size links per
+        query (keyset paging on pos). Stored group keys are reused when the
+        store groups by the same URL rules; otherwise they are recomputed
+        and written back. on_progress(done, total) is called per page.
+        """
+        conn = self.conn
+        store.add_records([("root", (self._meta("root_tag", "SafavorRoot"), self._meta("root_attrib", {})))])
+        store.add_records(
+            [(OTHER_RECORD, elem) for elem in self._other_elems()]
+            + [(CATEGORY_RECORD, record) for record in self._iter_categories()]
+        )
+
+        reuse_groups = self.url_rules() == store.canon.enabled
+        total = len(self)
+        done = 0
+        last_pos = 0
+        self._pos_of = {}
+        while True:
+            rows = conn.execute(
+                "SELECT pos, link_id, url, cat_id, title, tags, extra, norm_url FROM links "
+                "WHERE pos > ? ORDER BY pos LIMIT ?",
+                (last_pos, batch_size),
+            ).fetchall()
+            if not rows:
+                break
+            if should_cancel is not None and should_cancel():
+                raise LoadCancelled()
+            batch = [(LINK_RECORD, [row[1], row[2], row[3], row[4], row[5], _extra_elems(row[6])])
+                     for row in rows]
+            lids = store.add_records(batch, [row[7] for row in rows] if reuse_groups else None)
+            self._pos_of.update(zip(lids, (row[0] for row in rows)))
+            last_pos = rows[-1][0]
+            done += len(rows)
+            if on_progress is not None:
+                on_progress(done, total)
+
+        self.store = store
+        if not reuse_groups:
+            self._write_groups()
+            conn.commit()
+        return store
+
+    # --------------------------------------------------------------------------
+    #  WRITE-THROUGH
+    # --------------------------------------------------------------------------
+    def attach(self, schedule=None):
+        """
+        Write every mutation of the loaded store through to the database.
+        schedule(fn), e.g. Tk's after_idle, defers the commit so a burst of
+        mutations (removing marked links, a drag & drop) is one transaction.
+        """
+        self._schedule = schedule
+        self.store.subscribe(self._on_store_event)
+
+    def detach(self):
+        if self.store is not None:
+            self.store.unsubscribe(self._on_store_event)
+        self.commit()
+
+    def commit(self):
+        self._commit_pending = False
+        self.conn.commit()
+
+    def close(self):
+        self.detach()
+        self.conn.close()
+
+    def _flush(self):
+        # A deferred commit may fire after detach() already committed
+        if self._commit_pending:
+            self.commit()
+
+    def _changed(self):
+        if self._schedule is None:
+            self.commit()
+        elif not self._commit_pending:
+            self._commit_pending = True
+            self._schedule(self._flush)
+
+    def _write_groups(self):
+        """Store the attached store's group keys and the rules behind them."""
+        group_of = self.store.group_of
+        norms = dict(self.conn.execute("SELECT pos, norm_url FROM links"))
+        self.conn.executemany(
+            "UPDATE links SET norm_url = ? WHERE pos = ?",
+            [(group_of[lid], pos) for lid, pos in self._pos_of.items() if norms.get(pos) != group_of[lid]],
+        )
+        self._set_meta("url_rules", sorted(self.store.canon.enabled))
+
+    def _on_store_event(self, event):
+        store, conn, kind = self.store, self.conn, event.kind
+        if kind == LINK_ADDED:
+            record = store.records[event.lid]
+            pos = conn.execute(
+                _INSERT_LINK,
+                (None,) + tuple(record[:F_EXTRA]) + (_extra_text(record[F_EXTRA]), store.group_of[event.lid]),
+            ).lastrowid
+            self._pos_of[event.lid] = pos
+            conn.executemany("INSERT OR IGNORE INTO link_tags VALUES (?, ?)", _tag_rows(pos, record[F_TAGS]))
+        elif kind == LINK_REMOVED:
+            pos = self._pos_of.pop(event.lid, None)
+            if pos is None:
+                return
+            conn.execute("DELETE FROM links WHERE pos = ?", (pos,))
+            conn.execute("DELETE FROM link_tags WHERE link = ?", (pos,))
+        elif kind == LINK_MOVED:
+            conn.execute("UPDATE links SET cat_id = ? WHERE pos = ?",
+                         (event.cat_id, self._pos_of[event.lid]))
+        elif kind == LINK_UPDATED:
+            # Also covers GROUP_CHANGED, which set_url emits just before
+            record = store.records[event.lid]
+            pos = self._pos_of[event.lid]
+            conn.execute(
+                "UPDATE links SET url = ?, title = ?, tags = ?, norm_url = ? WHERE pos = ?",
+                (record[F_URL], record[F_TITLE], record[F_TAGS], store.group_of[event.lid], pos),
+            )
+            conn.execute("DELETE FROM link_tags WHERE link = ?", (pos,))
+            conn.executemany("INSERT OR IGNORE INTO link_tags VALUES (?, ?)", _tag_rows(pos, record[F_TAGS]))
+        elif kind == GROUPS_REBUILT:
+            self._write_groups()
+        elif kind == CATEGORY_ADDED:
+            conn.execute(_INSERT_CATEGORY, (event.cat_id, store.categories[event.cat_id], None))
+        elif kind == CATEGORY_RENAMED:
+            conn.execute("UPDATE categories SET name = ? WHERE cat_id = ?",
+                         (store.categories[event.cat_id], event.cat_id))
+        elif kind == CATEGORY_REMOVED:
+            conn.execute("DELETE FROM categories WHERE cat_id = ?", (event.cat_id,))
+        else:
+            return
+        self._changed()
@@ -0,0 +1,816 @@
+import bisect
+import functools
+import sys
+import threading
+import urllib.parse
+from collections import namedtuple
+
+from atomic_save import atomic_write
+from instrumentation import count
+from search_index import TrigramIndex
+from tag_query import bits_from_ints
+from url_canon import CanonPipeline
+from workers import ReadWriteLock
+from xml_loader import (
+    LINK_FIELDS, LINK_RECORD, CATEGORY_RECORD, OTHER_RECORD,
+    iter_record_batches, write_records,
+)
+
+# Positions of the fields in a link record
+F_ID, F_URL, F_CAT, F_TITLE, F_TAGS, F_EXTRA = range(len(LINK_FIELDS) + 1)
+
+# Group key used for links without a URL
+EMPTY_URL_KEY = "<EMPTY_URL>"
+
+
+def normalize_url(raw_url):
+    temp_url = raw_url.strip()
+    if not temp_url.startswith(("http://", "https://")):
+        temp_url = "http://" + temp_url
+
+    parsed = urllib.parse.urlparse(temp_url)
+    netloc = parsed.netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    path = parsed.path.rstrip("/")
+
+    if path:
+        norm = f"{netloc}{path}"
+    else:
+        norm = netloc
+
+    return norm
+
+
+def group_key_for_url(raw_url):
+    if not raw_url:
+        return EMPTY_URL_KEY
+    return normalize_url(raw_url)
+
+
+def group_keys_for_urls(canon, raw_urls):
+    """Group keys of many URLs through a CanonPipeline, in one batch."""
+    keys = iter(canon.canonicalize_many([url for url in raw_urls if url]))
+    return [next(keys) if url else EMPTY_URL_KEY for url in raw_urls]
+
+
+def _intern(text):
+    return sys.intern(text) if text else text
+
+
+def parse_tags(raw):
+    if not raw:
+        return set()
+    return set(t.strip() for t in raw.split(",") if t.strip())
+
+
+# ------------------------------------------------------------------------------
+#  CHANGE NOTIFICATIONS
+# ------------------------------------------------------------------------------
+LINK_ADDED = "link_added"
+LINK_REMOVED = "link_removed"
+LINK_MOVED = "link_moved"          # category changed
+LINK_UPDATED = "link_updated"      # title, URL or tags changed
+GROUP_CHANGED = "group_changed"    # normalized URL changed
+GROUPS_REBUILT = "groups_rebuilt"  # URL rules changed, every group may differ
+CATEGORY_ADDED = "category_added"
+CATEGORY_RENAMED = "category_renamed"
+CATEGORY_REMOVED = "category_removed"
+
+# One precise delta per mutation. Fields that do not apply to a kind are None.
+StoreEvent = namedtuple(
+    "StoreEvent",
+    ["kind", "lid", "cat_id", "old_cat_id", "group", "old_group"],
+    defaults=(None, None, None, None, None),
+)
+
+
+# ------------------------------------------------------------------------------
+#  WRITE DISCIPLINE
+# ------------------------------------------------------------------------------
+# Once a store is shown, only the thread that owns it (the Tk thread) may
+# change it: each mutation checks the thread and holds the write lock, so a
+# worker reading under the read lock never sees half of one. Workers hand
+# their results back through the UI bridge instead of writing.
+def _mutation(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._owner is not None and self._owner != threading.get_ident():
+            raise RuntimeError(f"BookmarkStore.{method.__name__}() called off the thread that owns the store")
+        self.lock.acquire_write()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.lock.release_write()
+    return wrapper
+
+
+# ------------------------------------------------------------------------------
+#  ITEM INDEX (Treeview item <-> model key)
+# ------------------------------------------------------------------------------
+class ItemIndex:
+    """Two-way mapping between Treeview item IDs and model keys."""
+
+    def __init__(self):
+        self.key_to_item = {}
+        self.item_to_key = {}
+
+    def bind(self, key, item_id):
+        self.key_to_item[key] = item_id
+        self.item_to_key[item_id] = key
+
+    def unbind_key(self, key):
+        item_id = self.key_to_item.pop(key, None)
+        if item_id is not None:
+            self.item_to_key.pop(item_id, None)
+        return item_id
+
+    def unbind_item(self, item_id):
+        key = self.item_to_key.pop(item_id, None)
+        if key is not None:
+            self.key_to_item.pop(key, None)
+        return key
+
+    def item_for(self, key):
+        return self.key_to_item.get(key)
+
+    def key_for(self, item_id):
+        return self.item_to_key.get(item_id)
+
+    def clear(self):
+        self.key_to_item.clear()
+        self.item_to_key.clear()
+
+    def __len__(self):
+        return len(self.key_to_item)
+
+
+# ------------------------------------------------------------------------------
+#  BOOKMARK STORE
+# ------------------------------------------------------------------------------
+class BookmarkStore:
+    """
+    In-memory model of a Safavor XML collection.
+
+    Links are held as plain field tuples ((ID, URL, KategorieID, Title, Tags,
+    extra), see xml_loader.LINK_FIELDS) and are only converted from and to
+    XML at load and save. Category IDs and tag strings are interned, as
+    most links share theirs with many others. Every link gets an internal
+    integer key ("lid") when it enters the store. The store keeps indexes by link ID, category
+    ID, normalized URL, tag and Explorer item ID, and keeps them current on every
+    mutation, so the UI never has to scan the collection to resolve a row.
+
+    Each mutation also emits a StoreEvent to subscribed listeners, so views
+    can patch themselves instead of repopulating. Loading emits nothing.
+    After own(), mutations are only allowed on the owning thread; other
+    threads read through iter_fields().
+
+    Links are grouped by the key url_canon.CanonPipeline gives their URL;
+    the default rules match normalize_url().
+    """
+
+    def __init__(self, canon=None):
+        self.loaded = False
+        self.lock = ReadWriteLock()
+        self._owner = None
+        self.root_tag = "SafavorRoot"
+        self.root_attrib = {}
+        # Top-level elements the model does not use (anything but <Links> and
+        # complete <Kategorien>), written back verbatim
+        self.other_elems = []
+
+        # lid -> link record tuple. Edits install an updated copy
+        # (_set_field), so snapshot() can share the records.
+        self.records = {}
+        # XML <ID> text -> lid
+        self.links_by_id = {}
+        # catID -> { lid: None } (dicts keep document order and allow O(1) removal)
+        self.links_by_category = {}
+        # Memoizing URL -> group key pipeline
+        self.canon = canon if canon is not None else CanonPipeline()
+        # normalized URL -> lid, or { lid: None } once a group has several
+        # links (most groups hold one link; a dict for each costs ~200 bytes)
+        self.links_by_group = {}
+        # lid -> normalized URL, so removals know which group to touch
+        self.group_of = {}
+        # Keys of groups with more than one link, sorted. Rebuilt lazily after
+        # bulk loading (None) and kept sorted by bisect on every later mutation.
+        self._duplicate_keys = []
+        self.dup_group_count = 0
+        self.dup_link_count = 0
+
+        # tag -> { lid: None }
+        self.links_by_tag = {}
+        # Bitset forms of the tag postings and of all lids, built on first use
+        # (see tag_query) and then kept current; bulk loading drops them
+        self._tag_bits = {}
+        self._all_bits = None
+
+        # Full-text index over title, URL and tags. It is built off the Tk
+        # thread after loading (begin_search_index / install_search_index);
+        # lids edited meanwhile are collected in _search_touched.
+        self.search_index = None
+        self._search_touched = None
+
+        # categories: { catID : catName }
+        self.categories = {}
+        # catID -> extra child elements of <Kategorien>, written back verbatim
+        self.category_extra = {}
+        self._category_ids_by_name = {}
+
+        # Explorer item IDs for bookmarks (lid) and categories (catID)
+        self.explorer_items = ItemIndex()
+        self.category_items = ItemIndex()
+
+        self._next_lid = 1
+        self._max_link_id = 0
+
+        self._listeners = []
+
+    # --------------------------------------------------------------------------
+    #  LISTENERS
+    # --------------------------------------------------------------------------
+    def own(self):
+        """Make the calling thread the only one allowed to change the store from now on."""
+        self._owner = threading.get_ident()
+
+    def subscribe(self, callback):
+        """Register callback(event) to be called after every mutation."""
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _emit(self, kind, **fields):
+        count("store_events")
+        if not self._listeners:
+            return
+        event = StoreEvent(kind, **fields)
+        for callback in list(self._listeners):
+            callback(event)
+
+    # --------------------------------------------------------------------------
+    #  LOADING AND SAVING
+    # --------------------------------------------------------------------------
+    def add_records(self, batch, groups=None):
+        """
+        Index one batch of (kind, record) tuples from xml_loader. groups may
+        give the group keys of the batch's links, in order, when they are
+        already known. Returns the lids of the new links.
+        """
+        # Sorting once when first asked for is cheaper than bisecting per link
+        self._duplicate_keys = None
+        self._tag_bits.clear()
+        self._all_bits = None
+        if groups is None:
+            groups = self.group_keys([record[F_URL] for kind, record in batch if kind == LINK_RECORD])
+        groups = iter(groups)
+        lids = []
+        for kind, record in batch:
+            if kind == LINK_RECORD:
+                lids.append(self._index_link(record, next(groups)))
+            elif kind == CATEGORY_RECORD:
+                cat_id, cat_name, extra = record
+                self._index_category(cat_id, cat_name)
+                if extra:
+                    self.category_extra[cat_id] = extra
+            elif kind == OTHER_RECORD:
+                self.other_elems.append(record)
+            elif kind == "root":
+                self.root_tag, self.root_attrib = record
+        self.loaded = True
+        return lids
+
+    def load_file(self, source, batch_size=5000, on_progress=None, should_cancel=None):
+        for batch in iter_record_batches(source, batch_size, on_progress, should_cancel):
+            self.add_records(batch)
+        self.loaded = True
+        return self
+
+    def write_xml(self, out):
+        """Serialize the collection to a text stream."""
+        write_records(
+            out,
+            self.root_tag,
+            self.root_attrib,
+            ((cid, name, self.category_extra.get(cid)) for cid, name in self.categories.items()),
+            self.records.values(),
+            self.other_elems,
+        )
+
+    def snapshot(self):
+        """
+        Copy what write_xml() needs and return write(out), which serializes
+        that copy. Take the snapshot on the thread that mutates the store;
+        write(out) can then run on any thread while editing goes on.
+        """
+        root_tag, root_attrib = self.root_tag, dict(self.root_attrib)
+        categories = [(cid, name, self.category_extra.get(cid)) for cid, name in self.categories.items()]
+        records = list(self.records.values())
+        other_elems = list(self.other_elems)
+
+        def write(out):
+            write_records(out, root_tag, root_attrib, categories, records, other_elems)
+        return write
+
+    def iter_record_batches(self, batch_size=5000):
+        """
+        The collection as batches of (kind, record) tuples, in the shape and
+        order xml_loader.iter_record_batches() yields a saved file.
+        """
+        yield ([("root", (self.root_tag, self.root_attrib))]
+               + [(OTHER_RECORD, elem) for elem in self.other_elems]
+               + [(CATEGORY_RECORD, (cid, name, self.category_extra.get(cid)))
+                  for cid, name in self.categories.items()])
+        records = list(self.records.values())
+        for start in range(0, len(records), batch_size):
+            yield [(LINK_RECORD, record) for record in records[start:start + batch_size]]
+
+    # What index_state() captures; every other index is derived on first use
+    _STATE_ATTRS = (
+        "root_tag", "root_attrib", "other_elems", "records", "links_by_id",
+        "links_by_category", "links_by_group", "group_of", "dup_group_count",
+        "dup_link_count", "links_by_tag", "categories", "category_extra",
+        "_category_ids_by_name", "_next_lid", "_max_link_id",
+    )
+
+    def index_state(self):
+        """
+        The collection and its indexes as a dict of the store's own objects
+        (not copies) for model_cache to serialize. Extra elements are still
+        ElementTree elements.
+        """
+        return {name: getattr(self, name) for name in self._STATE_ATTRS}
+
+    def restore_index_state(self, state):
+        """Adopt a dict from index_state() into this empty, unsubscribed store."""
+        for name in self._STATE_ATTRS:
+            setattr(self, name, state[name])
+        self._duplicate_keys = None
+        self._tag_bits.clear()
+        self._all_bits = None
+        self.loaded = True
+
+    def save(self, file_path, backups=0):
+        """Write the collection to file_path atomically (see atomic_save)."""
+        atomic_write(file_path, self.write_xml, backups)
+
+    def _index_category(self, cat_id, cat_name):
+        self.categories[cat_id] = cat_name
+        self._category_ids_by_name.setdefault(cat_name, cat_id)
+
+    def _index_link(self, record, group=None):
+        lid = self._next_lid
+        self._next_lid += 1
+
+        link_id = record[F_ID]
+        if link_id:
+            self.links_by_id.setdefault(link_id, lid)
+            if link_id.isdigit():
+                self._max_link_id = max(self._max_link_id, int(link_id))
+
+        cat_id = record[F_CAT] or ""
+        if group is None:
+            group = self.group_key(record[F_URL])
+
+        self.records[lid] = (link_id, record[F_URL], _intern(record[F_CAT]), record[F_TITLE],
+                             _intern(record[F_TAGS]), record[F_EXTRA])
+        self.group_of[lid] = group
+        self.links_by_category.setdefault(cat_id, {})[lid] = None
+        self._add_to_group(group, lid)
+        for tag in parse_tags(record[F_TAGS]):
+            self._add_tag(tag, lid)
+        if self._all_bits is not None:
+            self._all_bits |= 1 << lid
+        self._search_changed(lid)
+        return lid
+
+    def _remove_from_bucket(self, index, key, lid):
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.pop(lid, None)
+            if not bucket:
+                del index[key]
+
+    def _add_to_group(self, group, lid):
+        bucket = self.links_by_group.get(group)
+        if bucket is None:
+            self.links_by_group[group] = lid
+        elif type(bucket) is int:
+            self.links_by_group[group] = {bucket: None, lid: None}
+            self.dup_group_count += 1
+            self.dup_link_count += 2
+            if self._duplicate_keys is not None:
+                bisect.insort(self._duplicate_keys, group)
+        else:
+            bucket[lid] = None
+            self.dup_link_count += 1
+
+    def _remove_from_group(self, group, lid):
+        bucket = self.links_by_group.get(group)
+        if type(bucket) is int:
+            if bucket == lid:
+                del self.links_by_group[group]
+            return
+        if bucket is None or lid not in bucket:
+            return
+        del bucket[lid]
+        if len(bucket) > 1:
+            self.dup_link_count -= 1
+            return
+        self.links_by_group[group] = next(iter(bucket))
+        self.dup_group_count -= 1
+        self.dup_link_count -= 2
+        if self._duplicate_keys is not None:
+            pos = bisect.bisect_left(self._duplicate_keys, group)
+            if pos < len(self._duplicate_keys) and self._duplicate_keys[pos] == group:
+                del self._duplicate_keys[pos]
+
+    def _add_tag(self, tag, lid):
+        self.links_by_tag.setdefault(tag, {})[lid] = None
+        bits = self._tag_bits.get(tag)
+        if bits is not None:
+            self._tag_bits[tag] = bits | (1 << lid)
+
+    def _remove_tag(self, tag, lid):
+        self._remove_from_bucket(self.links_by_tag, tag, lid)
+        bits = self._tag_bits.get(tag)
+        if bits is not None:
+            if tag in self.links_by_tag:
+                self._tag_bits[tag] = bits & ~(1 << lid)
+            else:
+                del self._tag_bits[tag]
+
+    def _search_fields(self, lid):
+        record = self.records.get(lid)
+        if record is None:
+            return None
+        return record[F_TITLE], record[F_URL], record[F_TAGS]
+
+    def _search_changed(self, lid, old=None):
+        """Reindex lid for search; old holds its fields before the change."""
+        index = self.search_index
+        if index is None:
+            if self._search_touched is not None:
+                self._search_touched.add(lid)
+            return
+        new = self._search_fields(lid)
+        if old is None:
+            if new is not None:
+                index.add(lid, *new)
+        elif new is None:
+            index.remove(lid, *old)
+        else:
+            index.update(lid, old, new)
+
+    def _unindex_link(self, lid):
+        record = self.records.pop(lid)
+
+        link_id = record[F_ID]
+        if link_id and self.links_by_id.get(link_id) == lid:
+            del self.links_by_id[link_id]
+
+        cat_id = record[F_CAT] or ""
+        self._remove_from_bucket(self.links_by_category, cat_id, lid)
+
+        group = self.group_of.pop(lid)
+        self._remove_from_group(group, lid)
+
+        for tag in parse_tags(record[F_TAGS]):
+            self._remove_tag(tag, lid)
+        if self._all_bits is not None:
+            self._all_bits &= ~(1 << lid)
+        self._search_changed(lid, old=(record[F_TITLE], record[F_URL], record[F_TAGS]))
+
+        # Listeners still see the Explorer item binding while handling the event
+        self._emit(LINK_REMOVED, lid=lid, cat_id=cat_id, group=group)
+        self.explorer_items.unbind_key(lid)
+        return record
+
+    # --------------------------------------------------------------------------
+    #  QUERIES
+    # --------------------------------------------------------------------------
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, lid):
+        return lid in self.records
+
+    def iter_fields(self, fields, chunk_size=5000):
+        """
+        Yield (lid, *values of fields) for every link, for worker threads.
+        Reads a chunk at a time under the read lock, so the owning thread
+        can write in between: a link removed meanwhile is left out, and
+        later chunks may show edits made after earlier ones were read.
+        """
+        with self.lock.read():
+            lids = list(self.records)
+        for start in range(0, len(lids), chunk_size):
+            with self.lock.read():
+                rows = []
+                for lid in lids[start:start + chunk_size]:
+                    record = self.records.get(lid)
+                    if record is not None:
+                        rows.append((lid,) + tuple([record[field] for field in fields]))
+            yield from rows
+
+    def lid_for_link_id(self, link_id):
+        return self.links_by_id.get(link_id)
+
+    def link_id(self, lid):
+        return self.records[lid][F_ID] or ""
+
+    def url(self, lid):
+        return self.records[lid][F_URL] or ""
+
+    def title(self, lid):
+        return self.records[lid][F_TITLE] or ""
+
+    def display_title(self, lid):
+        return self.title(lid) or self.url(lid)
+
+    def category_of(self, lid):
+        return self.records[lid][F_CAT] or ""
+
+    def tags(self, lid):
+        return parse_tags(self.records[lid][F_TAGS])
+
+    def links_in_category(self, cat_id):
+        return list(self.links_by_category.get(cat_id, ()))
+
+    def group_key(self, raw_url):
+        if not raw_url:
+            return EMPTY_URL_KEY
+        return self.canon.canonicalize(raw_url)
+
+    def group_keys(self, raw_urls):
+        """group_key() of many URLs, canonicalized in one batch."""
+        return group_keys_for_urls(self.canon, raw_urls)
+
+    def group_members(self, group):
+        bucket = self.links_by_group.get(group, ())
+        return [bucket] if type(bucket) is int else list(bucket)
+
+    def group_size(self, group):
+        bucket = self.links_by_group.get(group, ())
+        return 1 if type(bucket) is int else len(bucket)
+
+    def duplicate_groups(self):
+        """Sorted keys of all groups holding more than one link (do not modify)."""
+        if self._duplicate_keys is None:
+            count("groups_scanned", len(self.links_by_group))
+            self._duplicate_keys = sorted(
+                group for group, lids in self.links_by_group.items() if type(lids) is not int
+            )
+        return self._duplicate_keys
+
+    def tag_counts(self):
+        return {tag: len(lids) for tag, lids in self.links_by_tag.items()}
+
+    def tag_bits(self, tag):
+        """Bitset of the lids carrying tag (see tag_query)."""
+        bits = self._tag_bits.get(tag)
+        if bits is None:
+            lids = self.links_by_tag.get(tag)
+            if not lids:
+                return 0
+            bits = self._tag_bits[tag] = bits_from_ints(lids, self._next_lid)
+        return bits
+
+    def all_bits(self):
+        if self._all_bits is None:
+            count("records_scanned", len(self.records))
+            self._all_bits = bits_from_ints(self.records, self._next_lid)
+        return self._all_bits
+
+    def query_tags(self, query):
+        """Bitset of the lids matching a tag_query.TagQuery."""
+        return query.evaluate(self.tag_bits, self.all_bits())
+
+    @_mutation
+    def begin_search_index(self):
+        """
+        Start building a search index: returns an empty TrigramIndex and an
+        iterator of (lid, title, url, tags) to fill it from on any thread
+        (see iter_fields()). Hand the filled index to install_search_index().
+        """
+        self.search_index = None
+        self._search_touched = set()
+        count("records_scanned", len(self.records))
+        return TrigramIndex(self._search_fields), self.iter_fields((F_TITLE, F_URL, F_TAGS))
+
+    @_mutation
+    def install_search_index(self, index):
+        # Links edited since the snapshot are indexed again under their
+        # current fields; entries from the snapshot go stale harmlessly
+        for lid in self._search_touched or ():
+            fields = self._search_fields(lid)
+            if fields is not None:
+                index.add(lid, *fields)
+        self._search_touched = None
+        self.search_index = index
+
+    def search(self, text, limit=50, accept=None):
+        """
+        search_index.SearchHits for text, or None while no index exists.
+        accept(lid), if given, leaves out the links it is false for.
+        """
+        if self.search_index is None:
+            return None
+        return self.search_index.search(text, limit, accept)
+
+    def category_name(self, cat_id):
+        return self.categories.get(cat_id, f"<Unknown:{cat_id}>")
+
+    def category_id_by_name(self, cat_name):
+        return self._category_ids_by_name.get(cat_name)
+
+    def lid_for_item(self, item_id):
+        return self.explorer_items.key_for(item_id)
+
+    def item_for_lid(self, lid):
+        return self.explorer_items.item_for(lid)
+
+    def category_for_item(self, item_id):
+        return self.category_items.key_for(item_id)
+
+    def item_for_category(self, cat_id):
+        return self.category_items.item_for(cat_id)
+
+    # --------------------------------------------------------------------------
+    #  CATEGORY MUTATIONS
+    # --------------------------------------------------------------------------
+    def _generate_new_category_id(self):
+        existing_ids = []
+        for cid in self.categories:
+            try:
+                existing_ids.append(int(cid))
+            except ValueError:
+                pass
+        if not existing_ids:
+            return 1
+        else:
+            return max(existing_ids) + 1
+
+    @_mutation
+    def add_category(self, cat_name, cat_id=None):
+        new_id = str(cat_id) if cat_id is not None else str(self._generate_new_category_id())
+        self._index_category(new_id, cat_name)
+        self._emit(CATEGORY_ADDED, cat_id=new_id)
+        return new_id
+
+    @_mutation
+    def ensure_category(self, cat_name):
+        cat_id = self.category_id_by_name(cat_name)
+        if cat_id is None:
+            cat_id = self.add_category(cat_name)
+        return cat_id
+
+    def _reindex_category_name(self, cat_name):
+        self._category_ids_by_name.pop(cat_name, None)
+        for cid, cname in self.categories.items():
+            if cname == cat_name:
+                self._category_ids_by_name[cat_name] = cid
+                break
+
+    @_mutation
+    def rename_category(self, cat_id, new_name):
+        old_name = self.categories.get(cat_id)
+        if old_name is None:
+            return
+        self.categories[cat_id] = new_name
+        self._reindex_category_name(old_name)
+        self._category_ids_by_name.setdefault(new_name, cat_id)
+        self._emit(CATEGORY_RENAMED, cat_id=cat_id)
+
+    @_mutation
+    def remove_category(self, cat_id):
+        """Remove a category and all of its bookmarks. Returns the removed lids."""
+        removed = self.links_in_category(cat_id)
+        self.remove_links(removed)
+
+        self.category_extra.pop(cat_id, None)
+        cat_name = self.categories.pop(cat_id, None)
+        if cat_name is not None:
+            self._reindex_category_name(cat_name)
+        self._emit(CATEGORY_REMOVED, cat_id=cat_id)
+        self.category_items.unbind_key(cat_id)
+        return removed
+
+    # --------------------------------------------------------------------------
+    #  LINK MUTATIONS
+    # --------------------------------------------------------------------------
+    def generate_new_link_id(self):
+        return self._max_link_id + 1
+
+    @_mutation
+    def add_link(self, url, cat_id, title="", tags=(), link_id=None):
+        # New links always carry a <Tags> element, even when empty
+        record = (
+            link_id if link_id is not None else str(self.generate_new_link_id()),
+            url,
+            str(cat_id),
+            title,
+            ",".join(sorted(tags)),
+            None,
+        )
+        lid = self._index_link(record)
+        self._emit(LINK_ADDED, lid=lid, cat_id=record[F_CAT], group=self.group_of[lid])
+        return lid
+
+    @_mutation
+    def remove_links(self, lids):
+        removed = 0
+        for lid in lids:
+            if lid in self.records:
+                self._unindex_link(lid)
+                removed += 1
+        return removed
+
+    @_mutation
+    def remove_link(self, lid):
+        return self.remove_links([lid]) == 1
+
+    def _set_field(self, lid, field, value):
+        record = self.records[lid]
+        self.records[lid] = record[:field] + (value,) + record[field + 1:]
+
+    @_mutation
+    def set_category(self, lid, cat_id):
+        cat_id = str(cat_id)
+        record = self.records[lid]
+        old_cat_id = record[F_CAT] or ""
+        if record[F_CAT] != cat_id:
+            self._set_field(lid, F_CAT, _intern(cat_id))
+        if old_cat_id == cat_id:
+            return
+        self._remove_from_bucket(self.links_by_category, old_cat_id, lid)
+        self.links_by_category.setdefault(cat_id, {})[lid] = None
+        self._emit(LINK_MOVED, lid=lid, cat_id=cat_id, old_cat_id=old_cat_id)
+
+    @_mutation
+    def set_tags(self, lid, tags_set):
+        old = self._search_fields(lid)
+        old_tags = self.tags(lid)
+        self._set_field(lid, F_TAGS, _intern(",".join(sorted(tags_set))))
+        new_tags = self.tags(lid)
+        for tag in old_tags - new_tags:
+            self._remove_tag(tag, lid)
+        for tag in new_tags - old_tags:
+            self._add_tag(tag, lid)
+        self._search_changed(lid, old)
+        self._emit(LINK_UPDATED, lid=lid)
+
+    @_mutation
+    def set_title(self, lid, title):
+        old = self._search_fields(lid)
+        self._set_field(lid, F_TITLE, title)
+        self._search_changed(lid, old)
+        self._emit(LINK_UPDATED, lid=lid)
+
+    @_mutation
+    def set_url_rules(self, enabled):
+        """
+        Regroup every link under a new set of url_canon rule names. Keys are
+        recomputed in one batch through the pipeline's memo, so only the rules
+        from the first changed one onwards run again. Emits GROUPS_REBUILT
+        and returns how many links changed group.
+        """
+        if not self.canon.set_enabled(enabled):
+            return 0
+
+        lids = list(self.records)
+        count("records_scanned", len(lids))
+        groups = self.group_keys([self.records[lid][F_URL] for lid in lids])
+
+        old_group_of = self.group_of
+        self.group_of = {}
+        self.links_by_group = {}
+        self._duplicate_keys = None
+        self.dup_group_count = 0
+        self.dup_link_count = 0
+        changed = 0
+        for lid, group in zip(lids, groups):
+            self.group_of[lid] = group
+            self._add_to_group(group, lid)
+            if group != old_group_of[lid]:
+                changed += 1
+
+        self._emit(GROUPS_REBUILT)
+        return changed
+
+    @_mutation
+    def set_url(self, lid, url):
+        url = url.strip()
+        old = self._search_fields(lid)
+        self._set_field(lid, F_URL, url)
+        self._search_changed(lid, old)
+        old_group = self.group_of[lid]
+        group = self.group_key(url)
+        if group != old_group:
+            self._remove_from_group(old_group, lid)
+            self._add_to_group(group, lid)
+            self.group_of[lid] = group
+            self._emit(GROUP_CHANGED, lid=lid, group=group, old_group=old_group)
+        self._emit(LINK_UPDATED, lid=lid)
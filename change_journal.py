@@ -0,0 +1,397 @@
+import json
+import os
+import threading
+
+from atomic_save import atomic_write
+from bookmark_store import (
+    F_ID, F_URL, F_CAT, F_TITLE, F_TAGS,
+    LINK_ADDED, LINK_REMOVED, LINK_MOVED, LINK_UPDATED,
+    CATEGORY_ADDED, CATEGORY_RENAMED, CATEGORY_REMOVED,
+    parse_tags,
+)
+
+JOURNAL_SUFFIX = ".journal"
+STALE_SUFFIX = ".stale"
+
+# Entries are JSON arrays, one per line. Links are named by journal keys:
+# their 1-based position in the base XML, then increasing numbers for links
+# added since. Categories are named by their ID.
+#
+#   ["a", key, link_id, url, cat_id, title, tags]   add link
+#   ["d", key]                                      delete link
+#   ["m", key, cat_id]                              move link
+#   ["u", key, url, title, tags]                    update link
+#   ["c+", cat_id, name]                            add category
+#   ["c=", cat_id, name]                            rename category
+#   ["c-", cat_id]                                  remove category
+#
+# The first line is a header naming the base XML by file_signature(), so a
+# journal is never replayed onto a file it was not written against.
+#
+# While a save runs, each entry is followed by a copy under the snapshot's
+# numbering, and the save leaves markers around them:
+#
+#   ["s<"]                                          snapshot taken
+#   ["~", entry]                                    entry, snapshot numbering
+#   ["s>", signature]                               snapshot about to replace
+#                                                   the file with this signature
+#
+# Replay skips all three. They let entries_for() recover the edits made
+# during a save that replaced the XML but did not get to switch journals.
+
+
+def journal_path(xml_path):
+    return xml_path + JOURNAL_SUFFIX
+
+
+def file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _encode(entry):
+    return (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _header(xml_path):
+    return _encode({"journal": 1, "base": file_signature(xml_path)})
+
+
+def read_journal(path):
+    """
+    (header, entries, complete) of a journal file. Reading stops at the
+    first line that does not parse (a write torn by a crash); complete is
+    False when that happened.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    lines = data.split(b"\n")
+    # A complete file ends with a newline, leaving an empty last item
+    tail = lines.pop()
+    complete = not tail
+    header = None
+    entries = []
+    for line in lines:
+        try:
+            item = json.loads(line)
+        except ValueError:
+            complete = False
+            break
+        if header is None:
+            header = item
+        else:
+            entries.append(item)
+    return header, entries, complete
+
+
+def entries_for(xml_path, header, entries):
+    """
+    The entries of a journal that apply to xml_path as it is now, or None
+    when the journal belongs to another version of the file. A journal
+    whose save replaced the XML before the new journal was written yields
+    the copies of the entries made since that save began.
+    """
+    if header is None:
+        return None
+    signature = file_signature(xml_path)
+    if header.get("base") == signature:
+        return entries
+    copies = None
+    matched = False
+    for entry in entries:
+        op = entry[0]
+        if op == "s<":
+            if matched:
+                break
+            copies = []
+        elif op == "~" and copies is not None:
+            copies.append(entry[1])
+        elif op == "s>" and copies is not None and entry[1] == signature:
+            matched = True
+    return copies if matched else None
+
+
+def replay(store, entries, lid_of_key):
+    """
+    Apply journal entries to store. lid_of_key maps journal keys to lids
+    and is extended by added links. Returns how many entries applied.
+    """
+    applied = 0
+    for entry in entries:
+        op = entry[0]
+        if op == "a":
+            key, link_id, url, cat_id, title, tags = entry[1:]
+            lid_of_key[key] = store.add_link(url, cat_id, title, parse_tags(tags), link_id=link_id)
+        elif op in ("d", "m", "u"):
+            lid = lid_of_key.get(entry[1])
+            if lid is None or lid not in store:
+                continue
+            if op == "d":
+                store.remove_link(lid)
+                del lid_of_key[entry[1]]
+            elif op == "m":
+                store.set_category(lid, entry[2])
+            else:
+                url, title, tags = entry[2:]
+                record = store.records[lid]
+                if record[F_URL] != url:
+                    store.set_url(lid, url)
+                if record[F_TITLE] != title:
+                    store.set_title(lid, title)
+                if record[F_TAGS] != tags:
+                    store.set_tags(lid, parse_tags(tags))
+        elif op == "c+":
+            store.add_category(entry[2], cat_id=entry[1])
+        elif op == "c=":
+            store.rename_category(entry[1], entry[2])
+        elif op == "c-":
+            store.remove_category(entry[1])
+        else:
+            continue
+        applied += 1
+    return applied
+
+
+def open_journal(store, xml_path, **kw):
+    """
+    Replay the journal of xml_path onto store, which was just loaded from
+    xml_path and has no listeners yet, and return a ChangeJournal that
+    continues it. A journal written against another version of the file is
+    moved aside (journal.stale is then True).
+    """
+    path = journal_path(xml_path)
+    lid_of_key = dict(enumerate(store.records, 1))
+    replayed = 0
+    stale = False
+    entries = []
+    rewrite = True
+    if os.path.exists(path):
+        header, entries, complete = read_journal(path)
+        applicable = entries_for(xml_path, header, entries)
+        if applicable is not None:
+            replayed = replay(store, applicable, lid_of_key)
+            # A recovered journal is rewritten against the file it now fits
+            rewrite = applicable is not entries or not complete
+            entries = applicable
+        else:
+            os.replace(path, path + STALE_SUFFIX)
+            stale = True
+            entries = []
+    if rewrite:
+        # Start afresh, or drop a torn last line that appends would extend
+        atomic_write(path, lambda out: out.write(
+            (_header(xml_path) + b"".join(_encode(e) for e in entries)).decode("utf-8")))
+    journal = ChangeJournal(store, xml_path, {lid: key for key, lid in lid_of_key.items()}, **kw)
+    journal.replayed = replayed
+    journal.stale = stale
+    return journal
+
+
+# ------------------------------------------------------------------------------
+#  CHANGE JOURNAL
+# ------------------------------------------------------------------------------
+class ChangeJournal:
+    """
+    Appends one entry per store mutation to the journal next to an XML
+    file, so persisting an edit costs one short line instead of a rewrite
+    of the whole collection.
+
+    Entries are written and fsynced by a writer thread, so a burst of edits
+    shares one fsync and the Tk thread never waits on the disk.
+
+    Folding the journal into the XML (compaction) is a save of a store
+    snapshot: begin_save() when the snapshot is taken, mark_save() just
+    before the XML is replaced, end_save() once it is. Entries made in
+    between are also kept under the snapshot's numbering and become the
+    new journal, which replaces the old one atomically. Until then the old
+    journal carries those copies too, so whichever XML a crash leaves
+    behind, open_journal() finds every entry it is missing.
+    """
+
+    def __init__(self, store, xml_path, key_of, max_bytes=2 * 1024 * 1024):
+        self.store = store
+        self.xml_path = xml_path
+        self.path = journal_path(xml_path)
+        self.max_bytes = max_bytes
+        self.size = os.path.getsize(self.path)
+        self.replayed = 0
+        self.stale = False
+        self.error = None
+        # lid -> journal key, and the key the next added link gets
+        self._key_of = key_of
+        self._next_key = max(key_of.values(), default=0) + 1
+        # While a save runs: the same for the snapshot's numbering, and
+        # the entries encoded with it
+        self._save_key_of = None
+        self._save_next_key = 0
+        self._save_lines = None
+        self._closing = False
+
+        self._cond = threading.Condition()
+        self._ops = []
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="journal-writer", daemon=True)
+        self._thread.start()
+
+    def attach(self):
+        self.store.subscribe(self._on_store_event)
+
+    def needs_compaction(self):
+        return self.size > self.max_bytes
+
+    # --------------------------------------------------------------------------
+    #  RECORDING
+    # --------------------------------------------------------------------------
+    def _entry(self, event, key_of, new_key):
+        """The journal entry for event under one numbering of the links."""
+        kind = event.kind
+        if kind == LINK_ADDED:
+            key_of[event.lid] = new_key
+            r = self.store.records[event.lid]
+            return ["a", new_key, r[F_ID], r[F_URL], r[F_CAT], r[F_TITLE], r[F_TAGS]]
+        if kind == LINK_REMOVED:
+            return ["d", key_of.pop(event.lid)]
+        if kind == LINK_MOVED:
+            return ["m", key_of[event.lid], event.cat_id]
+        if kind == LINK_UPDATED:
+            r = self.store.records[event.lid]
+            return ["u", key_of[event.lid], r[F_URL], r[F_TITLE], r[F_TAGS]]
+        if kind == CATEGORY_ADDED:
+            return ["c+", event.cat_id, self.store.categories[event.cat_id]]
+        if kind == CATEGORY_RENAMED:
+            return ["c=", event.cat_id, self.store.categories[event.cat_id]]
+        if kind == CATEGORY_REMOVED:
+            return ["c-", event.cat_id]
+        # GROUP_CHANGED is followed by LINK_UPDATED; GROUPS_REBUILT changes
+        # nothing that is saved
+        return None
+
+    def _on_store_event(self, event):
+        entry = self._entry(event, self._key_of, self._next_key)
+        if entry is None:
+            return
+        if event.kind == LINK_ADDED:
+            self._next_key += 1
+        line = _encode(entry)
+        if self._save_lines is not None:
+            entry = self._entry(event, self._save_key_of, self._save_next_key)
+            if event.kind == LINK_ADDED:
+                self._save_next_key += 1
+            self._save_lines.append(_encode(entry))
+            line += _encode(["~", entry])
+        self._append(line)
+
+    def _append(self, line):
+        self.size += len(line)
+        self._submit(("append", line))
+
+    # --------------------------------------------------------------------------
+    #  COMPACTION
+    # --------------------------------------------------------------------------
+    def begin_save(self):
+        """Call together with store.snapshot(); the snapshot numbers links anew."""
+        self._save_key_of = {lid: key for key, lid in enumerate(self.store.records, 1)}
+        self._save_next_key = len(self._save_key_of) + 1
+        self._save_lines = []
+        self._append(_encode(["s<"]))
+
+    def mark_save(self, temp_path):
+        """
+        Call on the save worker once the snapshot is written to temp_path,
+        before it replaces the XML: records the signature the XML will have,
+        and returns once that is on disk.
+        """
+        self._submit(("append", _encode(["s>", file_signature(temp_path)])))
+        self.flush()
+
+    def end_save(self, xml_path):
+        """
+        The snapshot is now the XML at xml_path (the same file, or a Save
+        As target): continue with a journal against that file.
+        """
+        data = _header(xml_path) + b"".join(self._save_lines)
+        self.xml_path = xml_path
+        self.path = journal_path(xml_path)
+        self.size = len(data)
+        self._key_of, self._next_key = self._save_key_of, self._save_next_key
+        self._save_key_of = self._save_lines = None
+        self._submit(("replace", self.path, data))
+        if self._closing:
+            self._stop()
+
+    def abort_save(self):
+        self._save_key_of = self._save_lines = None
+        if self._closing:
+            self._stop()
+
+    # --------------------------------------------------------------------------
+    #  WRITER THREAD
+    # --------------------------------------------------------------------------
+    def _submit(self, op):
+        with self._cond:
+            self._ops.append(op)
+            self._cond.notify()
+
+    def _run(self):
+        path = self.path
+        f = None
+        while True:
+            with self._cond:
+                while not self._ops and not self._stopped:
+                    self._cond.wait()
+                ops, self._ops = self._ops, []
+                stopping = self._stopped
+            callbacks = []
+            try:
+                for op in ops:
+                    if op[0] == "append":
+                        if f is None:
+                            f = open(path, "ab")
+                        f.write(op[1])
+                    elif op[0] == "replace":
+                        if f is not None:
+                            f.close()
+                            f = None
+                        _, path, data = op
+                        atomic_write(path, lambda out: out.write(data.decode("utf-8")))
+                    else:
+                        callbacks.append(op[1])
+                # One fsync for the whole batch
+                if f is not None:
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError as e:
+                # Reported to the owner, which falls back to saving the XML
+                self.error = e
+                stopping = True
+            for callback in callbacks:
+                callback()
+            if stopping:
+                if f is not None:
+                    f.close()
+                return
+
+    def flush(self):
+        """Block until everything recorded so far is on disk."""
+        done = threading.Event()
+        self._submit(("call", done.set))
+        while not done.wait(0.1):
+            if not self._thread.is_alive():
+                return
+
+    def _stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join()
+
+    def close(self):
+        """Stop recording; pending entries are still written. A save in
+        progress finishes first (end_save or abort_save)."""
+        self.store.unsubscribe(self._on_store_event)
+        self._closing = True
+        if self._save_lines is None:
+            self._stop()
@@ -0,0 +1,261 @@
+import cProfile
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+# Timing spans and counters for user actions and background tasks.
+#
+# Off by default. While off, span() hands out a shared no-op and count()
+# returns at once: no span is ever current, so call sites need no guard.
+# Actions are wrapped with @action; work they start on other threads is
+# measured by its own task span (see workers.BackgroundTask).
+#
+# Spans nest per thread. Counters go to the innermost span and are added
+# to its parent when it ends. Only top-level spans are reported: kept in
+# recent, appended to the log file, and passed to listeners on the thread
+# that ran them. With a profiler set, each top-level span is captured
+# into a file of its own in profile_dir.
+
+PROFILERS = ("cprofile", "tracemalloc")
+
+enabled = False
+profiler = None
+profile_dir = None
+log_path = None
+recent = deque(maxlen=200)
+
+
+class _Local(threading.local):
+    # A class default, so threads that never ran a span read None without
+    # the AttributeError getattr() would raise and swallow
+    span = None
+
+
+_local = _Local()
+_lock = threading.Lock()
+_listeners = []
+_capture_ids = itertools.count(1)
+# Spans capturing with tracemalloc; it is stopped when the last one ends
+_tracing = 0
+
+
+def enable(profile=None, directory=None, log=None):
+    """
+    Turn instrumentation on. profile is None or one of PROFILERS, with the
+    capture files written to directory; log names a file each finished
+    span is appended to as a JSON line.
+    """
+    global enabled, profiler, profile_dir, log_path
+    if profile is not None and profile not in PROFILERS:
+        raise ValueError(f"unknown profiler {profile!r}; choose from {', '.join(PROFILERS)}")
+    if profile is not None and directory is None:
+        raise ValueError("a profiler needs a directory for its captures")
+    for path in (directory, log and os.path.dirname(log)):
+        if path:
+            os.makedirs(path, exist_ok=True)
+    profiler, profile_dir, log_path = profile, directory, log
+    enabled = True
+
+
+def disable():
+    """Turn instrumentation off; spans already running still finish."""
+    global enabled, profiler
+    enabled = False
+    profiler = None
+
+
+def add_listener(callback):
+    """Register callback(span) for every finished top-level span, on the thread that ran it."""
+    _listeners.append(callback)
+
+
+def remove_listener(callback):
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+
+# ------------------------------------------------------------------------------
+#  SPANS
+# ------------------------------------------------------------------------------
+class Span:
+    """One timed run of an action or task, with its counters."""
+
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+        self.counters = {}
+        self.parent = None
+        self.started_at = None
+        self.seconds = None
+        self.paused = 0.0
+        self.error = None
+        self.thread = None
+        self.capture_path = None
+        self._start = None
+        self._capture = None
+
+    def __enter__(self):
+        self.parent = _local.span
+        _local.span = self
+        self.thread = threading.current_thread().name
+        self.started_at = time.time()
+        if self.parent is None and profiler is not None:
+            self._start_capture()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self._start - self.paused
+        _local.span = self.parent
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        if self.parent is not None:
+            counters = self.parent.counters
+            for name, n in self.counters.items():
+                counters[name] = counters.get(name, 0) + n
+            self.parent.paused += self.paused
+            return False
+        if self._capture is not None:
+            self._finish_capture()
+        _finish(self)
+        return False
+
+    # A capture only covers the thread that runs the span
+    def _start_capture(self):
+        global _tracing
+        kind = profiler
+        if kind == "cprofile":
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is active (one per process on Python 3.12+)
+                return
+            self._capture = (kind, profile)
+        else:
+            with _lock:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                _tracing += 1
+            tracemalloc.reset_peak()
+            self._capture = (kind, tracemalloc.take_snapshot())
+
+    def _finish_capture(self):
+        global _tracing
+        kind, data = self._capture
+        self._capture = None
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+        base = os.path.join(profile_dir, f"{stamp}-{next(_capture_ids)}-{self.name}")
+        try:
+            if kind == "cprofile":
+                data.disable()
+                self.capture_path = base + ".prof"
+                data.dump_stats(self.capture_path)
+            else:
+                snapshot = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+                self.capture_path = base + ".tracemalloc.txt"
+                with open(self.capture_path, "w", encoding="utf-8") as out:
+                    out.write(f"{self.name}: {self.seconds * 1000:,.1f} ms, peak {peak / 1e6:,.1f} MB "
+                              f"traced, {current / 1e6:,.1f} MB at the end\n\n")
+                    out.write("Allocation sites by growth during the span:\n")
+                    for stat in snapshot.compare_to(data, "lineno")[:40]:
+                        out.write(f"{stat}\n")
+        except OSError:
+            self.capture_path = None
+        finally:
+            if kind == "tracemalloc":
+                with _lock:
+                    _tracing -= 1
+                    if not _tracing:
+                        tracemalloc.stop()
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "started_at": self.started_at,
+            "ms": round(self.seconds * 1000, 3),
+            "thread": self.thread,
+            "counters": self.counters,
+            "error": self.error,
+            "capture": self.capture_path,
+        }
+
+    def summary(self):
+        """One line for a status bar: name, duration and the counters."""
+        parts = [f"{self.name} {self.seconds * 1000:,.0f} ms"]
+        parts += [f"{name.replace('_', ' ')} {n:,}" for name, n in sorted(self.counters.items())]
+        if self.error:
+            parts.append(f"failed ({self.error})")
+        return " | ".join(parts)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, kind="action"):
+    """Context manager timing a block as a span; a no-op while disabled."""
+    if not enabled:
+        return _NULL_SPAN
+    return Span(name, kind)
+
+
+def action(func):
+    """Decorator running func in a span named after it while instrumentation is on."""
+    name = func.__name__.lstrip("_")
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not enabled:
+            return func(*args, **kwargs)
+        with Span(name, "action"):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def count(name, n=1):
+    """Add n to a counter of the span running on this thread, if any."""
+    current = _local.span
+    if current is not None:
+        current.counters[name] = current.counters.get(name, 0) + n
+
+
+class paused:
+    """Context manager leaving a block (a modal dialog, say) out of the running span's time."""
+
+    def __enter__(self):
+        self._span = _local.span
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._span is not None:
+            self._span.paused += time.perf_counter() - self._start
+        return False
+
+
+def _finish(finished):
+    with _lock:
+        recent.append(finished)
+        if log_path is not None:
+            try:
+                with open(log_path, "a", encoding="utf-8") as out:
+                    out.write(json.dumps(finished.as_dict()) + "\n")
+            except OSError:
+                pass
+    for callback in list(_listeners):
+        callback(finished)
@@ -0,0 +1,188 @@
+import heapq
+import time
+import urllib.parse
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+
+from metadata_cache import LinkHealth
+from title_fetch import make_session, with_scheme
+
+# Statuses worth another attempt after a pause
+RETRY_STATUSES = (429, 502, 503, 504)
+# Servers that refuse or mishandle HEAD; these are confirmed with a GET
+HEAD_FALLBACK_STATUSES = (400, 403, 404, 405, 406, 501)
+
+# Result classes used by the Explorer's link status filter
+HEALTH_OK = "ok"
+HEALTH_REDIRECTED = "redirected"
+HEALTH_CLIENT_ERROR = "client_error"
+HEALTH_SERVER_ERROR = "server_error"
+HEALTH_UNREACHABLE = "unreachable"
+
+
+def health_class(health):
+    if health.status is None:
+        return HEALTH_UNREACHABLE
+    if health.status >= 500:
+        return HEALTH_SERVER_ERROR
+    if health.status >= 400:
+        return HEALTH_CLIENT_ERROR
+    if health.redirected:
+        return HEALTH_REDIRECTED
+    return HEALTH_OK
+
+
+def host_of(url):
+    return urllib.parse.urlsplit(with_scheme(url)).netloc.lower()
+
+
+# ------------------------------------------------------------------------------
+#  LINK CHECKER
+# ------------------------------------------------------------------------------
+class LinkChecker:
+    """
+    Checks whether URLs are alive: HEAD first, a one-byte ranged GET when the
+    server rejects HEAD.
+
+    max_workers is the global budget of concurrent requests. check_many()
+    never runs more than per_host requests against one host at a time and
+    spaces requests to a host by host_delay seconds, so workers are never
+    parked waiting on a busy host. Timeouts, connection errors and
+    429/5xx answers are retried up to retries times with exponential
+    backoff (honouring a numeric Retry-After).
+    """
+
+    def __init__(self, max_workers=32, per_host=2, host_delay=0.0, timeout=10,
+                 retries=2, backoff=0.5, max_backoff=30.0, session=None):
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.host_delay = host_delay
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = session if session is not None else make_session(
+            max_hosts=max_workers, per_host=per_host
+        )
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="link-check")
+
+    def _request(self, url):
+        resp = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+        resp.close()
+        if resp.status_code in HEAD_FALLBACK_STATUSES:
+            resp = self.session.get(url, timeout=self.timeout, allow_redirects=True,
+                                    stream=True, headers={"Range": "bytes=0-0"})
+            resp.close()
+        return resp
+
+    def _retry_delay(self, attempt, resp=None):
+        delay = self.backoff * (2 ** attempt)
+        if resp is not None:
+            retry_after = resp.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+        return min(delay, self.max_backoff)
+
+    def check(self, url):
+        """Check one URL; never raises."""
+        full_url = with_scheme(url)
+        error = None
+        resp = None
+        start = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            try:
+                resp = self._request(full_url)
+                error = None
+            except requests.Timeout:
+                resp, error = None, "timeout"
+            except requests.ConnectionError:
+                resp, error = None, "connection failed"
+            except Exception as e:
+                resp, error = None, type(e).__name__
+                break
+
+            retryable = resp is None or resp.status_code in RETRY_STATUSES
+            if not retryable or attempt == self.retries:
+                break
+            time.sleep(self._retry_delay(attempt, resp))
+
+        latency_ms = (time.perf_counter() - start) * 1000.0
+        return LinkHealth(
+            url=full_url,
+            status=resp.status_code if resp is not None else None,
+            latency_ms=round(latency_ms, 1),
+            final_url=resp.url if resp is not None else None,
+            redirected=resp is not None and bool(resp.history),
+            error=error,
+            checked_at=time.time(),
+        )
+
+    def check_many(self, jobs, should_cancel=None, max_in_flight=None):
+        """
+        Check (key, url) jobs and yield (key, url, LinkHealth) as each
+        completes. Jobs are scheduled host by host: a host only gets a new
+        request once it has a free slot and its politeness delay has passed.
+        """
+        window = max_in_flight or self.max_workers
+        queues = OrderedDict()
+        for key, url in jobs:
+            queues.setdefault(host_of(url), deque()).append((key, url))
+
+        active = dict.fromkeys(queues, 0)
+        ready = deque(queues)          # hosts that may start a request now
+        scheduled = set(queues)        # hosts in ready or delayed
+        delayed = []                   # heap of (time allowed, host)
+        pending = {}
+
+        def reschedule(host, now):
+            if queues.get(host) and host not in scheduled and active[host] < self.per_host:
+                scheduled.add(host)
+                if self.host_delay > 0:
+                    heapq.heappush(delayed, (now + self.host_delay, host))
+                else:
+                    ready.append(host)
+
+        try:
+            while pending or ready or delayed:
+                if should_cancel is not None and should_cancel():
+                    break
+
+                now = time.monotonic()
+                while delayed and delayed[0][0] <= now:
+                    ready.append(heapq.heappop(delayed)[1])
+
+                while ready and len(pending) < window:
+                    host = ready.popleft()
+                    scheduled.discard(host)
+                    key, url = queues[host].popleft()
+                    if not queues[host]:
+                        del queues[host]
+                    active[host] += 1
+                    pending[self.executor.submit(self.check, url)] = (key, url, host)
+                    reschedule(host, now)
+
+                if not pending:
+                    if delayed:
+                        time.sleep(max(0.0, delayed[0][0] - time.monotonic()))
+                    continue
+
+                timeout = None
+                if delayed:
+                    timeout = max(0.0, delayed[0][0] - time.monotonic())
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                now = time.monotonic()
+                for future in done:
+                    key, url, host = pending.pop(future)
+                    active[host] -= 1
+                    reschedule(host, now)
+                    yield key, url, future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
@@ -0,0 +1,200 @@
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+from collections import namedtuple
+
+from bookmark_store import normalize_url
+
+# Cache file kept next to the XML, shared by the collections in that folder
+CACHE_FILE_NAME = ".bookmark-meta.sqlite"
+
+DAY = 24 * 60 * 60
+
+PageMeta = namedtuple(
+    "PageMeta",
+    "title final_url status content_type etag last_modified fetched_at",
+)
+
+# Result of one link-health check; status is None when the host could not
+# be reached (error then says why). redirected is true when the server
+# answered with a redirect: final_url also differs from url when requests
+# merely normalized it (trailing slash, percent-encoding).
+LinkHealth = namedtuple(
+    "LinkHealth",
+    "url status latency_ms final_url redirected error checked_at",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS page_meta (
+    url_key       TEXT PRIMARY KEY,
+    title         TEXT,
+    final_url     TEXT,
+    status        INTEGER,
+    content_type  TEXT,
+    etag          TEXT,
+    last_modified TEXT,
+    fetched_at    REAL NOT NULL,
+    last_used     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS page_meta_last_used ON page_meta (last_used);
+CREATE TABLE IF NOT EXISTS link_health (
+    url_key    TEXT PRIMARY KEY,
+    url        TEXT,
+    status     INTEGER,
+    latency_ms REAL,
+    final_url  TEXT,
+    redirected INTEGER NOT NULL DEFAULT 0,
+    error      TEXT,
+    checked_at REAL NOT NULL
+);
+"""
+
+_HEALTH_COLUMNS = "url, status, latency_ms, final_url, redirected, error, checked_at"
+
+
+def cache_key(url):
+    """
+    normalize_url() plus the query string. normalize_url drops the query,
+    which is right for grouping duplicates but would give every ?v= page of
+    a site the same cached title.
+    """
+    norm = normalize_url(url)
+    query = urllib.parse.urlsplit(url.strip()).query
+    return f"{norm}?{query}" if query else norm
+
+
+# ------------------------------------------------------------------------------
+#  METADATA CACHE
+# ------------------------------------------------------------------------------
+class MetadataCache:
+    """
+    SQLite store of fetched page metadata keyed by cache_key(url).
+
+    Entries younger than ttl are served without touching the network; older
+    ones keep their ETag/Last-Modified so a re-fetch can be conditional.
+    Entries unused for max_age are deleted, and once the table holds more
+    than max_entries the least recently used rows are evicted. Safe to use
+    from several fetch workers at once.
+    """
+
+    def __init__(self, path, ttl=30 * DAY, max_age=365 * DAY, max_entries=500000,
+                 evict_every=1000):
+        self.path = path
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(_SCHEMA)
+            self._migrate()
+        self.evict()
+
+    def _migrate(self):
+        # Caches written before link_health had a redirected column; their
+        # checks count as not redirected until the links are checked again
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(link_health)")}
+        if "redirected" not in columns:
+            with self.conn:
+                self.conn.execute(
+                    "ALTER TABLE link_health ADD COLUMN redirected INTEGER NOT NULL DEFAULT 0"
+                )
+
+    @classmethod
+    def for_collection(cls, xml_path, **kw):
+        directory = os.path.dirname(os.path.abspath(xml_path))
+        return cls(os.path.join(directory, CACHE_FILE_NAME), **kw)
+
+    def get(self, url):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT title, final_url, status, content_type, etag, last_modified, fetched_at "
+                "FROM page_meta WHERE url_key = ?",
+                (cache_key(url),),
+            ).fetchone()
+        return PageMeta(*row) if row is not None else None
+
+    def is_fresh(self, meta, now=None):
+        return (now or time.time()) - meta.fetched_at < self.ttl
+
+    def put(self, url, title, final_url=None, status=None, content_type=None,
+            etag=None, last_modified=None):
+        now = time.time()
+        with self._lock:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO page_meta VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (cache_key(url), title, final_url, status, content_type,
+                     etag, last_modified, now, now),
+                )
+            self._puts += 1
+            evict = self._puts % self.evict_every == 0
+        if evict:
+            self.evict()
+
+    def revalidated(self, url):
+        """Restart the TTL of an entry after a 304 Not Modified."""
+        now = time.time()
+        with self._lock:
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE page_meta SET fetched_at = ?, last_used = ? WHERE url_key = ?",
+                    (now, now, cache_key(url)),
+                )
+
+    def touch(self, url):
+        with self._lock:
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE page_meta SET last_used = ? WHERE url_key = ?",
+                    (time.time(), cache_key(url)),
+                )
+
+    def evict(self):
+        with self._lock:
+            with self.conn:
+                self.conn.execute(
+                    "DELETE FROM page_meta WHERE last_used < ?", (time.time() - self.max_age,)
+                )
+                count = self.conn.execute("SELECT COUNT(*) FROM page_meta").fetchone()[0]
+                excess = count - self.max_entries
+                if excess > 0:
+                    self.conn.execute(
+                        "DELETE FROM page_meta WHERE url_key IN ("
+                        "SELECT url_key FROM page_meta ORDER BY last_used LIMIT ?)",
+                        (excess,),
+                    )
+
+    # --------------------------------------------------------------------------
+    #  LINK HEALTH
+    # --------------------------------------------------------------------------
+    def put_health(self, health):
+        with self._lock:
+            with self.conn:
+                self.conn.execute(
+                    f"INSERT OR REPLACE INTO link_health (url_key, {_HEALTH_COLUMNS}) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (cache_key(health.url),) + tuple(health),
+                )
+
+    def all_health(self):
+        """Every recorded check as {cache_key: LinkHealth}."""
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT url_key, {_HEALTH_COLUMNS} FROM link_health"
+            ).fetchall()
+        return {row[0]: LinkHealth(*row[1:5], bool(row[5]), *row[6:]) for row in rows}
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM page_meta").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,186 @@
+import gc
+import hashlib
+import json
+import marshal
+import mmap
+import os
+import struct
+import sys
+import xml.etree.ElementTree as ET
+
+from atomic_save import atomic_write
+from bookmark_store import F_EXTRA
+
+# Sidecar next to the XML holding the parsed and indexed collection
+CACHE_SUFFIX = ".model-cache"
+FORMAT_VERSION = 3
+
+# File layout: magic, header length, JSON header, marshal payload
+_MAGIC = b"SAFMODEL"
+_PREFIX = struct.Struct("<8sI")
+
+
+def cache_path(xml_path):
+    return xml_path + CACHE_SUFFIX
+
+
+def content_hash(path, chunk_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_key(xml_path):
+    """
+    What a cache must have been written for to stand for xml_path as it is
+    now: its path, size, mtime and content hash. None if the file changed
+    while it was being hashed.
+    """
+    before = os.stat(xml_path)
+    digest = content_hash(xml_path)
+    after = os.stat(xml_path)
+    if (before.st_size, before.st_mtime_ns) != (after.st_size, after.st_mtime_ns):
+        return None
+    return {
+        "path": os.path.abspath(xml_path),
+        "size": after.st_size,
+        "mtime_ns": after.st_mtime_ns,
+        "hash": digest,
+    }
+
+
+def _same_file(a, b):
+    # A copy or checkout can change the mtime of identical content; the
+    # hash decides then
+    return (a["path"], a["size"], a["hash"]) == (b["path"], b["size"], b["hash"])
+
+
+def _header(key, url_rules, payload_size):
+    return {
+        "format": FORMAT_VERSION,
+        "python": list(sys.version_info[:2]),
+        "marshal": marshal.version,
+        "key": key,
+        "url_rules": sorted(url_rules),
+        "payload_size": payload_size,
+    }
+
+
+# ------------------------------------------------------------------------------
+#  ENCODING
+# ------------------------------------------------------------------------------
+# marshal only takes built-in types, so extra elements travel as XML text
+
+def _elems_text(elems):
+    return [ET.tostring(elem, encoding="unicode") for elem in elems]
+
+
+def _text_elems(texts):
+    return [ET.fromstring(text) for text in texts]
+
+
+def _encode_state(state):
+    state = dict(state)
+    records = state["records"]
+    link_extras = {lid: _elems_text(r[F_EXTRA]) for lid, r in records.items() if r[F_EXTRA]}
+    if link_extras:
+        records = dict(records)
+        for lid in link_extras:
+            records[lid] = records[lid][:F_EXTRA] + (None,)
+        state["records"] = records
+    state["link_extras"] = link_extras
+    state["other_elems"] = _elems_text(state["other_elems"])
+    state["category_extra"] = {cid: _elems_text(e) for cid, e in state["category_extra"].items()}
+    return state
+
+
+def _decode_state(state):
+    records = state["records"]
+    for lid, texts in state.pop("link_extras").items():
+        records[lid] = records[lid][:F_EXTRA] + (_text_elems(texts),)
+    state["other_elems"] = _text_elems(state["other_elems"])
+    state["category_extra"] = {cid: _text_elems(t) for cid, t in state["category_extra"].items()}
+    return state
+
+
+def _loads(data):
+    # Unmarshalling builds millions of containers; collections triggered
+    # along the way find nothing to free and take longer than the load
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return marshal.loads(data)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+# ------------------------------------------------------------------------------
+#  READING AND WRITING
+# ------------------------------------------------------------------------------
+def load_model(store, xml_path, key):
+    """
+    Fill the empty store from the cache next to xml_path, if there is one
+    written for key (see file_key) and for the store's URL rules. Returns
+    whether it did. A cache that does not match or does not read is
+    ignored; save_model() replaces it after the XML is parsed.
+    """
+    if key is None:
+        return False
+    try:
+        f = open(cache_path(xml_path), "rb")
+    except OSError:
+        return False
+    with f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # ValueError: an empty file cannot be mapped
+            return False
+        with mm, memoryview(mm) as view:
+            try:
+                magic, header_size = _PREFIX.unpack_from(view)
+                start = _PREFIX.size + header_size
+                header = json.loads(bytes(view[_PREFIX.size:start]))
+            except (struct.error, ValueError):
+                return False
+            if magic != _MAGIC or not isinstance(header, dict) or not isinstance(header.get("key"), dict):
+                return False
+            if header != _header(header["key"], store.canon.enabled, len(view) - start):
+                return False
+            if not _same_file(header["key"], key):
+                return False
+            try:
+                state = _loads(view[start:])
+            except (ValueError, EOFError, TypeError):
+                return False
+    store.restore_index_state(_decode_state(state))
+    return True
+
+
+def save_model(store, xml_path, key):
+    """
+    Write the cache of xml_path for a store just loaded from it, before any
+    edit or journal replay. key is file_key(xml_path) taken before parsing;
+    nothing is written if the file has changed since. Returns whether it
+    wrote the cache.
+    """
+    if key is None:
+        return False
+    st = os.stat(xml_path)
+    if (st.st_size, st.st_mtime_ns) != (key["size"], key["mtime_ns"]):
+        return False
+    payload = marshal.dumps(_encode_state(store.index_state()))
+    header = json.dumps(_header(key, store.canon.enabled, len(payload))).encode("utf-8")
+
+    def write(out):
+        out.write(_PREFIX.pack(_MAGIC, len(header)))
+        out.write(header)
+        out.write(payload)
+    atomic_write(cache_path(xml_path), write, encoding=None)
+    return True
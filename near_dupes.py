@@ -0,0 +1,173 @@
+import hashlib
+import operator
+import re
+import urllib.parse
+from array import array
+
+from url_canon import is_tracking_param
+
+# Host prefixes of mobile/AMP mirrors of the same site
+MIRROR_HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+
+_DEFAULT_DOCUMENT_RE = re.compile(r"^(index|default)\.[a-z0-9]+$")
+_WORD_RE = re.compile(r"[a-z0-9]{2,}")
+
+
+def url_tokens(url):
+    """
+    Feature tokens of a URL: its host (without mobile/www prefixes), the
+    words of its path (default documents dropped) and its non-tracking
+    query parameters in any order.
+    """
+    url = url.strip()
+    if not url.startswith(("http://", "https://")):
+        url = "http://" + url
+    parts = urllib.parse.urlsplit(url)
+
+    host = parts.netloc.lower()
+    stripped = True
+    while stripped:
+        stripped = False
+        for prefix in MIRROR_HOST_PREFIXES:
+            if host.startswith(prefix):
+                host = host[len(prefix):]
+                stripped = True
+    tokens = {"h:" + host}
+
+    for segment in parts.path.lower().split("/"):
+        if not segment or _DEFAULT_DOCUMENT_RE.match(segment):
+            continue
+        tokens.update("p:" + word for word in _WORD_RE.findall(urllib.parse.unquote(segment)))
+
+    for name, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True):
+        if not is_tracking_param(name):
+            tokens.add(f"q:{name.lower()}={value}")
+    return tokens
+
+
+def title_tokens(title):
+    return {"t:" + word for word in _WORD_RE.findall((title or "").lower())}
+
+
+def lsh_params(threshold, num_perm):
+    """
+    Pick (bands, rows) with bands * rows == num_perm whose S-curve midpoint
+    (1/bands) ** (1/rows) lies closest to threshold.
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        error = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+# ------------------------------------------------------------------------------
+#  MINHASH
+# ------------------------------------------------------------------------------
+class MinHasher:
+    """
+    MinHash signatures over token sets.
+
+    Each token is hashed once into num_perm 32-bit values with a single
+    shake_128 digest (cached per token); a signature is the element-wise
+    minimum over a link's tokens.
+    """
+
+    def __init__(self, num_perm=64):
+        self.num_perm = num_perm
+        self._token_hashes = {}
+
+    def _hashes(self, token):
+        hashes = self._token_hashes.get(token)
+        if hashes is None:
+            digest = hashlib.shake_128(token.encode("utf-8")).digest(4 * self.num_perm)
+            hashes = self._token_hashes[token] = array("I", digest)
+        return hashes
+
+    def signature(self, tokens):
+        arrays = [self._hashes(t) for t in tokens]
+        if len(arrays) == 1:
+            return arrays[0]
+        return array("I", map(min, *arrays))
+
+    def similarity(self, sig_a, sig_b):
+        """Estimated Jaccard similarity of the token sets behind two signatures."""
+        return sum(map(operator.eq, sig_a, sig_b)) / self.num_perm
+
+
+def _find(parent, x):
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+
+def find_near_duplicates(items, threshold=0.7, num_perm=64, max_bucket=200,
+                         should_cancel=None, on_progress=None):
+    """
+    Cluster (key, url, title) items whose URL and title tokens are similar.
+
+    Signatures are banded into LSH buckets, so only items sharing a bucket
+    are ever compared and the run stays roughly linear in len(items).
+    Buckets larger than max_bucket (typically a big site's boilerplate) are
+    skipped. Candidate pairs scoring at least threshold are joined into
+    clusters.
+
+    Returns a list of clusters, largest first; each is a list of
+    (key, score) with the cluster's representative first (score 1.0) and
+    the others scored against it.
+    """
+    hasher = MinHasher(num_perm)
+    bands, rows = lsh_params(threshold, num_perm)
+
+    keys = []
+    signatures = []
+    for n, (key, url, title) in enumerate(items):
+        tokens = url_tokens(url or "") | title_tokens(title)
+        keys.append(key)
+        signatures.append(hasher.signature(tokens))
+        if n % 5000 == 0:
+            if should_cancel is not None and should_cancel():
+                return []
+            if on_progress is not None:
+                on_progress("hashing", n, len(items))
+
+    parent = list(range(len(keys)))
+    for band in range(bands):
+        if should_cancel is not None and should_cancel():
+            return []
+        if on_progress is not None:
+            on_progress("matching", band, bands)
+        start, stop = band * rows, (band + 1) * rows
+        buckets = {}
+        for i, sig in enumerate(signatures):
+            buckets.setdefault(sig[start:stop].tobytes(), []).append(i)
+        for members in buckets.values():
+            if len(members) < 2 or len(members) > max_bucket:
+                continue
+            for a_pos, a in enumerate(members):
+                for b in members[a_pos + 1:]:
+                    root_a, root_b = _find(parent, a), _find(parent, b)
+                    if root_a == root_b:
+                        continue
+                    if hasher.similarity(signatures[a], signatures[b]) >= threshold:
+                        parent[root_b] = root_a
+
+    clusters = {}
+    for i in range(len(keys)):
+        clusters.setdefault(_find(parent, i), []).append(i)
+
+    result = []
+    for members in clusters.values():
+        if len(members) < 2:
+            continue
+        rep = members[0]
+        result.append([(keys[rep], 1.0)] + [
+            (keys[i], hasher.similarity(signatures[rep], signatures[i])) for i in members[1:]
+        ])
+    result.sort(key=len, reverse=True)
+    return result
@@ -0,0 +1,197 @@
+import heapq
+import re
+from array import array
+from collections import namedtuple
+
+# Words are indexed by their trigrams; shorter words only filter candidates
+_WORD_RE = re.compile(r"\w{3,}")
+SearchHits = namedtuple("SearchHits", "keys matched complete")
+
+
+def search_fields(title, url, tags):
+    """The lower-cased (title, url, tags) a bookmark is searched by."""
+    url = (url or "").strip().lower()
+    scheme, sep, rest = url.partition("://")
+    if sep and scheme.isalpha():
+        url = rest[4:] if rest.startswith("www.") else rest
+    return (title or "").lower(), url, (tags or "").lower()
+
+
+def trigrams(fields):
+    grams = set()
+    for word in _WORD_RE.findall(" ".join(fields)):
+        grams.update([word[i:i + 3] for i in range(len(word) - 2)])
+    return grams
+
+
+def _score(terms, fields):
+    """Rank of a matching bookmark: title hits beat tag hits beat URL hits."""
+    title, url, tags = fields
+    score = 0
+    for term in terms:
+        if term in title:
+            score += 4 if title.startswith(term) or " " + term in title else 3
+        elif term in tags:
+            score += 2
+        elif term in url.split("/", 1)[0]:
+            score += 2
+        else:
+            score += 1
+    return score
+
+
+def _in_posting_order(posting, keys):
+    # Keys of the set keys in the order posting holds them, each once (edits
+    # can append a key to a posting it once left); empties keys
+    for key in posting:
+        if key in keys:
+            keys.discard(key)
+            yield key
+
+
+# ------------------------------------------------------------------------------
+#  TRIGRAM INDEX
+# ------------------------------------------------------------------------------
+class TrigramIndex:
+    """
+    Inverted index from word trigrams to the keys of the bookmarks holding
+    them, for substring search over title, URL and tags.
+
+    Postings are append-only array('I')s of keys. Edits append the trigrams
+    a bookmark gained and leave stale entries behind; every candidate is
+    checked against the bookmark's current fields (fields_of(key), None once
+    removed), so stale entries only cost space until the index is rebuilt
+    (see needs_compaction()).
+    """
+
+    def __init__(self, fields_of, max_scan=2000):
+        # fields_of(key) -> (title, url, tags) as stored, or None
+        self.fields_of = fields_of
+        self.max_scan = max_scan
+        self._postings = {}
+        self.live_entries = 0
+        self.stale_entries = 0
+
+    def __len__(self):
+        return len(self._postings)
+
+    def _append(self, key, grams):
+        postings = self._postings
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array("I")
+            posting.append(key)
+        self.live_entries += len(grams)
+
+    def add(self, key, title, url, tags):
+        self._append(key, trigrams(search_fields(title, url, tags)))
+
+    def update(self, key, old, new):
+        """Reindex key after its (title, url, tags) changed from old to new."""
+        old_grams = trigrams(search_fields(*old))
+        new_grams = trigrams(search_fields(*new))
+        self._append(key, new_grams - old_grams)
+        gone = len(old_grams - new_grams)
+        self.live_entries -= gone
+        self.stale_entries += gone
+
+    def remove(self, key, title, url, tags):
+        gone = len(trigrams(search_fields(title, url, tags)))
+        self.live_entries -= gone
+        self.stale_entries += gone
+
+    def needs_compaction(self):
+        return self.stale_entries > max(100000, self.live_entries)
+
+    def search(self, text, limit=50, accept=None):
+        """
+        Keys of the bookmarks containing every whitespace-separated term of
+        text in their title, URL or tags, best first and at most limit.
+        With accept, only keys for which accept(key) is true are counted.
+
+        Candidates come from the shortest trigram posting and are verified
+        against the bookmarks' fields, in posting order at first. Once a
+        quarter of max_scan of them have failed, the rest are narrowed down
+        by intersecting the other postings. At most max_scan matches are
+        ranked, so a keystroke costs about the same at any collection size.
+        complete is False when there were more; the ranking then only
+        covers the first max_scan matches found.
+        """
+        terms = text.lower().split()
+        grams = trigrams(terms)
+        if not grams:
+            return SearchHits([], 0, False)
+
+        postings = []
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if not posting:
+                return SearchHits([], 0, True)
+            postings.append(posting)
+        postings.sort(key=len)
+        head = postings[0]
+
+        fields_of = self.fields_of
+        max_scan = self.max_scan
+        ranked = []
+        checked = set()
+
+        def rank(key):
+            # (sort key, key) entry if key matches, else None
+            raw = fields_of(key)
+            if raw is None:
+                return None
+            fields = search_fields(*raw)
+            if not all(term in fields[0] or term in fields[1] or term in fields[2] for term in terms):
+                return None
+            if accept is not None and not accept(key):
+                return None
+            return (_score(terms, fields), -len(fields[0]), -key, key)
+
+        # Common terms fill max_scan within a few thousand keys, long before
+        # sets of postings this long could be built and intersected
+        complete = True
+        misses = 0
+        max_misses = max_scan // 4
+        for key in head:
+            if key in checked:
+                continue
+            checked.add(key)
+            entry = rank(key)
+            if entry is None:
+                misses += 1
+                if misses > max_misses:
+                    break
+            elif len(ranked) == max_scan:
+                complete = False
+                break
+            else:
+                ranked.append(entry)
+
+        if misses > max_misses:
+            # Mostly misses: intersect, smallest posting first. Once few
+            # candidates are left, verifying them is cheaper than going
+            # through a much longer posting.
+            matches = set(head)
+            matches -= checked
+            for posting in postings[1:]:
+                if not matches or len(posting) > 16 * len(matches):
+                    break
+                matches.intersection_update(posting)
+            if len(matches) <= max_scan:
+                candidates = sorted(matches)
+            else:
+                # Too many to sort on every keystroke
+                candidates = _in_posting_order(head, matches)
+            for key in candidates:
+                entry = rank(key)
+                if entry is None:
+                    continue
+                if len(ranked) == max_scan:
+                    complete = False
+                    break
+                ranked.append(entry)
+
+        best = heapq.nlargest(limit, ranked)
+        return SearchHits([entry[3] for entry in best], len(ranked), complete)
@@ -0,0 +1,189 @@
+import re
+
+# ------------------------------------------------------------------------------
+#  BITSETS
+# ------------------------------------------------------------------------------
+# Sets of link keys (small non-negative ints) as Python ints: bit n is set when
+# key n is a member. AND/OR/NOT are single C-level operations over the whole
+# collection.
+
+
+def bits_from_ints(keys, max_key):
+    buf = bytearray((max_key >> 3) + 1)
+    for key in keys:
+        buf[key >> 3] |= 1 << (key & 7)
+    return int.from_bytes(buf, "little")
+
+
+def iter_bits(bits):
+    """Members of a bitset, highest first."""
+    digits = bin(bits)
+    top = len(digits) - 1
+    pos = digits.find("1", 2)
+    while pos != -1:
+        yield top - pos
+        pos = digits.find("1", pos + 1)
+
+
+# ------------------------------------------------------------------------------
+#  QUERY PARSER
+# ------------------------------------------------------------------------------
+# Grammar (AND binds tighter than OR; a comma is an AND):
+#
+#   query := term (OR term)*
+#   term  := factor ((AND | ",") factor)*
+#   factor:= NOT factor | "(" query ")" | tag
+#
+# A tag is a run of words ("machine learning") or a quoted string. The
+# operators are the upper-case words AND, OR and NOT, so lower-case tags
+# such as "or" still work.
+_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|(,)|"([^"]*)"|([^\s(),"]+))')
+_OPERATORS = ("AND", "OR", "NOT")
+
+
+class TagQueryError(ValueError):
+    pass
+
+
+def _tokenize(text):
+    tokens = []
+    words = []
+
+    def flush():
+        if words:
+            tokens.append(("tag", " ".join(words)))
+            words.clear()
+
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if match is None:
+            raise TagQueryError(f"Unbalanced quote at position {pos + 1}")
+        pos = match.end()
+        lparen, rparen, comma, quoted, word = match.groups()
+        if word is not None and word not in _OPERATORS:
+            words.append(word)
+            continue
+        flush()
+        if quoted is not None:
+            tokens.append(("tag", quoted.strip()))
+        elif word is not None:
+            tokens.append((word, word))
+        elif comma is not None:
+            tokens.append(("AND", ","))
+        else:
+            tokens.append((lparen or rparen, lparen or rparen))
+    flush()
+    return tokens
+
+
+class TagQuery:
+    """
+    A parsed boolean tag filter.
+
+    matches() tests one link's tag set; evaluate() answers the query for the
+    whole collection with bitset algebra over per-tag posting bitsets.
+    """
+
+    def __init__(self, text):
+        self.text = text.strip()
+        self._tokens = _tokenize(self.text)
+        self._pos = 0
+        if not self._tokens:
+            raise TagQueryError("Empty tag filter")
+        self.tree = self._parse_or()
+        if self._pos != len(self._tokens):
+            raise TagQueryError(f"Unexpected {self._tokens[self._pos][1]!r}")
+        del self._tokens
+
+    def _peek(self):
+        return self._tokens[self._pos][0] if self._pos < len(self._tokens) else None
+
+    def _parse_or(self):
+        terms = [self._parse_and()]
+        while self._peek() == "OR":
+            self._pos += 1
+            terms.append(self._parse_and())
+        return terms[0] if len(terms) == 1 else ("or", terms)
+
+    def _parse_and(self):
+        factors = [self._parse_not()]
+        while self._peek() == "AND":
+            self._pos += 1
+            factors.append(self._parse_not())
+        return factors[0] if len(factors) == 1 else ("and", factors)
+
+    def _parse_not(self):
+        kind = self._peek()
+        if kind == "NOT":
+            self._pos += 1
+            return ("not", self._parse_not())
+        if kind == "(":
+            self._pos += 1
+            node = self._parse_or()
+            if self._peek() != ")":
+                raise TagQueryError("Missing )")
+            self._pos += 1
+            return node
+        if kind == "tag":
+            self._pos += 1
+            return ("tag", self._tokens[self._pos - 1][1])
+        if kind is None:
+            raise TagQueryError("Tag filter ends too early")
+        raise TagQueryError(f"Unexpected {self._tokens[self._pos][1]!r}")
+
+    def tags(self):
+        """Every tag the query mentions."""
+        found = set()
+        stack = [self.tree]
+        while stack:
+            kind, arg = stack.pop()
+            if kind == "tag":
+                found.add(arg)
+            elif kind == "not":
+                stack.append(arg)
+            else:
+                stack.extend(arg)
+        return found
+
+    def matches(self, tags):
+        return self._match(self.tree, tags)
+
+    def _match(self, node, tags):
+        kind, arg = node
+        if kind == "tag":
+            return arg in tags
+        if kind == "not":
+            return not self._match(arg, tags)
+        if kind == "and":
+            return all(self._match(n, tags) for n in arg)
+        return any(self._match(n, tags) for n in arg)
+
+    def evaluate(self, tag_bits, all_bits):
+        """
+        Bitset of matching links, given tag_bits(tag) -> bitset of the links
+        carrying tag and all_bits, the bitset of every link (for NOT).
+        """
+        return self._eval(self.tree, tag_bits, all_bits)
+
+    def _eval(self, node, tag_bits, all_bits):
+        kind, arg = node
+        if kind == "tag":
+            return tag_bits(arg)
+        if kind == "not":
+            return all_bits & ~self._eval(arg, tag_bits, all_bits)
+        if kind == "and":
+            result = all_bits
+            for n in arg:
+                result &= self._eval(n, tag_bits, all_bits)
+                if not result:
+                    break
+            return result
+        result = 0
+        for n in arg:
+            result |= self._eval(n, tag_bits, all_bits)
+        return result
+
+    def __str__(self):
+        return self.text
@@ -0,0 +1,288 @@
+import codecs
+import re
+import urllib.parse
+from collections import OrderedDict
+from html.parser import HTMLParser
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+from requests.adapters import HTTPAdapter
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+# Only this much of the document is searched for a <meta> charset
+SNIFF_BYTES = 1024
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_.:-]+)""", re.IGNORECASE)
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# What a title fetch may fail with: network and HTTP errors, and URLs that
+# requests or urllib3 reject (ValueError, which covers UnicodeError)
+_FETCH_ERRORS = (requests.RequestException, ValueError)
+
+
+def with_scheme(url):
+    if not url.startswith(("http://", "https://")):
+        url = "http://" + url
+    return url
+
+
+def clean_title(raw_title):
+    return urllib.parse.unquote(" ".join(raw_title.split()))
+
+
+def is_html_content_type(content_type):
+    """Missing content types are given the benefit of the doubt."""
+    if not content_type:
+        return True
+    return content_type.split(";", 1)[0].strip().lower() in HTML_CONTENT_TYPES
+
+
+def charset_from_content_type(content_type):
+    for param in (content_type or "").split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset":
+            return value.strip().strip("\"'") or None
+    return None
+
+
+def sniff_charset(head):
+    """Charset from a byte-order mark or a <meta> tag in the first bytes."""
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    match = _META_CHARSET_RE.search(head[:SNIFF_BYTES])
+    if match:
+        return match.group(1).decode("ascii")
+    return None
+
+
+def _decoder_for(encoding):
+    try:
+        return codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+class _TitleParser(HTMLParser):
+    """Collects the text of the first <title>; done is set at its end tag."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.in_title = False
+        self.done = False
+        self.parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title" and not self.done:
+            self.in_title = True
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self.in_title:
+            self.in_title = False
+            self.done = True
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.parts.append(data)
+
+    @property
+    def title(self):
+        return clean_title("".join(self.parts))
+
+
+def extract_title(chunks, encoding=None, max_bytes=64 * 1024):
+    """
+    Find the page title in an iterable of byte chunks.
+
+    Chunks are decoded and fed to an HTML tokenizer one at a time; reading
+    stops at </title> or once max_bytes have been consumed. When encoding
+    is None the charset is sniffed from the first bytes, falling back to
+    UTF-8. Markup the tokenizer cannot parse gives "".
+    """
+    try:
+        return _extract_title(chunks, encoding, max_bytes)
+    except AssertionError:
+        # html.parser's way of rejecting malformed markup (e.g. an unknown
+        # <![...[ marked section)
+        return ""
+
+
+def _extract_title(chunks, encoding, max_bytes):
+    parser = _TitleParser()
+    decoder = _decoder_for(encoding) if encoding else None
+    head = b""
+    consumed = 0
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        chunk = chunk[:max_bytes - consumed]
+        consumed += len(chunk)
+
+        if decoder is None:
+            # Hold data back until there is enough to look for a charset
+            head += chunk
+            if len(head) < SNIFF_BYTES and consumed < max_bytes:
+                continue
+            decoder = _decoder_for(sniff_charset(head))
+            chunk, head = head, b""
+
+        parser.feed(decoder.decode(chunk))
+        if parser.done or consumed >= max_bytes:
+            break
+    else:
+        if decoder is None:
+            decoder = _decoder_for(sniff_charset(head))
+            parser.feed(decoder.decode(head))
+        parser.feed(decoder.decode(b"", final=True))
+
+    return parser.title if parser.done else ""
+
+
+def make_session(max_hosts=32, per_host=2):
+    """
+    A requests.Session shared by all fetch workers. Each host gets its own
+    urllib3 pool of at most per_host connections; pool_block makes extra
+    workers wait for a free connection instead of opening more.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=max_hosts, pool_maxsize=per_host,
+                          pool_block=True, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def interleave_by_host(jobs):
+    """
+    Reorder (key, url) jobs round-robin by host, so a run of bookmarks on one
+    site does not tie up every worker waiting for that host's connections.
+    """
+    by_host = OrderedDict()
+    for key, url in jobs:
+        host = urllib.parse.urlsplit(with_scheme(url)).netloc.lower()
+        by_host.setdefault(host, []).append((key, url))
+
+    queues = [iter(q) for q in by_host.values()]
+    ordered = []
+    while queues:
+        remaining = []
+        for q in queues:
+            job = next(q, None)
+            if job is not None:
+                ordered.append(job)
+                remaining.append(q)
+        queues = remaining
+    return ordered
+
+
+# ------------------------------------------------------------------------------
+#  TITLE FETCHER
+# ------------------------------------------------------------------------------
+class TitleFetcher:
+    """
+    Fetches page titles on a bounded thread pool through one pooled session.
+
+    fetch_title() blocks; network, HTTP and URL failures give "". At most
+    max_bytes of a page are read, and non-HTML responses are skipped from
+    their headers alone. submit() runs one fetch on the pool; fetch_many()
+    drives a bulk run and yields results as they complete. With a cache,
+    fresh entries are answered locally and stale ones are revalidated with
+    If-None-Match / If-Modified-Since. Pass a session to point the fetcher at a stub server
+    or to share connection pools with other code.
+    """
+
+    def __init__(self, max_workers=8, per_host=2, timeout=5, session=None,
+                 max_bytes=64 * 1024, chunk_size=8 * 1024, cache=None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        # Optional metadata_cache.MetadataCache; may be swapped at any time
+        self.cache = cache
+        self.session = session if session is not None else make_session(per_host=per_host)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="title-fetch")
+
+    def fetch_title(self, url):
+        cache = self.cache
+        try:
+            meta = cache.get(url) if cache is not None else None
+            if meta is not None and cache.is_fresh(meta):
+                cache.touch(url)
+                return meta.title or ""
+
+            # A stale entry still lets the server answer 304 instead of a page
+            headers = {}
+            if meta is not None:
+                if meta.etag:
+                    headers["If-None-Match"] = meta.etag
+                if meta.last_modified:
+                    headers["If-Modified-Since"] = meta.last_modified
+
+            resp = self.session.get(with_scheme(url), timeout=self.timeout, stream=True, headers=headers)
+            try:
+                if resp.status_code == 304 and meta is not None:
+                    cache.revalidated(url)
+                    return meta.title or ""
+
+                content_type = resp.headers.get("Content-Type", "")
+                title = ""
+                if resp.status_code == 200 and is_html_content_type(content_type):
+                    # Closing a streamed response early drops the connection
+                    # instead of downloading the rest of the body
+                    title = extract_title(
+                        resp.iter_content(self.chunk_size),
+                        charset_from_content_type(content_type),
+                        self.max_bytes,
+                    )
+                # Server errors are likely transient and are not remembered
+                if cache is not None and resp.status_code < 500:
+                    cache.put(
+                        url, title, resp.url, resp.status_code, content_type,
+                        resp.headers.get("ETag"), resp.headers.get("Last-Modified"),
+                    )
+                return title
+            finally:
+                resp.close()
+        except _FETCH_ERRORS:
+            pass
+        return ""
+
+    def submit(self, url):
+        return self.executor.submit(self.fetch_title, url)
+
+    def fetch_many(self, jobs, should_cancel=None, max_in_flight=None):
+        """
+        Fetch titles for (key, url) jobs and yield (key, url, title) as each
+        completes. Only max_in_flight fetches are queued at a time, so a
+        cancelled run leaves no backlog on the pool.
+        """
+        window = max_in_flight or self.max_workers * 2
+        jobs = iter(interleave_by_host(jobs))
+        pending = {}
+        try:
+            while True:
+                cancelled = should_cancel is not None and should_cancel()
+                while not cancelled and len(pending) < window:
+                    job = next(jobs, None)
+                    if job is None:
+                        break
+                    pending[self.submit(job[1])] = job
+                if not pending or cancelled:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key, url = pending.pop(future)
+                    yield key, url, future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
@@ -0,0 +1,196 @@
+import heapq
+import itertools
+import time
+
+# Job priorities, most urgent first
+PRIORITY_VISIBLE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2
+
+
+class _Job:
+    __slots__ = ("key", "steps", "priority", "seq", "on_done", "active")
+
+    def __init__(self, key, steps, priority, seq, on_done):
+        self.key = key
+        self.steps = steps
+        self.priority = priority
+        self.seq = seq
+        self.on_done = on_done
+        self.active = True
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class UiScheduler:
+    """
+    Runs long tree work on the Tk thread in time slices, so repaint and
+    input get their turn in between.
+
+    A job is an iterable whose every step does a small piece of work, such
+    as inserting one row. Jobs run most urgent priority first (oldest first
+    within a priority) for at most slice_ms at a time, then the event loop
+    runs for interval_ms. Submitting a job under the key of a pending one
+    supersedes it: the old job is dropped where it stopped.
+
+    request(key, func) coalesces refreshes: func runs once when Tk is next
+    idle, however often it was requested before that.
+    """
+
+    def __init__(self, widget, slice_ms=15, interval_ms=1):
+        self.widget = widget
+        self.slice_ms = slice_ms
+        self.interval_ms = interval_ms
+        self._jobs = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._running = None
+        self._after_id = None
+        self._requests = {}
+        self._idle_id = None
+
+    # --------------------------------------------------------------------------
+    #  JOBS
+    # --------------------------------------------------------------------------
+    def submit(self, key, steps, priority=PRIORITY_NORMAL, on_done=None, run_now=True):
+        """
+        Queue the steps as the job for key, replacing a pending one, and
+        call on_done() once they are all done. With run_now, a first slice
+        runs before this returns, so the rows that come first (the ones in
+        view) are there by the next repaint.
+        """
+        self.cancel(key)
+        job = _Job(key, iter(steps), priority, next(self._seq), on_done)
+        self._jobs[key] = job
+        heapq.heappush(self._heap, job)
+        if run_now and self._running is None:
+            self._run()
+        else:
+            self._schedule()
+        return job
+
+    def busy(self, key=None):
+        """Whether the job for key is still pending; without a key, any job or request."""
+        if key is None:
+            return bool(self._jobs or self._requests)
+        return key in self._jobs
+
+    def keys(self):
+        return list(self._jobs)
+
+    def cancel(self, key):
+        job = self._jobs.pop(key, None)
+        if job is None:
+            return False
+        job.active = False
+        return True
+
+    def cancel_if(self, predicate):
+        for key in [key for key in self._jobs if predicate(key)]:
+            self.cancel(key)
+
+    def finish(self, key):
+        """Run the job for key to the end now, for callers that need its result."""
+        job = self._jobs.get(key)
+        if job is None or job is self._running:
+            return
+        # finish() may be called from another job's step; that job resumes after
+        outer, self._running = self._running, job
+        try:
+            for _ in job.steps:
+                if not job.active:
+                    return
+        except BaseException:
+            self._drop(job)
+            raise
+        finally:
+            self._running = outer
+        self._complete(job)
+
+    def finish_all(self):
+        while self._jobs:
+            job = min(self._jobs.values())
+            if job is self._running:
+                break
+            self.finish(job.key)
+
+    def stop(self):
+        """Drop every job and request; nothing runs afterwards."""
+        for key in list(self._jobs):
+            self.cancel(key)
+        self._heap.clear()
+        self._requests.clear()
+        for after_id in (self._after_id, self._idle_id):
+            if after_id is not None:
+                self.widget.after_cancel(after_id)
+        self._after_id = self._idle_id = None
+
+    def _schedule(self):
+        if self._after_id is None and self._heap:
+            self._after_id = self.widget.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        self._after_id = None
+        self._run()
+
+    def _run(self):
+        deadline = time.perf_counter() + self.slice_ms / 1000.0
+        heap = self._heap
+        try:
+            while heap:
+                job = heap[0]
+                if not job.active:
+                    heapq.heappop(heap)
+                    continue
+                self._running = job
+                try:
+                    next(job.steps)
+                except StopIteration:
+                    self._running = None
+                    self._complete(job)
+                    continue
+                except BaseException:
+                    self._drop(job)
+                    raise
+                finally:
+                    self._running = None
+                if time.perf_counter() >= deadline:
+                    break
+        finally:
+            self._schedule()
+
+    def _drop(self, job):
+        job.active = False
+        if self._jobs.get(job.key) is job:
+            del self._jobs[job.key]
+
+    def _complete(self, job):
+        if not job.active:
+            return
+        self._drop(job)
+        if job.on_done is not None:
+            job.on_done()
+
+    # --------------------------------------------------------------------------
+    #  COALESCED REQUESTS
+    # --------------------------------------------------------------------------
+    def request(self, key, func, *args):
+        """Call func(*args) once Tk is idle; later requests for key replace earlier ones."""
+        self._requests.pop(key, None)
+        self._requests[key] = (func, args)
+        if self._idle_id is None:
+            self._idle_id = self.widget.after_idle(self._run_requests)
+
+    def flush_requests(self):
+        """Run the pending requests now."""
+        if self._idle_id is not None:
+            self.widget.after_cancel(self._idle_id)
+        self._run_requests()
+
+    def _run_requests(self):
+        self._idle_id = None
+        while self._requests:
+            key = next(iter(self._requests))
+            func, args = self._requests.pop(key)
+            func(*args)
@@ -0,0 +1,293 @@
+import functools
+import re
+import sys
+import urllib.parse
+from collections import namedtuple
+
+# Query parameters that only say where a click came from
+TRACKING_PARAMS = frozenset({
+    "ref", "ref_src", "ref_url", "referrer", "source", "fbclid", "gclid", "dclid",
+    "yclid", "msclkid", "igshid", "mc_cid", "mc_eid", "_hsenc", "_hsmi", "spm",
+})
+TRACKING_PREFIXES = ("utm_",)
+
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+_INDEX_DOCUMENT_RE = re.compile(r"(^|/)(index|default)\.(html?|php|aspx?|jsp|cfm|shtml)$", re.IGNORECASE)
+_PERCENT_RE = re.compile(r"%([0-9A-Fa-f]{2})")
+_UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+
+# A URL between rules is a list of its six urlparse() fields, which rules
+# edit in place; an empty string means absent.
+SCHEME, NETLOC, PATH, PARAMS, QUERY, FRAGMENT = range(6)
+
+
+def is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def parse(raw_url):
+    """Split a raw URL the way normalize_url always has (http:// assumed)."""
+    temp_url = raw_url.strip()
+    if not temp_url.startswith(("http://", "https://")):
+        temp_url = "http://" + temp_url
+    scheme, netloc, path, params, query, fragment = urllib.parse.urlparse(temp_url)
+    # The memo keeps these for every URL; most share their scheme and host
+    return sys.intern(scheme), sys.intern(netloc), path, params, query, fragment
+
+
+def unparse(parts):
+    scheme, netloc, path, params, query, fragment = parts
+    key = netloc + path
+    if params:
+        key += ";" + params
+    if query:
+        key += "?" + query
+    if fragment:
+        key += "#" + fragment
+    if scheme:
+        key = f"{scheme}://{key}"
+    return key
+
+
+def _split_host_port(netloc):
+    userinfo, at, hostport = netloc.rpartition("@")
+    host, colon, port = hostport.rpartition(":")
+    # "[::1]" has colons but no port; only a numeric suffix is one
+    if not colon or not port.isdigit():
+        host, port = hostport, ""
+    return userinfo + at, host, port
+
+
+# ------------------------------------------------------------------------------
+#  RULES
+# ------------------------------------------------------------------------------
+def _lowercase_host(p):
+    p[NETLOC] = p[NETLOC].lower()
+
+
+def _strip_www(p):
+    if p[NETLOC].startswith("www."):
+        p[NETLOC] = p[NETLOC][4:]
+
+
+def _default_port(p):
+    if ":" in p[NETLOC]:
+        userinfo, host, port = _split_host_port(p[NETLOC])
+        if port and DEFAULT_PORTS.get(p[SCHEME]) == port:
+            p[NETLOC] = userinfo + host
+
+
+@functools.lru_cache(maxsize=4096)
+def _idna_netloc(netloc):
+    userinfo, host, port = _split_host_port(netloc)
+    try:
+        host = host.encode("idna").decode("ascii")
+    except UnicodeError:
+        return netloc
+    return userinfo + host + (":" + port if port else "")
+
+
+def _idna_host(p):
+    if not p[NETLOC].isascii():
+        p[NETLOC] = _idna_netloc(p[NETLOC])
+
+
+def _normalize_escapes(text):
+    def fix(match):
+        char = chr(int(match.group(1), 16))
+        return char if char in _UNRESERVED else "%" + match.group(1).upper()
+    return _PERCENT_RE.sub(fix, text) if "%" in text else text
+
+
+def _percent_encoding(p):
+    p[PATH] = _normalize_escapes(p[PATH])
+    p[QUERY] = _normalize_escapes(p[QUERY])
+
+
+def _strip_index(p):
+    if "." in p[PATH]:
+        p[PATH] = _INDEX_DOCUMENT_RE.sub(r"\1", p[PATH])
+
+
+def _trailing_slash(p):
+    p[PATH] = p[PATH].rstrip("/")
+
+
+def _drop_fragment(p):
+    p[FRAGMENT] = ""
+
+
+def _drop_anchor_fragment(p):
+    # "#!" fragments are routes of single-page apps and address distinct pages
+    if not p[FRAGMENT].startswith("!"):
+        p[FRAGMENT] = ""
+
+
+def _ignore_scheme(p):
+    p[SCHEME] = ""
+
+
+def _drop_tracking_params(p):
+    if p[QUERY]:
+        pairs = urllib.parse.parse_qsl(p[QUERY], keep_blank_values=True)
+        kept = [(k, v) for k, v in pairs if not is_tracking_param(k)]
+        if len(kept) != len(pairs):
+            p[QUERY] = urllib.parse.urlencode(kept)
+
+
+def _sort_query(p):
+    if "&" in p[QUERY]:
+        p[QUERY] = "&".join(sorted(p[QUERY].split("&")))
+
+
+def _drop_query(p):
+    p[PARAMS] = p[QUERY] = ""
+
+
+Rule = namedtuple("Rule", "name label func default")
+
+# Rules always run in this order. Those most likely to be toggled sit at the
+# end, so a change there reuses the most cached work. The default set gives
+# exactly the keys of bookmark_store.normalize_url.
+RULES = (
+    Rule("lowercase_host", "Lower-case host", _lowercase_host, True),
+    Rule("strip_www", "Strip leading www.", _strip_www, True),
+    Rule("default_port", "Remove default ports (:80, :443)", _default_port, False),
+    Rule("idna_host", "Fold international hosts to punycode", _idna_host, False),
+    Rule("percent_encoding", "Normalize percent-encoding", _percent_encoding, False),
+    Rule("strip_index", "Strip index.* / default.* documents", _strip_index, False),
+    Rule("trailing_slash", "Strip trailing slashes", _trailing_slash, True),
+    Rule("drop_fragment", "Drop #fragments", _drop_fragment, True),
+    Rule("drop_anchor_fragment", "Drop #fragments except #! routes", _drop_anchor_fragment, False),
+    Rule("ignore_scheme", "Treat http and https alike", _ignore_scheme, True),
+    Rule("drop_tracking_params", "Drop tracking parameters (utm_*, fbclid, ...)", _drop_tracking_params, False),
+    Rule("sort_query", "Sort query parameters", _sort_query, False),
+    Rule("drop_query", "Drop the whole query string", _drop_query, True),
+)
+RULE_NAMES = tuple(rule.name for rule in RULES)
+DEFAULT_RULES = frozenset(rule.name for rule in RULES if rule.default)
+
+
+# ------------------------------------------------------------------------------
+#  PIPELINE
+# ------------------------------------------------------------------------------
+class CanonPipeline:
+    """
+    Canonicalizes URLs into grouping keys through the enabled RULES.
+
+    Keys are memoized per raw URL. Alongside each key the pipeline keeps the
+    URL as it looked after the first `checkpoint` rules (checkpoint starts at
+    0, i.e. just parsed). Changing rule k moves the checkpoint to k, so the
+    next batch only runs rules k and later for URLs it has seen, and never
+    reparses one. Memos are dropped once they hold max_entries URLs.
+    """
+
+    def __init__(self, enabled=DEFAULT_RULES, max_entries=1000000):
+        self.enabled = self._check(enabled)
+        self.max_entries = max_entries
+        self.checkpoint = 0
+        # raw URL -> key under the current rules
+        self._keys = {}
+        # raw URL -> (stage, *parts after the first `stage` rules), flat to
+        # save a tuple per URL; stage never exceeds checkpoint
+        self._states = {}
+        self.hits = 0
+        self.misses = 0
+        self._compile()
+
+    @staticmethod
+    def _check(enabled):
+        enabled = frozenset(enabled)
+        unknown = enabled - set(RULE_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown URL rule(s): {', '.join(sorted(unknown))}")
+        return enabled
+
+    def _compile(self):
+        self._funcs = [rule.func if rule.name in self.enabled else None for rule in RULES]
+        self._tail = [f for f in self._funcs[self.checkpoint:] if f is not None]
+        # stage -> enabled rules taking a state from that stage to the checkpoint
+        self._advance = {}
+
+    def _rules_between(self, start, stop):
+        return [f for f in self._funcs[start:stop] if f is not None]
+
+    def set_enabled(self, enabled):
+        """Switch to another rule set; returns True if anything changed."""
+        enabled = self._check(enabled)
+        changed = [i for i, name in enumerate(RULE_NAMES) if (name in enabled) != (name in self.enabled)]
+        if not changed:
+            return False
+        first = changed[0]
+        if first < self.checkpoint:
+            # States past the changed rule have it baked in
+            self._states = {url: entry for url, entry in self._states.items() if entry[0] <= first}
+        self.checkpoint = first
+        self.enabled = enabled
+        self._keys.clear()
+        self._compile()
+        return True
+
+    def set_rule(self, name, on):
+        enabled = set(self.enabled)
+        if on:
+            enabled.add(name)
+        else:
+            enabled.discard(name)
+        return self.set_enabled(enabled)
+
+    def clear(self):
+        self._keys.clear()
+        self._states.clear()
+
+    def canonicalize(self, raw_url):
+        key = self._keys.get(raw_url)
+        if key is not None:
+            self.hits += 1
+            return key
+        return self.canonicalize_many((raw_url,))[0]
+
+    def canonicalize_many(self, raw_urls):
+        """Batch form of canonicalize(); returns keys in input order."""
+        keys, states = self._keys, self._states
+        checkpoint, tail, advance = self.checkpoint, self._tail, self._advance
+        result = []
+        append = result.append
+        misses = 0
+        for raw_url in raw_urls:
+            key = keys.get(raw_url)
+            if key is None:
+                misses += 1
+                entry = states.get(raw_url)
+                if entry is None:
+                    stage, state = 0, parse(raw_url)
+                else:
+                    stage, state = entry[0], entry[1:]
+                if stage != checkpoint:
+                    funcs = advance.get(stage)
+                    if funcs is None:
+                        funcs = advance[stage] = self._rules_between(stage, checkpoint)
+                    parts = list(state)
+                    for func in funcs:
+                        func(parts)
+                    state = tuple(parts)
+                if stage != checkpoint or entry is None:
+                    if len(states) >= self.max_entries:
+                        states.clear()
+                    states[raw_url] = (checkpoint,) + state
+                parts = list(state)
+                for func in tail:
+                    func(parts)
+                key = unparse(parts)
+                if len(keys) >= self.max_entries:
+                    keys.clear()
+                keys[raw_url] = key
+            append(key)
+        self.misses += misses
+        self.hits += len(result) - misses
+        return result
+
+    def __call__(self, raw_url):
+        return self.canonicalize(raw_url)
@@ -0,0 +1,326 @@
+import queue
+import sys
+import threading
+import time
+
+import instrumentation
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+# ------------------------------------------------------------------------------
+#  READ/WRITE LOCK
+# ------------------------------------------------------------------------------
+class ReadWriteLock:
+    """
+    Many readers or one writer.
+
+    A waiting writer keeps new readers out, so a stream of reads cannot
+    starve it. The writing thread may take the write lock again (nested),
+    and may read while it writes.
+    """
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._cond = threading.Condition(self._mutex)
+        self._readers = 0
+        self._writers_waiting = 0
+        # Readers waiting for a writer to get through
+        self._readers_waiting = 0
+        self._writer = None
+        self._depth = 0
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        if self._writer == me:
+            self._depth += 1
+            return
+        # Held for the whole write: that is what keeps readers out, and it
+        # keeps an uncontended write down to one acquire and one release
+        self._mutex.acquire()
+        if self._readers:
+            self._writers_waiting += 1
+            while self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+        self._writer = me
+        self._depth = 1
+
+    def release_write(self):
+        self._depth -= 1
+        if self._depth:
+            return
+        self._writer = None
+        if self._readers_waiting:
+            self._cond.notify_all()
+        self._mutex.release()
+
+    def acquire_read(self):
+        """Returns False (and takes nothing) when this thread holds the write lock."""
+        if self._writer == threading.get_ident():
+            return False
+        with self._mutex:
+            if self._writers_waiting:
+                self._readers_waiting += 1
+                while self._writers_waiting:
+                    self._cond.wait()
+                self._readers_waiting -= 1
+            self._readers += 1
+        return True
+
+    def release_read(self):
+        with self._mutex:
+            self._readers -= 1
+            if not self._readers and self._writers_waiting:
+                self._cond.notify_all()
+
+    def read(self):
+        """Context manager holding the read lock."""
+        return _Reading(self)
+
+    def write(self):
+        """Context manager holding the write lock."""
+        return _Writing(self)
+
+
+class _Reading:
+    def __init__(self, lock):
+        self.lock = lock
+        self.held = False
+
+    def __enter__(self):
+        self.held = self.lock.acquire_read()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.held:
+            self.lock.release_read()
+        return False
+
+
+class _Writing:
+    def __init__(self, lock):
+        self.lock = lock
+
+    def __enter__(self):
+        self.lock.acquire_write()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.lock.release_write()
+        return False
+
+
+# ------------------------------------------------------------------------------
+#  UI BRIDGE
+# ------------------------------------------------------------------------------
+class UiBridge:
+    """
+    Marshals callbacks from worker threads onto the Tk thread.
+
+    Workers call post(fn, *args); the Tk side drains the queue from an
+    after() loop, spending at most budget_ms per tick so a burst of results
+    cannot stall the event loop.
+    """
+
+    def __init__(self, widget, interval_ms=50, budget_ms=30):
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self.budget_ms = budget_ms
+        self.queue = queue.Queue()
+        self._after_id = self.widget.after(self.interval_ms, self._poll)
+
+    def post(self, fn, *args):
+        self.queue.put((fn, args))
+
+    def _poll(self):
+        deadline = time.perf_counter() + self.budget_ms / 1000.0
+        try:
+            while time.perf_counter() < deadline:
+                try:
+                    fn, args = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    fn(*args)
+                except Exception:
+                    # Reported like any Tk callback error; the bridge keeps going
+                    self.widget._root().report_callback_exception(*sys.exc_info())
+        finally:
+            if self._after_id is not None:
+                self._after_id = self.widget.after(self.interval_ms, self._poll)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+
+
+# ------------------------------------------------------------------------------
+#  TASK REGISTRY
+# ------------------------------------------------------------------------------
+class TaskEntry:
+    """What the shared progress display knows about one running task."""
+
+    def __init__(self, task):
+        self.task = task
+        self.label = task.label or task.name
+        self.done = None
+        self.total = None
+        self.text = None
+
+    @property
+    def fraction(self):
+        """Share of the work done, or None while unknown."""
+        if self.done is None or not self.total:
+            return None
+        return min(1.0, self.done / self.total)
+
+
+class TaskRegistry:
+    """
+    The background tasks running now, for one progress display they share.
+
+    Tk thread only. A BackgroundTask started with a registry adds itself,
+    and is removed right before its on_done, on_error or on_cancel runs.
+    on_change() is called whenever a task starts, reports progress or ends.
+    """
+
+    def __init__(self, on_change=None):
+        self.on_change = on_change
+        self._entries = {}
+
+    def add(self, task):
+        self._entries[task] = TaskEntry(task)
+        self._changed()
+
+    def remove(self, task):
+        if self._entries.pop(task, None) is not None:
+            self._changed()
+
+    def progress(self, task, done=None, total=None, text=None):
+        entry = self._entries.get(task)
+        if entry is None:
+            return
+        entry.done, entry.total, entry.text = done, total, text
+        self._changed()
+
+    def entries(self):
+        """The running tasks, oldest first."""
+        return list(self._entries.values())
+
+    def current(self):
+        """The most recently started task, the one the display shows."""
+        return next(reversed(self._entries.values()), None)
+
+    def cancel_all(self):
+        for task in list(self._entries):
+            if task.cancellable:
+                task.cancel()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+
+# ------------------------------------------------------------------------------
+#  BACKGROUND TASK
+# ------------------------------------------------------------------------------
+class BackgroundTask:
+    """
+    Runs target(task) on a worker and reports back through a UiBridge.
+
+    The worker is a thread from executor (a concurrent.futures pool), or a
+    daemon thread of its own without one. The target calls task.report(...)
+    for progress (throttled to one update per progress_interval seconds) and
+    task.check_cancelled() at safe points. on_done(result), on_error(exc),
+    on_cancel() and on_progress(...) all run on the Tk thread. With a
+    registry, the task is listed there under label while it runs;
+    cancellable says whether cancel() can stop it.
+    """
+
+    def __init__(self, bridge, target, on_done=None, on_error=None, on_cancel=None,
+                 on_progress=None, name="task", progress_interval=0.1, executor=None,
+                 registry=None, label=None, cancellable=True):
+        self.bridge = bridge
+        self.target = target
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.on_progress = on_progress
+        self.name = name
+        self.progress_interval = progress_interval
+        self.executor = executor
+        self.registry = registry
+        self.label = label
+        self.cancellable = cancellable
+        self.cancel_event = threading.Event()
+        self._last_report = 0.0
+        self._thread = None
+        self._future = None
+
+    def start(self):
+        if self.registry is not None:
+            self.registry.add(self)
+        if self.executor is not None:
+            self._future = self.executor.submit(self._run)
+        else:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        return self
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise TaskCancelled()
+
+    def report(self, *args, force=False):
+        if self.on_progress is None:
+            return
+        now = time.monotonic()
+        if force or now - self._last_report >= self.progress_interval:
+            self._last_report = now
+            self.bridge.post(self.on_progress, *args)
+
+    def is_alive(self):
+        if self._future is not None:
+            return not self._future.done()
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        try:
+            # Cancelled while still queued for a pool thread
+            self.check_cancelled()
+            with instrumentation.span(self.name, "task"):
+                result = self.target(self)
+        except TaskCancelled:
+            self._finish(self.on_cancel)
+        except Exception as e:
+            if self.cancel_event.is_set():
+                self._finish(self.on_cancel)
+            else:
+                self._finish(self.on_error, e)
+        else:
+            self._finish(self.on_done, result)
+
+    def _finish(self, callback, *args):
+        if self.registry is not None:
+            self.bridge.post(self._deliver, callback, args)
+        elif callback is not None:
+            self.bridge.post(callback, *args)
+
+    def _deliver(self, callback, args):
+        self.registry.remove(self)
+        if callback is not None:
+            callback(*args)
@@ -0,0 +1,236 @@
+import os
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape, quoteattr
+
+from instrumentation import count
+
+# Child elements of <Links> that the model keeps as plain fields, in XML order
+LINK_FIELDS = ("ID", "URL", "KategorieID", "Title", "Tags")
+
+# Record kinds handed to the model in batches
+CATEGORY_RECORD = "Kategorien"
+LINK_RECORD = "Links"
+OTHER_RECORD = "other"
+
+
+class LoadCancelled(Exception):
+    pass
+
+
+class _CountingReader:
+    """File wrapper that counts the bytes iterparse has consumed."""
+
+    def __init__(self, f):
+        self.f = f
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def _child_text(elem):
+    return elem.text.strip() if elem.text else ""
+
+
+def _link_record(elem):
+    """Turn a <Links> element into [ID, URL, KategorieID, Title, Tags, extra]."""
+    fields = [None] * len(LINK_FIELDS)
+    extra = None
+    for child in elem:
+        try:
+            pos = LINK_FIELDS.index(child.tag)
+        except ValueError:
+            pos = -1
+        if pos >= 0 and fields[pos] is None:
+            fields[pos] = _child_text(child)
+        else:
+            # Unknown children are kept verbatim and written back on save
+            child.tail = None
+            if extra is None:
+                extra = []
+            extra.append(child)
+    fields.append(extra)
+    return fields
+
+
+def _category_record(elem):
+    cat_id = elem.find("ID")
+    cat_name = elem.find("Kategorie")
+    if cat_id is None or cat_name is None:
+        return None
+    extra = [c for c in elem if c.tag not in ("ID", "Kategorie")] or None
+    if extra:
+        for c in extra:
+            c.tail = None
+    return (_child_text(cat_id), _child_text(cat_name), extra)
+
+
+def iter_record_batches(source, batch_size=5000, on_progress=None, should_cancel=None):
+    """
+    Stream a Safavor XML file and yield batches of (kind, record) tuples.
+
+    The first item yielded is ("root", (tag, attrib)). Processed top-level
+    elements are cleared as soon as they are converted, so memory stays
+    bounded by the batch size instead of the size of the document.
+    on_progress(bytes_read, total_bytes, records) is called once per batch.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        total_bytes = os.path.getsize(source)
+        f = open(source, "rb")
+        close_after = True
+    else:
+        total_bytes = 0
+        f = source
+        close_after = False
+
+    reader = _CountingReader(f)
+    records = 0
+    batch = []
+    depth = 0
+    root = None
+    try:
+        for event, elem in ET.iterparse(reader, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if depth == 1:
+                    root = elem
+                    yield [("root", (elem.tag, dict(elem.attrib)))]
+                continue
+
+            depth -= 1
+            if depth != 1:
+                continue
+
+            if elem.tag == LINK_RECORD:
+                batch.append((LINK_RECORD, _link_record(elem)))
+            else:
+                record = _category_record(elem) if elem.tag == CATEGORY_RECORD else None
+                if record is not None:
+                    batch.append((CATEGORY_RECORD, record))
+                else:
+                    # Includes <Kategorien> without an ID or name: the model
+                    # cannot use them, but a save must not lose them
+                    elem.tail = None
+                    batch.append((OTHER_RECORD, elem))
+            # Drop the processed element from the partial tree
+            del root[:]
+
+            records += 1
+            if len(batch) >= batch_size:
+                if should_cancel is not None and should_cancel():
+                    raise LoadCancelled()
+                if on_progress is not None:
+                    on_progress(reader.bytes_read, total_bytes, records)
+                count("xml_elements_read", len(batch))
+                yield batch
+                batch = []
+
+        if batch:
+            count("xml_elements_read", len(batch))
+            yield batch
+        if on_progress is not None:
+            on_progress(reader.bytes_read, total_bytes, records)
+    finally:
+        if close_after:
+            f.close()
+
+
+# ------------------------------------------------------------------------------
+#  WRITING
+# ------------------------------------------------------------------------------
+def _field_xml(tag, text, indent):
+    if text is None:
+        return ""
+    if not text:
+        return f"{indent}<{tag} />\n"
+    return f"{indent}<{tag}>{escape(text)}</{tag}>\n"
+
+
+def _extra_xml(elems, indent):
+    if not elems:
+        return ""
+    return "".join(indent + ET.tostring(e, encoding="unicode") + "\n" for e in elems)
+
+
+def _category_xml(cat_id, cat_name, extra):
+    return (
+        "  <Kategorien>\n"
+        + _field_xml("ID", cat_id, "    ")
+        + _field_xml("Kategorie", cat_name, "    ")
+        + _extra_xml(extra, "    ")
+        + "  </Kategorien>\n"
+    )
+
+
+def _link_xml(record):
+    parts = ["  <Links>\n"]
+    for tag, text in zip(LINK_FIELDS, record):
+        parts.append(_field_xml(tag, text, "    "))
+    parts.append(_extra_xml(record[len(LINK_FIELDS)], "    "))
+    parts.append("  </Links>\n")
+    return "".join(parts)
+
+
+def _root_open_xml(root_tag, root_attrib):
+    attrs = "".join(f" {k}={quoteattr(v)}" for k, v in root_attrib.items())
+    return f"<?xml version='1.0' encoding='utf-8'?>\n<{root_tag}{attrs}>\n"
+
+
+def write_records(out, root_tag, root_attrib, categories, links, other_elems=()):
+    """
+    Write a Safavor XML document to a text stream, one record at a time.
+
+    categories yields (cat_id, name, extra); links yields field lists as
+    produced by _link_record.
+    """
+    out.write(_root_open_xml(root_tag, root_attrib))
+
+    written = 0
+    for elem in other_elems:
+        out.write("  " + ET.tostring(elem, encoding="unicode") + "\n")
+        written += 1
+
+    for cat_id, cat_name, extra in categories:
+        out.write(_category_xml(cat_id, cat_name, extra))
+        written += 1
+
+    for record in links:
+        out.write(_link_xml(record))
+        written += 1
+
+    out.write(f"</{root_tag}>\n")
+    count("xml_elements_written", written)
+
+
+def write_batches(out, batches):
+    """
+    Write batches of (kind, record) tuples, as iter_record_batches yields
+    them, back out as Safavor XML in the same order. Only one batch is
+    held at a time, so a file can be filtered from input to output.
+    """
+    root_tag = "SafavorRoot"
+    opened = False
+    for batch in batches:
+        parts = []
+        for kind, record in batch:
+            if kind == "root":
+                root_tag = record[0]
+                parts.append(_root_open_xml(*record))
+                opened = True
+                continue
+            if not opened:
+                parts.append(_root_open_xml(root_tag, {}))
+                opened = True
+            if kind == LINK_RECORD:
+                parts.append(_link_xml(record))
+            elif kind == CATEGORY_RECORD:
+                parts.append(_category_xml(*record))
+            else:
+                parts.append("  " + ET.tostring(record, encoding="unicode") + "\n")
+        out.write("".join(parts))
+        count("xml_elements_written", sum(1 for kind, _ in batch if kind != "root"))
+    if not opened:
+        out.write(_root_open_xml(root_tag, {}))
+    out.write(f"</{root_tag}>\n")